@@ -0,0 +1,430 @@
+'''
+Name: gc_align.py
+Authors: Conor Green and Matt McPartlan
+Description: Run-to-run retention time alignment. Retention times drift between injections with the oven temperature,
+                so runs are matched to a reference run: a shift from FFT cross-correlation, optionally refined by
+                piecewise correlation optimized warping (COW). All runs go through each stage together, as rows of one
+                matrix on a common time grid, and the results are cached per run.
+Usage: Import from gc_class.py (GC.align_runs, GC.get_aligned_run, GC.get_aligned_grid). Call as main to align
+                synthetic drifted runs and time a cached re-alignment.
+Requires: scipy (fft), see Installation/Libraries.md.
+Version:
+1.0 - 18 October 2026 - Initial creation. RunAligner: vectorized resampling, FFT shifts, COW refinement, per-run cache.
+1.1 - 18 October 2026 - Runs with fewer than 2 points are not correlated and get nan shift, warp and correlations.
+'''
+
+import time
+
+import numpy as np
+from scipy.fft import next_fast_len, rfft, irfft
+
+from gc_batch import RunBatch
+
+# One row per aligned run. run = position in the list given to align, shift = delay of the run behind the reference
+# [s] (its peaks come shift seconds later), warp = largest COW boundary move [s] (0 without it; boundaries in
+# stretches of baseline are free to move up to the slack),
+# corr_raw/corr = correlation with the reference on the grid before/after alignment.
+# All but run are nan for a run (or reference) with fewer than 2 points, there is nothing to correlate.
+ALIGN_DTYPE = np.dtype([('run', np.int64), ('shift', np.float64), ('warp', np.float64), ('corr_raw', np.float64),
+                        ('corr', np.float64)])
+
+#@description: Linear interpolation of every row of Y at fractional positions, nan outside 0 .. Y.shape[1] - 1.
+#@param: Y = (R, L) array
+#@param: pos = (R, M) positions, one row per row of Y, or (M,) / any shape shared by all rows
+#@returns: (R, M) array, or (R,) + pos.shape for shared positions
+def gather_linear(Y, pos):
+    L = Y.shape[1]
+    _i0 = np.clip(np.floor(pos).astype(np.int64), 0, max(L - 2, 0))
+    _f = pos - _i0
+    if pos.ndim == 2 and pos.shape[0] == Y.shape[0]:
+        _r = np.arange(Y.shape[0])[:, np.newaxis]
+        out = Y[_r, _i0] * (1.0 - _f) + Y[_r, np.minimum(_i0 + 1, L - 1)] * _f
+    else:
+        out = Y[:, _i0] * (1.0 - _f) + Y[:, np.minimum(_i0 + 1, L - 1)] * _f
+    out[..., (pos < 0) | (pos > L - 1)] = np.nan
+    return out
+
+#@description: Resamples the voltage of every run onto t0 + k * dt (time since the run's first point) with a single
+#               np.interp call: runs are packed (gc_batch.RunBatch) and keyed by run * span + time, so one sorted key
+#               covers them all.
+#@param: runs = list of (dims, N) arrays or PackedRun
+#@param: length = grid points
+#@returns: (len(runs), length) array, nan where a run has no data
+def resample_runs(runs, indices, dt, length):
+    batch = RunBatch(runs, len(indices))
+    out = np.full((len(runs), length), np.nan)
+    if len(batch) == 0:
+        return out
+
+    t = batch.get_row(indices['t'])
+    v = batch.get_row(indices['v'])
+    _lengths = batch.get_lengths()
+    _full = _lengths > 0
+    _first = np.zeros(len(runs))
+    _first[_full] = t[batch.get_offsets()[:-1][_full]]
+    t_rel = t - batch.spread(_first)
+
+    _grid = np.arange(length) * dt
+    _span = max(t_rel.max(), _grid[-1]) + 2 * dt
+    key = batch.get_run_ids() * _span + t_rel
+    _q = np.arange(len(runs))[:, np.newaxis] * _span + _grid
+    out[:] = np.interp(_q.ravel(), key, v).reshape(len(runs), length)
+
+    _dur = np.full(len(runs), -1.0)
+    _last = batch.get_offsets()[1:][_full] - 1
+    _dur[_full] = t_rel[_last]
+    out[_grid > _dur[:, np.newaxis] + 1e-9 * dt] = np.nan
+    return out
+
+#@description: Rows with their median removed and no data (nan) set to 0, for correlations.
+def centered(Y):
+    _m = np.nanmedian(np.where(np.all(np.isnan(Y), axis=1, keepdims=True), 0.0, Y), axis=1, keepdims=True)
+    return np.nan_to_num(Y - _m)
+
+#@returns: Pearson correlation of every row of X with r (same length), 0 for flat rows
+def row_corr(X, r):
+    _xc = X - X.mean(axis=-1, keepdims=True)
+    _rc = r - r.mean()
+    _num = _xc @ _rc
+    _den = np.sqrt(np.einsum('...i,...i->...', _xc, _xc) * np.dot(_rc, _rc))
+    return np.where(_den > 0, _num / np.where(_den > 0, _den, 1.0), 0.0)
+
+#@description: Delay of every row of X behind r from the maximum of their cross-correlation, computed for all rows
+#               with one batched real FFT, refined below a sample by a parabola through the maximum and its
+#               neighbours.
+#@param: r = (L,) reference, X = (R, L + K) rows (zero where there is no data), K = largest shift in samples
+#@returns: (R,) shifts in samples
+def fft_shifts(r, X, K):
+    L = len(r)
+    _n = next_fast_len(L + 2 * K + 1, real=True)
+    C = irfft(np.conj(rfft(r, _n))[np.newaxis] * rfft(X, _n, axis=1), _n, axis=1)
+
+    # Lags -K .. K: the negative ones wrapped to the end
+    lags = np.arange(-K, K + 1)
+    C = C[:, lags % _n]
+    _i = np.argmax(C, axis=1)
+    _r = np.arange(len(X))
+    _c0 = C[_r, _i]
+    _cm = C[_r, np.maximum(_i - 1, 0)]
+    _cp = C[_r, np.minimum(_i + 1, 2 * K)]
+    _den = _cm - 2.0 * _c0 + _cp
+    _edge = (_i == 0) | (_i == 2 * K) | (_den >= 0)
+    _frac = np.where(_edge, 0.0, 0.5 * (_cm - _cp) / np.where(_den == 0, 1.0, _den))
+    return lags[_i] + _frac
+
+#@description: Correlation optimized warping (Nielsen et al. 1998) of every row of X onto r at once. The reference is
+#               cut into segments of m samples; each inner segment boundary may move by up to k samples in the run,
+#               and a dynamic programme picks the boundaries that maximize the summed segment covariances, the run
+#               segment being stretched linearly to the reference segment. Covariance rather than the original
+#               correlation coefficient: a segment of baseline noise then weighs nothing, instead of as much as one with
+#               peaks, and cannot pull the boundary next to a peak. One stage per segment, each over all rows and all
+#               (start, end) boundary moves.
+#@param: r = (L,) reference, X = (R, L) rows already shifted onto it
+#@param: m = segment length, k = slack, both in samples (k is kept below m / 2 so segments cannot fold)
+#@returns: (reference boundaries (N + 1,), run boundaries (R, N + 1)) as grid positions. The ends move too (drift
+#               from a temperature change is largest there).
+def cow_warp(r, X, m, k):
+    L = len(r)
+    R = len(X)
+    # The remainder goes to the last segment
+    rb = np.arange(0, L, m)
+    rb[-1] = L - 1
+    k = max(min(k, (np.diff(rb).min() - 1) // 2), 0)
+    D = np.arange(-k, k + 1)
+    S = len(D)
+
+    # Positions are the same for every row: gathering whole rows of X.T copies R contiguous values at a time
+    Xt = np.ascontiguousarray(X.T)
+    score = np.zeros((R, S))
+    back = np.zeros((len(rb) - 1, R, S), dtype=np.int64)
+
+    for j in range(len(rb) - 1):
+        _m = rb[j + 1] - rb[j]
+        _u = np.arange(_m + 1) / _m
+        _a = (rb[j] + D)[:, np.newaxis, np.newaxis]
+        _b = (rb[j + 1] + D)[np.newaxis, :, np.newaxis]
+        pos = np.clip(_a + _u * (_b - _a), 0, L - 1)
+        _i0 = np.minimum(pos.astype(np.int64), L - 2)
+        _f = (pos - _i0)[..., np.newaxis]
+        seg = Xt[_i0]
+        seg += _f * (Xt[_i0 + 1] - seg)
+
+        # Covariance with the centered reference segment
+        _rs = r[rb[j]:rb[j + 1] + 1]
+        cost = np.einsum('abur,u->rab', seg, _rs - _rs.mean())
+
+        total = score[:, :, np.newaxis] + cost
+        back[j] = np.argmax(total, axis=1)
+        score = np.take_along_axis(total, back[j][:, np.newaxis], axis=1)[:, 0]
+
+    _s = np.argmax(score, axis=1)
+    tb = np.empty((R, len(rb)))
+    tb[:, -1] = rb[-1] + D[_s]
+    for j in range(len(rb) - 2, -1, -1):
+        _s = back[j][np.arange(R), _s]
+        tb[:, j] = rb[j] + D[_s]
+    return (rb.astype(np.float64), tb)
+
+class AlignedRun:
+    '''
+    Alignment of one run: shift and COW boundaries, its row of the aligned grid, and the aligned full run once asked
+    for. Keeps the run object, so its id stays unique while cached.
+    '''
+
+    def __init__(self, run, shift, rb, tb, corr_raw, corr, row):
+        self.run = run
+        self.shift = shift
+        self.rb = rb
+        self.tb = tb
+        self.corr_raw = corr_raw
+        self.corr = corr
+        self.row = row
+        self.aligned = None
+
+class RunAligner:
+    '''
+    Aligns runs to a reference run. Voltages are resampled onto a grid of resolution seconds (or the reference's own
+    spacing if coarser) from each run's first point; the reference spans the grid and the runs get max_shift more.
+    Every run missing from the cache then goes through the FFT shift and, with segment > 0, COW as one matrix.
+    Results are cached per run object until the reference or a parameter changes, so overlays and comparisons of
+    the same runs reuse them and a new run only costs its own correlation. Runs with fewer than 2 points skip the
+    FFT and COW stages and are cached unaligned (nan shift, warp and correlations).
+    Functions: set_params_, set_reference_, align, clear_
+    Getters: get_aligned_time, get_aligned_run, get_aligned_grid, get_grid, get_params, get_reference, get_evaluations
+    '''
+
+    #@param: indices = row of each quantity, GC.indices
+    #@param: max_shift, resolution, segment, slack = seconds, see set_params_
+    def __init__(self, indices, max_shift=30.0, resolution=0.1, segment=0.0, slack=0.0):
+        self.indices = indices
+        self.max_shift = max_shift
+        self.resolution = resolution
+        self.segment = segment
+        self.slack = slack
+
+        self.reference = None
+        self.ref_row = None
+        self.ref_centered = None
+        self.ref_t0 = 0.0
+        self.ref_ok = False
+        self.dt = resolution
+        self.cache = {}
+        self.evaluations = 0
+
+    #@description: Changes the alignment. The cache is dropped if anything changed.
+    #@param: max_shift = largest drift searched [s]
+    #@param: resolution = grid spacing [s], the correlation works on it (shifts are refined below it)
+    #@param: segment = COW segment length [s], 0 for shifts only. slack = largest boundary move per segment [s].
+    def set_params_(self, max_shift=None, resolution=None, segment=None, slack=None):
+        _old = self.get_params()
+        if max_shift is not None:
+            self.max_shift = max_shift
+        if resolution is not None:
+            self.resolution = resolution
+        if segment is not None:
+            self.segment = segment
+        if slack is not None:
+            self.slack = slack
+        if self.get_params() != _old:
+            _ref = self.reference
+            self.clear_()
+            if _ref is not None:
+                self.set_reference_(_ref)
+
+    #@description: Picks the reference run and puts it on the grid. Nothing happens for the current reference.
+    def set_reference_(self, run):
+        if run is self.reference:
+            return
+        self.cache = {}
+        self.reference = run
+
+        t = np.asarray(run[self.indices['t']], dtype=np.float64)
+        _dt = np.median(np.diff(t)) if len(t) > 1 else self.resolution
+        self.dt = max(self.resolution, _dt)
+        self.ref_t0 = t[0] if len(t) > 0 else 0.0
+        _L = max(int((t[-1] - t[0]) / self.dt) + 1, 2) if len(t) > 0 else 2
+
+        self.ref_row = resample_runs([run], self.indices, self.dt, _L)[0]
+        self.ref_centered = centered(self.ref_row[np.newaxis])[0]
+        self.ref_ok = len(t) > 1
+
+        # The reference is aligned by definition. COW boundaries in segments without peaks are free to move (nothing
+        # there to align), and would warp it against itself.
+        if self.ref_ok:
+            _ends = np.array([0.0, _L - 1.0])
+            self.cache[id(run)] = AlignedRun(run, 0.0, _ends, _ends, 1.0, 1.0, self.ref_row)
+
+    #@description: Aligns every run to the reference: the ones not in the cache together, the rest from the cache.
+    #@param: runs = list of (dims, N) arrays or PackedRun, e.g. GC.prev_data
+    #@returns: numpy structured array of ALIGN_DTYPE, one row per run in order
+    def align(self, runs):
+        if self.reference is None:
+            raise ValueError('No reference run, call set_reference_ first')
+
+        new = [_r for _r in dict.fromkeys(map(id, runs)) if _r not in self.cache]
+        if len(new) > 0:
+            _by_id = {id(_r):_r for _r in runs}
+            self.align_new_([_by_id[_i] for _i in new])
+
+        table = np.zeros(len(runs), dtype=ALIGN_DTYPE)
+        for i, _r in enumerate(runs):
+            _a = self.cache[id(_r)]
+            table[i] = (i, _a.shift * self.dt, np.max(np.abs(_a.tb - _a.rb)) * self.dt, _a.corr_raw, _a.corr)
+        return table
+
+    #@description: FFT shift (and COW) for runs not yet aligned, as rows of one matrix. Runs with fewer than 2 points
+    #               (or all runs, if the reference has fewer) are cached as unaligned, all nan, without correlating.
+    def align_new_(self, runs):
+        L = len(self.ref_row)
+        _ends = np.array([0.0, L - 1.0])
+        _ok = [self.ref_ok and _r.shape[1] > 1 for _r in runs]
+        for _r, _o in zip(runs, _ok):
+            if not _o:
+                self.cache[id(_r)] = AlignedRun(_r, np.nan, _ends, np.full(2, np.nan), np.nan, np.nan,
+                                                np.full(L, np.nan))
+        runs = [_r for _r, _o in zip(runs, _ok) if _o]
+        if len(runs) == 0:
+            return
+
+        K = max(int(np.ceil(self.max_shift / self.dt)), 1)
+        raw = resample_runs(runs, self.indices, self.dt, L + K)
+        X = centered(raw)
+        r = self.ref_centered
+
+        shifts = fft_shifts(r, X, K)
+        _j = np.arange(L, dtype=np.float64)
+        Xs = np.nan_to_num(gather_linear(X, _j + shifts[:, np.newaxis]))
+
+        _m = int(round(self.segment / self.dt))
+        if _m >= 4 and L > 2 * _m:
+            rb, tb = cow_warp(r, Xs, _m, int(round(self.slack / self.dt)))
+        else:
+            rb = np.array([0.0, L - 1.0])
+            tb = np.tile(rb, (len(runs), 1))
+
+        # Run position of every reference grid point: COW map, then the shift
+        _seg = np.clip(np.searchsorted(rb, _j, side='right') - 1, 0, len(rb) - 2)
+        _f = (_j - rb[_seg]) / (rb[_seg + 1] - rb[_seg])
+        pos = tb[:, _seg] + _f * (tb[:, _seg + 1] - tb[:, _seg]) + shifts[:, np.newaxis]
+        rows = gather_linear(raw, pos)
+
+        corr_raw = row_corr(X[:, :L], r)
+        corr = row_corr(centered(rows), r)
+        for i, _r in enumerate(runs):
+            self.cache[id(_r)] = AlignedRun(_r, shifts[i], rb, tb[i], corr_raw[i], corr[i], rows[i])
+        self.evaluations += len(runs)
+
+    #@returns: time row of run mapped onto the reference's time axis (the reference's own points keep their times).
+    #               A run that could not be aligned only starts at the reference's first point.
+    def get_aligned_time(self, run):
+        self.align([run])
+        _a = self.cache[id(run)]
+        t = np.asarray(run[self.indices['t']], dtype=np.float64)
+        if len(t) == 0:
+            return t
+        if np.isnan(_a.shift):
+            return self.ref_t0 + (t - t[0])
+
+        # Grid position in the run, minus the shift, through the inverse COW map (identity outside its ends)
+        q = (t - t[0]) / self.dt - _a.shift
+        p = np.interp(q, _a.tb, _a.rb)
+        p = np.where(q < _a.tb[0], q - _a.tb[0] + _a.rb[0], p)
+        p = np.where(q > _a.tb[-1], q - _a.tb[-1] + _a.rb[-1], p)
+        return self.ref_t0 + p * self.dt
+
+    #@returns: float64 (dims, N) copy of run with the aligned time row, cached (do not modify)
+    def get_aligned_run(self, run):
+        self.align([run])
+        _a = self.cache[id(run)]
+        if _a.aligned is None:
+            _d = np.array(run, dtype=np.float64)
+            _d[self.indices['t']] = self.get_aligned_time(run)
+            _a.aligned = _d
+        return _a.aligned
+
+    #@returns: (grid times (L,), aligned voltages (len(runs), L) with nan where a run has no data), rows cached
+    def get_aligned_grid(self, runs):
+        self.align(runs)
+        grid = self.ref_t0 + np.arange(len(self.ref_row)) * self.dt
+        rows = np.array([self.cache[id(_r)].row for _r in runs]).reshape(len(runs), len(grid))
+        return (grid, rows)
+
+    #@returns: (grid times, reference voltage on the grid)
+    def get_grid(self):
+        return (self.ref_t0 + np.arange(len(self.ref_row)) * self.dt, self.ref_row)
+
+    #@returns: (max_shift, resolution, segment, slack)
+    def get_params(self):
+        return (self.max_shift, self.resolution, self.segment, self.slack)
+
+    def get_reference(self):
+        return self.reference
+
+    #@returns: number of runs correlated so far (cache misses)
+    def get_evaluations(self):
+        return self.evaluations
+
+    def clear_(self):
+        self.cache = {}
+        self.reference = None
+        self.ref_row = None
+        self.ref_centered = None
+        self.ref_ok = False
+
+#@description: 40 runs of a 600 s chromatogram at 5 SPS, each delayed by a random shift and stretched by up to 0.5 %
+#               (a temperature drift), then aligned with shifts only and with COW. Prints the time, the worst error in
+#               peak retention times after alignment, the same runs aligned one at a time, and a cached re-alignment
+#               with one new run.
+def benchmark_align(n_runs=40, seconds=600.0, rate=5.0):
+    rng = np.random.default_rng(0)
+    centers = np.linspace(60.0, seconds - 60.0, 12)
+
+    def make_run(shift, stretch):
+        n = int(seconds * rate) + rng.integers(-50, 50)
+        d = np.zeros((4, n))
+        d[2] = 1000.0 + np.arange(n) / rate
+        d[3] = 1 / rate
+        d[0] = 0.3 + rng.normal(0, 1e-4, n)
+        for _c in centers:
+            d[0] += 0.01 * np.exp(-((d[2] - 1000.0 - (_c * stretch + shift)) / 2.0) ** 2)
+        return d
+
+    ref = make_run(0.0, 1.0)
+    _sh = rng.uniform(-10.0, 10.0, n_runs)
+    _st = rng.uniform(0.995, 1.005, n_runs)
+    runs = [ref] + [make_run(_s, _k) for _s, _k in zip(_sh, _st)]
+    indices = {'v':0, 'a':1, 't':2, 'dt':3}
+
+    for label, segment, slack in (('shift only', 0.0, 0.0), ('shift + COW', 50.0, 2.0)):
+        al = RunAligner(indices, max_shift=20.0, resolution=0.2, segment=segment, slack=slack)
+        al.set_reference_(ref)
+        t_start = time.perf_counter()
+        table = al.align(runs)
+        t_end = time.perf_counter()
+
+        # Retention of each true peak after alignment, against the reference's
+        _err = 0.0
+        for i in range(1, len(runs)):
+            _t = al.get_aligned_time(runs[i])
+            _true = 1000.0 + centers * _st[i - 1] + _sh[i - 1]
+            _err = max(_err, np.max(np.abs(np.interp(_true, runs[i][2], _t) - 1000.0 - centers)))
+        print('{:s}: {:d} runs in {:.3f} s, max retention error {:.3f} s, correlation {:.3f} -> {:.3f}'.format(label,
+                len(runs), t_end - t_start, _err, table['corr_raw'][1:].mean(), table['corr'][1:].mean()))
+
+        _one = RunAligner(indices, max_shift=20.0, resolution=0.2, segment=segment, slack=slack)
+        _one.set_reference_(ref)
+        t_start = time.perf_counter()
+        for _r in runs:
+            _one.align([_r])
+        t_end = time.perf_counter()
+        print('  one run at a time: {:.3f} s'.format(t_end - t_start))
+
+        _ev = al.get_evaluations()
+        t_start = time.perf_counter()
+        al.align(runs + [make_run(3.0, 1.0)])
+        t_end = time.perf_counter()
+        print('  again with one new run: {:.4f} s, {:d} runs correlated'.format(t_end - t_start,
+                al.get_evaluations() - _ev))
+
+if __name__ == '__main__':
+    benchmark_align()
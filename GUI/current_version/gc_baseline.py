@@ -0,0 +1,112 @@
+'''
+Name: gc_baseline.py
+Authors: Conor Green and Matt McPartlan
+Description: Baseline (detector drift) estimators. Both return a baseline array and leave the data alone; GC
+                subtracts it on the fly (GC.get_baseline, GC.get_corrected_volt).
+Usage: Import from gc_class.py. Call as main to time both estimators on a synthetic 1e6 point run.
+Requires: scipy (banded solver and rolling min/max filters), see Installation/Libraries.md.
+Version:
+1.0 - 18 October 2026 - Initial creation. als_baseline (banded Cholesky) and rolling_min_baseline.
+'''
+
+import time
+
+import numpy as np
+from scipy.linalg import solveh_banded
+from scipy.ndimage import minimum_filter1d, maximum_filter1d, uniform_filter1d
+
+#@description: Asymmetric least squares (Eilers & Boelens): minimizes sum w * (y - z)^2 + lam * sum (second difference
+#               of z)^2, with w = p above the baseline and 1 - p below, reweighted niter times. The system matrix is
+#               pentadiagonal and positive definite, so each pass is one O(n) banded Cholesky solve.
+#               Runs longer than max_points are fitted on block means of step points (lam scaled by step ** 4, so
+#               the stiffness per second is unchanged) and interpolated back: the baseline is far smoother than a
+#               block, and the smaller system stays well conditioned at the lam a long run needs.
+#@param: lam = smoothness (larger is stiffer, scales with the number of points per peak width ** 4)
+#@param: p = weight of points above the baseline (peaks), small so the fit hugs the bottom of the signal
+#@returns: numpy array of len(y)
+def als_baseline(y, lam=1e7, p=0.01, niter=10, max_points=20000):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n < 3:
+        return y.copy()
+
+    if n > max_points:
+        step = -(-n // max_points)
+        _m = n // step
+        _y = y[:_m * step].reshape(_m, step).mean(axis=1)
+        _x = np.arange(_m) * step + (step - 1) / 2
+        if _m * step < n:
+            _y = np.append(_y, y[_m * step:].mean())
+            _x = np.append(_x, (_m * step + n - 1) / 2)
+        z = als_baseline(_y, lam / step ** 4, p, niter, max_points)
+        return np.interp(np.arange(n), _x, z)
+
+    # Upper bands of lam * D'D for the second difference D
+    ab = np.zeros((3, n))
+    ab[0, 2:] = lam
+    ab[1, 1:] = -4 * lam
+    ab[1, 1] = ab[1, n - 1] = -2 * lam
+    diag = np.full(n, 6 * lam)
+    diag[0] = diag[n - 1] = lam
+    diag[1] = diag[n - 2] = 5 * lam
+    if n == 3:
+        diag[1] = 4 * lam
+
+    w = np.ones(n)
+    for i in range(niter):
+        ab[2] = diag + w
+        z = solveh_banded(ab, w * y, check_finite=False)
+
+        _w = np.where(y > z, p, 1.0 - p)
+        if np.array_equal(_w, w):
+            break
+        w = _w
+
+    return z
+
+#@description: Iterative rolling minimum: a morphological opening (rolling min then rolling max over window points)
+#               smoothed by a moving mean, clipped to the signal, niter times. Each pass is O(n) whatever the window.
+#               The signal is first averaged over window / 32 points, otherwise the minimum follows the bottom of the
+#               noise and the baseline sits a few noise units low.
+#@param: window = points per pass, wider than the widest peak
+#@returns: numpy array of len(y)
+def rolling_min_baseline(y, window, niter=3):
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) == 0:
+        return y.copy()
+    window = max(min(int(window), len(y)), 1)
+
+    b = uniform_filter1d(y, max(window // 32, 1), mode='nearest')
+    for i in range(niter):
+        _o = maximum_filter1d(minimum_filter1d(b, window, mode='nearest'), window, mode='nearest')
+        b = np.minimum(b, uniform_filter1d(_o, window, mode='nearest'))
+
+    return b
+
+#@description: Builds a baseline by name.
+#@param: method = 'als' or 'rollmin'
+#@param: param = lam for 'als', window for 'rollmin'
+#@returns: numpy array of len(y)
+def estimate_baseline(y, method, param):
+    if method == 'als':
+        return als_baseline(y, lam=param)
+    return rolling_min_baseline(y, int(param))
+
+#@description: Times both estimators on a drifting 1e6 point run and reports the error against the true drift.
+def benchmark_baselines(n=10**6):
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / 860
+    drift = 0.3 + 0.02 * (t / t[-1]) ** 2 + 0.005 * np.sin(t / t[-1] * 3)
+    y = drift + rng.normal(0, 1e-4, n)
+    for _c in np.linspace(0.1, 0.9, 8) * t[-1]:
+        y += 0.01 * np.exp(-((t - _c) / 1.5) ** 2)
+
+    for method, param in (('als', 1e13), ('rollmin', 8192)):
+        t_start = time.perf_counter()
+        b = estimate_baseline(y, method, param)
+        t_end = time.perf_counter()
+        print('{:s}: {:.3f} s for {:d} points, max |baseline - drift| {:.5f} V'.format(method, t_end - t_start, n,
+                np.max(np.abs(b - drift))))
+
+if __name__ == '__main__':
+    benchmark_baselines()
@@ -0,0 +1,316 @@
+'''
+Name: gc_batch.py
+Authors: Conor Green and Matt McPartlan
+Description: Batch analysis of stored runs (prev_data). Runs of different lengths are packed end to end into one array
+                with offsets (RunBatch); smoothing, normalizing, integration and threshold peak finding then cover every
+                run in the same NumPy calls, instead of loading the runs into curr_data one at a time.
+Usage: Import from gc_class.py (GC.get_run_batch, GC.integrate_runs, GC.smooth_runs, GC.analyze_runs). Call as main to
+                time the batch kernels against a per-run loop.
+Version:
+1.0 - 18 October 2026 - Initial creation. RunBatch, batch_areas, batch_normalize, batch_smooth, batch_threshold_peaks,
+                        analyze_batch.
+'''
+
+import copy
+import time
+
+import numpy as np
+
+from gc_filter import make_smoother, ExpSmoother
+from gc_peaks import PEAK_DTYPE, threshold_segments, peak_table
+
+# Row of a combined peak table: run = position of the run in the batch (its prev_data index, i.e. run number), the
+# other fields as PEAK_DTYPE with indices into that run.
+RUN_PEAK_DTYPE = np.dtype([('run', np.int64)] + PEAK_DTYPE.descr)
+
+class RunBatch:
+    '''
+    Runs of different lengths in one (dims, total) float64 array, end to end: run i is columns offsets[i]:offsets[i + 1].
+    Kernels take whole rows (get_row) plus the batch and use the offsets to keep runs apart, so their cost is a few
+    array passes over all samples whatever the number of runs. Empty runs take no columns. split cuts the batch into
+    groups of whole runs about chunk samples long (views), so a chain of kernels can stay in cache (analyze_batch).
+    Functions: with_row, spread, split
+    Getters: get_data, get_row, get_run, get_offsets, get_lengths, get_run_ids, get_num_runs, get_first_run, __len__
+    '''
+
+    #@param: runs = list of (dims, N) arrays or PackedRun (anything with shape and np.asarray), e.g. GC.prev_data
+    #@param: dims = rows per run
+    def __init__(self, runs, dims):
+        self.lengths = np.array([_r.shape[1] for _r in runs], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+
+        self.data = np.empty((dims, self.offsets[-1]))
+        for i, _r in enumerate(runs):
+            self.data[:, self.offsets[i]:self.offsets[i + 1]] = np.asarray(_r)
+
+        self.run_ids = np.repeat(np.arange(len(runs)), self.lengths)
+        # Run number of run 0 here in the batch split was called on
+        self.first_run = 0
+
+    #@returns: new RunBatch with row i replaced by the packed row (same runs and offsets, own copy of the data)
+    def with_row(self, i, row):
+        _b = copy.copy(self)
+        _b.data = np.copy(self.data)
+        _b.data[i] = row
+        return _b
+
+    #@returns: one value per run repeated over that run's samples (packed row)
+    def spread(self, values):
+        return np.repeat(values, self.lengths)
+
+    #@description: Groups of consecutive runs starting within the same chunk samples. A run longer than chunk is a
+    #               group of its own.
+    #@returns: list of RunBatch views (data shared), get_first_run maps their runs back
+    def split(self, chunk):
+        _g = self.offsets[:-1] // chunk
+        _b = np.concatenate(([0], np.flatnonzero(np.diff(_g)) + 1, [len(self.lengths)]))
+
+        groups = []
+        for lo, hi in zip(_b[:-1].tolist(), _b[1:].tolist()):
+            _s = self.offsets[lo]
+            _sub = copy.copy(self)
+            _sub.lengths = self.lengths[lo:hi]
+            _sub.offsets = self.offsets[lo:hi + 1] - _s
+            _sub.data = self.data[:, _s:self.offsets[hi]]
+            _sub.run_ids = self.run_ids[_s:self.offsets[hi]] - lo
+            _sub.first_run = self.first_run + lo
+            groups.append(_sub)
+        return groups
+
+    def get_data(self):
+        return self.data
+
+    #@returns: packed row i (a view)
+    def get_row(self, i):
+        return self.data[i]
+
+    #@returns: (dims, N) view of run i
+    def get_run(self, i):
+        return self.data[:, self.offsets[i]:self.offsets[i + 1]]
+
+    def get_offsets(self):
+        return self.offsets
+
+    def get_lengths(self):
+        return self.lengths
+
+    #@returns: run of every packed sample
+    def get_run_ids(self):
+        return self.run_ids
+
+    def get_num_runs(self):
+        return len(self.lengths)
+
+    def get_first_run(self):
+        return self.first_run
+
+    def __len__(self):
+        return self.data.shape[1]
+
+#@description: Trapezoidal area of y over t inside every run (what AreaIndex/calc_cumsum_into_area_ give for one run):
+#               the terms that would bridge two runs are zeroed, then one reduceat (and one cumsum) over the batch.
+#@param: running = also return the running area
+#@returns: total area per run (0 for empty runs), or (packed running area starting at 0 in every run, totals)
+def batch_areas(batch, y, t, running=False):
+    n = len(y)
+    _off = batch.get_offsets()
+    _nz = batch.get_lengths() > 0
+    _terms = np.zeros(n)
+    if n > 1:
+        _terms[1:] = y[1:]
+        _terms[1:] += y[:-1]
+        _terms[1:] *= np.diff(t)
+        _terms *= 0.5
+        _terms[_off[1:-1][_off[1:-1] < n]] = 0.0
+
+    total = np.zeros(batch.get_num_runs())
+    if n > 0:
+        total[_nz] = np.add.reduceat(_terms, _off[:-1][_nz])
+    if not running:
+        return total
+
+    cum = np.cumsum(_terms)
+    if n > 0:
+        cum -= batch.spread(cum[np.minimum(_off[:-1], n - 1)])
+    return (cum, total)
+
+#@description: Normalizes every run like gc_pipeline.normalize_row_: shifted to min 0, scaled to unit trapezoidal area
+#               over t, absolute value.
+#@returns: packed normalized voltage (new array)
+def batch_normalize(batch, v, t):
+    _nz = batch.get_lengths() > 0
+    _min = np.zeros(batch.get_num_runs())
+    if len(v) > 0:
+        _min[_nz] = np.minimum.reduceat(v, batch.get_offsets()[:-1][_nz])
+
+    out = v - batch.spread(_min)
+    _area = batch_areas(batch, out, t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out /= batch.spread(_area)
+    np.abs(out, out=out)
+    return out
+
+#@description: Smooths every run like gc_filter's smoothers do one run (make_smoother(kind, window).filter).
+#               'mean'/'savgol' are centered FIRs with zero padded ends: the whole packed row goes through the filter
+#               once, then the window - 1 outputs on either side of each run boundary, whose windows reached into the
+#               neighbouring run, are recomputed with that run's samples as zeros. 'ema' is causal and restarts at the
+#               first sample of every run: runs become rows of a padded 2-D array and the closed form recursion of
+#               ExpSmoother steps through the columns for all runs at once.
+#@param: kind = 'mean', 'ema' or 'savgol', window = samples
+#@returns: packed smoothed voltage (new array)
+def batch_smooth(batch, v, kind, window):
+    n = len(v)
+    if n == 0:
+        return np.zeros(0)
+
+    if kind != 'ema':
+        _sm = make_smoother(kind, window)
+        y = _sm.filter(v)
+
+        # Output k is sum_j coef[j] * v[k + d - w + 1 + j] (see MovingMean.process)
+        w = _sm.get_window()
+        d = _sm.get_delay()
+        coef = _sm.rev_taps if kind == 'savgol' else np.full(w, 1.0 / w)
+        _b = batch.get_offsets()[1:-1]
+        _b = np.unique(_b[(_b > 0) & (_b < n)])
+        if len(_b) > 0 and w > 1:
+            k = (_b[:, np.newaxis] - d + np.arange(w - 1)).ravel()
+            k = k[(k >= 0) & (k < n)]
+            idx = k[:, np.newaxis] + (np.arange(w) + d - w + 1)
+            _ids = batch.get_run_ids()
+            _in = (idx >= 0) & (idx < n)
+            _idx = np.clip(idx, 0, n - 1)
+            _x = np.where(_in & (_ids[_idx] == _ids[k][:, np.newaxis]), v[_idx], 0.0)
+            y[k] = _x @ coef
+        return y
+
+    _sm = ExpSmoother(2.0 / (window + 1))
+    a = _sm.get_alpha()
+    _ids = batch.get_run_ids()
+    _col = np.arange(n) - batch.spread(batch.get_offsets()[:-1])
+    X = np.zeros((batch.get_num_runs(), max(batch.get_lengths().max(), 1)))
+    X[_ids, _col] = v
+
+    Y = np.empty_like(X)
+    y = X[:, 0]
+    for i in range(0, X.shape[1], _sm.chunk):
+        _x = X[:, i:i + _sm.chunk]
+        _p = (1.0 - a) ** np.arange(1, _x.shape[1] + 1)
+        _y = _p * (y[:, np.newaxis] + a * np.cumsum(_x / _p, axis=1)) if a < 1 else _x
+        Y[:, i:i + _x.shape[1]] = _y
+        y = _y[:, -1]
+
+    return Y[_ids, _col]
+
+#@description: Threshold peak finding (gc_peaks.threshold_segments, GC.define_peaks) and measurement
+#               (gc_peaks.peak_table) over every run in one call. The segmentation sees the last point of every run
+#               pushed below the threshold, so each run starts off peak; a peak that was still open at the end of its
+#               run (last point above the threshold) is then dropped, as for a single run. Areas are prefix
+#               differences inside a run, so the time jump between runs never enters them.
+#@param: volt_thresh = scalar start/end threshold, time_thresh = minimum points per peak
+#@returns: numpy structured array of RUN_PEAK_DTYPE, ordered by run then start; indices are into the run
+def batch_threshold_peaks(batch, v, t, volt_thresh, time_thresh):
+    n = len(v)
+    if n == 0:
+        return np.zeros(0, dtype=RUN_PEAK_DTYPE)
+
+    _off = batch.get_offsets()
+    _last = _off[1:][batch.get_lengths() > 0] - 1
+    vs = np.copy(v)
+    vs[_last] = volt_thresh - 1.0
+
+    lows, highs = threshold_segments(vs, volt_thresh, time_thresh)
+    _open = np.zeros(n, dtype=bool)
+    _open[_last[v[_last] > volt_thresh]] = True
+    _keep = ~_open[highs]
+    lows = lows[_keep]
+    highs = highs[_keep]
+
+    table = peak_table(v, t, lows, highs)
+
+    out = np.zeros(len(table), dtype=RUN_PEAK_DTYPE)
+    for _f in PEAK_DTYPE.names:
+        out[_f] = table[_f]
+    run = batch.get_run_ids()[lows]
+    _start = _off[run]
+    out['run'] = run
+    out['start'] -= _start
+    out['end'] -= _start
+    out['apex'] -= _start
+    return out
+
+#@description: Smooth (optional), normalize and threshold peaks, chained per group of runs about chunk samples long,
+#               so each group goes through all three while it is in cache. One pass of each kernel over a long batch
+#               is memory bound and slower than the same work in cache sized pieces.
+#@param: vi, ti = voltage and time rows
+#@param: smooth = (kind, window) or None
+#@returns: numpy structured array of RUN_PEAK_DTYPE over the whole batch (run numbers of batch)
+def analyze_batch(batch, vi, ti, smooth, volt_thresh, time_thresh, chunk=2**17):
+    tables = [np.zeros(0, dtype=RUN_PEAK_DTYPE)]
+    for _g in batch.split(chunk):
+        v = _g.get_row(vi)
+        t = _g.get_row(ti)
+        if smooth is not None:
+            v = batch_smooth(_g, v, smooth[0], smooth[1])
+        v = batch_normalize(_g, v, t)
+        table = batch_threshold_peaks(_g, v, t, volt_thresh, time_thresh)
+        table['run'] += _g.get_first_run() - batch.get_first_run()
+        tables.append(table)
+    return np.concatenate(tables)
+
+#@description: Baseline corrected runs of 0.8 to 1.2 times n points (5 SPS) with a peak every 80 s, then smoothing,
+#               normalizing and threshold peaks per run in a Python loop against the batch kernels. The threshold is for
+#               normalized volts of a run of n points.
+def benchmark_batch(sizes=((20, 10**5), (1000, 2000)), window=9, min_pts=10):
+    from gc_pipeline import normalize_row_
+
+    for runs, n_mean in sizes:
+        rng = np.random.default_rng(0)
+        thresh = 10.0 / n_mean
+        data = []
+        for i in range(runs):
+            n = int(rng.integers(0.8 * n_mean, 1.2 * n_mean))
+            d = np.zeros((4, n))
+            d[2] = np.arange(n) / 5.0
+            d[3] = 0.2
+            d[0] = 1e-3 + rng.normal(0, 1e-4, n)
+            for _c in np.arange(40.0, d[2, -1] - 40.0, 80.0):
+                _i = slice(int((_c - 16.0) * 5), int((_c + 16.0) * 5))
+                d[0, _i] += 0.005 * np.exp(-0.5 * ((d[2, _i] - _c) / 2.0) ** 2)
+            data.append(d)
+
+        t_start = time.perf_counter()
+        tables = []
+        for i, d in enumerate(data):
+            v = make_smoother('mean', window).filter(d[0])
+            normalize_row_(v, d[2])
+            lows, highs = threshold_segments(v, thresh, min_pts)
+            _t = peak_table(v, d[2], lows, highs)
+            _r = np.zeros(len(_t), dtype=RUN_PEAK_DTYPE)
+            for _f in PEAK_DTYPE.names:
+                _r[_f] = _t[_f]
+            _r['run'] = i
+            tables.append(_r)
+        loop = np.concatenate(tables)
+        t_loop = time.perf_counter() - t_start
+
+        batch = RunBatch(data, 4)
+        t_start = time.perf_counter()
+        v = batch_smooth(batch, batch.get_row(0), 'mean', window)
+        v = batch_normalize(batch, v, batch.get_row(2))
+        whole = batch_threshold_peaks(batch, v, batch.get_row(2), thresh, min_pts)
+        t_whole = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        table = analyze_batch(batch, 0, 2, ('mean', window), thresh, min_pts)
+        t_batch = time.perf_counter() - t_start
+
+        _same = len(table) == len(loop) and len(whole) == len(loop) and all(np.array_equal(table[_f], loop[_f]) and
+                    np.array_equal(whole[_f], loop[_f]) for _f in ('run', 'start', 'end', 'apex'))
+        _err = np.max(np.abs(table['area'] - loop['area'])) if _same and len(loop) > 0 else np.nan
+        print('{:d} runs, {:d} points: loop {:.3f} s, one pass per kernel {:.3f} s, grouped {:.3f} s, {:d} peaks, '
+                'same peaks {}, max area diff {:.1e}'.format(runs, len(batch), t_loop, t_whole, t_batch, len(table),
+                _same, _err))
+
+if __name__ == '__main__':
+    benchmark_batch()
@@ -0,0 +1,734 @@
+'''
+Name: gc_buffer.py
+Authors: Conor Green and Matt McPartlan
+Description: Sample storage used by gc_class. Replaces the np.append-per-sample pattern with a preallocated, growable buffer.
+Usage: Import from gc_class.py. Call as main to run the append benchmark.
+Version:
+1.0 - 18 October 2026 - Initial creation. SampleBuffer with capacity doubling and views for readers.
+1.1 - 18 October 2026 - SharedSampleRing in multiprocessing shared memory for the acquisition process.
+1.2 - 18 October 2026 - SampleBuffer epoch/cursor protocol (read_since) so consumers copy only new samples.
+1.3 - 18 October 2026 - SampleBroadcast, single producer ring with a cursor and overflow counter per subscriber.
+1.4 - 18 October 2026 - PackedRun, int16 codes + int64 ns storage for finished runs (prev_data) with computed rows.
+1.5 - 18 October 2026 - AreaIndex, trapezoidal prefix integral over t for O(1) range areas.
+1.6 - 18 October 2026 - SampleBuffer read-only views (frozen_view) with copy-on-write for in-place writers (writable_view).
+                        AreaIndex.cumulative_view.
+1.7 - 18 October 2026 - SampleBuffer readers safe alongside one appender (length read before storage, grow_ order).
+1.8 - 18 October 2026 - AreaIndex keeps cum in capacity doubling storage, extend_ is O(k) instead of O(n).
+1.9 - 18 October 2026 - SharedSampleRing claims blocks before writing them (torn reads dropped), optional ordering lock.
+1.10 - 18 October 2026 - PackedRun keeps t and dt as float64 unless they round trip exactly, as it already did for volts.
+1.11 - 18 October 2026 - SampleBroadcast claims blocks before writing them, read_ drops the columns they may have torn.
+1.12 - 18 October 2026 - PackedRun keeps volts of code +32768 (outside int16) as float64 instead of clipping them.
+'''
+
+import time
+import threading
+import tracemalloc
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+class SampleBuffer:
+    '''
+    Columns are samples and rows follow GC.indices, same layout as the old curr_data array.
+    Storage is allocated in chunks and the capacity doubles whenever it fills, so appends are amortized O(1).
+    Consumers keep an (epoch, cursor) pair and pull only what was appended since, see read_since. The epoch changes
+    whenever existing samples are replaced or modified (set_, set_w_ref_, clear_, touch_).
+    frozen_view hands out read-only views without copying. Once one is out, the next writer to existing samples
+    (writable_view, set_) first moves the buffer to fresh storage (copy-on-write), so those views keep the values
+    they were taken with. Appends only write past every view's end and never copy.
+    Readers may run alongside one appender without a common lock (gc_sync.RWLock read/append modes): appends write the
+    samples (into new storage when growing) before publishing the new length, and readers take the length before the
+    storage, so every view is a consistent prefix. Everything else that changes the buffer needs exclusive access.
+    Modification functions: append_, extend_, set_, set_w_ref_, clear_, grow_, touch_, own_
+    Getters: view, frozen_view, writable_view, read_since, get_epoch, get_dims, get_capacity, __len__
+    '''
+
+    #@param: dims = number of rows (one per index in GC.indices)
+    #@param: chunk = initial number of columns allocated
+    def __init__(self, dims, chunk=1024):
+        self.dims = dims
+        self.chunk = chunk
+
+        self.data = np.zeros((dims, chunk))
+        self.length = 0
+        self.epoch = 0
+        # True while read-only views of the current storage may be held by someone
+        self.shared = False
+
+    #@description: Appends a single sample (column) of length dims.
+    def append_(self, sample):
+        n = self.length
+        if n == self.data.shape[1]:
+            self.grow_(n + 1)
+
+        self.data[:, n] = sample
+        self.length = n + 1
+
+    #@description: Appends a (dims, k) block of samples in one copy.
+    def extend_(self, block):
+        k = block.shape[1]
+        n = self.length
+        if n + k > self.data.shape[1]:
+            self.grow_(n + k)
+
+        self.data[:, n:n + k] = block
+        self.length = n + k
+
+    #@description: Copies d into the buffer, replacing the current contents.
+    def set_(self, d):
+        k = d.shape[1]
+        if k > self.data.shape[1] or self.shared:
+            self.data = np.zeros((self.dims, max(k, self.chunk)))
+            self.shared = False
+
+        self.data[:, :k] = d
+        self.length = k
+        self.epoch += 1
+
+    #@description: Uses d itself as the storage. The next append past its end reallocates, so d is never written by appends.
+    def set_w_ref_(self, d):
+        self.data = d
+        self.length = d.shape[1]
+        self.epoch += 1
+        self.shared = False
+
+    #@description: Drops all samples. Fresh storage is allocated so views/references handed out earlier are left untouched.
+    def clear_(self):
+        self.data = np.zeros((self.dims, self.chunk))
+        self.length = 0
+        self.epoch += 1
+        self.shared = False
+
+    #@description: Call after writing into a view() in place, so consumers re-read everything.
+    def touch_(self):
+        self.epoch += 1
+
+    #@description: Doubles the capacity until at least min_cap columns fit.
+    def grow_(self, min_cap):
+        cap = max(self.data.shape[1], self.chunk)
+        while cap < min_cap:
+            cap *= 2
+
+        _new = np.zeros((self.dims, cap))
+        _n = self.length
+        _new[:, :_n] = self.data[:, :_n]
+        # Before the swap: a reader that sees _new marks it shared after this
+        self.shared = False
+        self.data = _new
+
+    #@description: Copy-on-write: moves to a private copy of the storage if read-only views of it are out.
+    def own_(self):
+        if self.shared:
+            self.data = np.copy(self.data)
+            self.shared = False
+
+    #@returns: (dims, len) view of the stored samples. No copy.
+    def view(self):
+        _n = self.length
+        return self.data[:, :_n]
+
+    #@returns: (dims, len) read-only view of the stored samples. No copy; later writes do not show through (own_).
+    def frozen_view(self):
+        _n = self.length
+        _v = self.data[:, :_n]
+        _v.flags.writeable = False
+        self.shared = True
+        return _v
+
+    #@returns: (dims, len) view for writing in place, after own_. Call touch_ when done.
+    def writable_view(self):
+        self.own_()
+        return self.data[:, :self.length]
+
+    #@description: Delta read. Copies only the samples appended since (epoch, cursor), or everything if epoch is stale.
+    #@param: epoch, cursor = values returned by the previous call. Start with (-1, 0).
+    #@returns: (copy of new samples, epoch, cursor). A returned epoch different from the one passed in means the
+    #           block is the whole buffer and should replace, not extend, the consumer's copy.
+    def read_since(self, epoch, cursor):
+        if epoch != self.epoch:
+            cursor = 0
+
+        _n = self.length
+        _b = np.copy(self.data[:, cursor:_n])
+        return (_b, self.epoch, _n)
+
+    def get_epoch(self):
+        return self.epoch
+
+    def get_dims(self):
+        return self.dims
+
+    def get_capacity(self):
+        return self.data.shape[1]
+
+    def __len__(self):
+        return self.length
+
+class SharedSampleRing:
+    '''
+    Fixed capacity ring of samples in multiprocessing shared memory. One process writes, any number of processes read.
+    Header (int64): [samples ever written, dims, capacity, samples claimed]. Data: (dims, capacity) float64, column =
+    sample. Readers keep their own cursor (samples read so far) and pull only what was written since, see read_since.
+    write_ claims a block (the columns it is about to overwrite) before writing it and publishes it after, so a
+    reader can tell which part of its copy a block still being written may have torn.
+    Ordering: a reader must see the data stores of a block before its count. x86 keeps stores in program order, but
+    weakly ordered CPUs (ARM, e.g. the Raspberry Pi) do not, and numpy has no fences. Give every process the same
+    multiprocessing lock: the claim and count are then stored and loaded under it, and each acquire/release orders
+    the data copies around them. Without a lock the ring relies on the CPU's store order.
+    Modification functions: write_, set_header_, close_, unlink_
+    Getters: read_since, get_header, get_count, get_name, get_dims, get_capacity
+    '''
+
+    #@param: dims, capacity = ring shape. Only needed when creating, attaching reads them from the header.
+    #@param: name = shared memory block to attach to. None creates a new block.
+    #@param: readonly = map header and data without write access (readers)
+    #@param: lock = multiprocessing lock shared by the writer and the readers (see Ordering above), or None
+    def __init__(self, dims=0, capacity=0, name=None, readonly=False, lock=None):
+        _hdr = 4 * 8
+        self.lock = lock
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=_hdr + 8 * dims * capacity)
+            self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = (0, dims, capacity, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+
+        self.dims = int(self.header[1])
+        self.capacity = int(self.header[2])
+        self.data = np.ndarray((self.dims, self.capacity), dtype=np.float64, buffer=self.shm.buf, offset=_hdr)
+
+        if readonly:
+            self.header.flags.writeable = False
+            self.data.flags.writeable = False
+
+    #@description: Writes a (dims, k) block. The count is published after the data, so readers never see a partial block.
+    #               The claim goes first, so readers drop the samples the block is overwriting (read_since).
+    def write_(self, block):
+        cap = self.capacity
+        count = int(self.header[0])
+        k = block.shape[1]
+        self.set_header_(3, count + k)
+
+        # Only the newest capacity samples survive anyway
+        _b = block[:, -cap:]
+        _k = _b.shape[1]
+        _s = (count + k - _k) % cap
+        _first = min(_k, cap - _s)
+
+        self.data[:, _s:_s + _first] = _b[:, :_first]
+        self.data[:, :_k - _first] = _b[:, _first:]
+
+        self.set_header_(0, count + k)
+
+    #@description: Stores header entry i, under the lock if there is one.
+    def set_header_(self, i, value):
+        if self.lock is None:
+            self.header[i] = value
+        else:
+            with self.lock:
+                self.header[i] = value
+
+    #@returns: header entry i, loaded under the lock if there is one
+    def get_header(self, i):
+        if self.lock is None:
+            return int(self.header[i])
+        with self.lock:
+            return int(self.header[i])
+
+    #@description: Copies out every sample written since cursor.
+    #@param: cursor = number of samples this reader has already consumed (0 at start)
+    #@returns: ((dims, n) copy of new samples, new cursor, number of samples lost because the writer lapped this reader)
+    def read_since(self, cursor):
+        cap = self.capacity
+        count = self.get_header(0)
+
+        lost = 0
+        if count - cursor > cap:
+            lost = count - cap - cursor
+            cursor = count - cap
+
+        n = count - cursor
+        _s = cursor % cap
+        _first = min(n, cap - _s)
+
+        out = np.empty((self.dims, n))
+        out[:, :_first] = self.data[:, _s:_s + _first]
+        out[:, _first:] = self.data[:, :n - _first]
+
+        # The writer may have lapped the oldest columns while they were being copied: published blocks, and the one
+        # it claimed and may be writing right now. Its count has not moved yet, so only the claim shows it.
+        _after = self.get_header(3)
+        if _after - cursor > cap:
+            _drop = min(_after - cap - cursor, n)
+            out = out[:, _drop:]
+            lost += _drop
+
+        return (out, count, lost)
+
+    def get_count(self):
+        return self.get_header(0)
+
+    def get_name(self):
+        return self.shm.name
+
+    def get_dims(self):
+        return self.dims
+
+    def get_capacity(self):
+        return self.capacity
+
+    #@description: Unmaps this process' view. Call in every process that opened the ring.
+    def close_(self):
+        self.header = None
+        self.data = None
+        self.shm.close()
+
+    #@description: Frees the shared memory block. Call once, in the process that created it, after close_.
+    def unlink_(self):
+        self.shm.unlink()
+
+class SampleBroadcast:
+    '''
+    Fixed capacity ring of live samples for any number of consumers in this process (plot, autosave, peak detection, ...).
+    One producer publishes; every subscriber has its own cursor and overflow counter. Publishing never waits for a
+    consumer: a subscriber that falls more than capacity samples behind loses the oldest ones and the loss is counted
+    against that subscriber only. Same cursor and claim protocol as SharedSampleRing: publish_ claims a block before
+    writing it and publishes it after, and read_ drops the columns of its copy the producer may have overwritten.
+    Modification functions: publish_, subscribe_, unsubscribe_
+    Getters: read_, get_lost, get_count, get_subscribers, get_dims, get_capacity
+    '''
+
+    #@param: dims = number of rows (one per index in GC.indices)
+    #@param: capacity = samples kept for subscribers that are behind
+    def __init__(self, dims, capacity=65536):
+        self.dims = dims
+        self.capacity = capacity
+
+        self.data = np.zeros((dims, capacity))
+        self.count = 0
+        self.claim = 0
+
+        # sid: [name, cursor, lost]. The lock only covers the table, publish_ never takes it.
+        self.subs = {}
+        self.next_sid = 0
+        self.subs_lock = threading.Lock()
+
+    #@description: Writes a (dims, k) block. The count is published after the data, so readers never see a partial block.
+    #               The claim goes first, so readers drop the samples the block is overwriting (read_).
+    def publish_(self, block):
+        cap = self.capacity
+        count = self.count
+        k = block.shape[1]
+        self.claim = count + k
+
+        _b = block[:, -cap:]
+        _k = _b.shape[1]
+        _s = (count + k - _k) % cap
+        _first = min(_k, cap - _s)
+
+        self.data[:, _s:_s + _first] = _b[:, :_first]
+        self.data[:, :_k - _first] = _b[:, _first:]
+
+        self.count = count + k
+
+    #@description: Adds a subscriber that receives every sample published from now on.
+    #@param: name = label used by get_subscribers
+    #@returns: subscriber id for read_, get_lost and unsubscribe_
+    def subscribe_(self, name):
+        with self.subs_lock:
+            sid = self.next_sid
+            self.next_sid += 1
+            self.subs[sid] = [name, self.count, 0]
+
+        return sid
+
+    def unsubscribe_(self, sid):
+        with self.subs_lock:
+            self.subs.pop(sid, None)
+
+    #@description: Copies out every sample published since this subscriber's last read and advances its cursor.
+    #               Only the subscriber itself should call this for its sid.
+    #@returns: ((dims, n) copy of new samples, number of samples lost since the last read)
+    def read_(self, sid):
+        sub = self.subs[sid]
+        cap = self.capacity
+        count = self.count
+        cursor = sub[1]
+
+        lost = 0
+        if count - cursor > cap:
+            lost = count - cap - cursor
+            cursor = count - cap
+
+        n = count - cursor
+        _s = cursor % cap
+        _first = min(n, cap - _s)
+
+        out = np.empty((self.dims, n))
+        out[:, :_first] = self.data[:, _s:_s + _first]
+        out[:, _first:] = self.data[:, :n - _first]
+
+        # The producer may have lapped the oldest columns while they were being copied: published blocks, and the one
+        # it claimed and may be writing right now. Its count has not moved yet, so only the claim shows it.
+        _after = self.claim
+        if _after - cursor > cap:
+            _drop = min(_after - cap - cursor, n)
+            out = out[:, _drop:]
+            lost += _drop
+
+        sub[1] = count
+        sub[2] += lost
+        return (out, lost)
+
+    #@returns: total samples this subscriber has lost to overflow
+    def get_lost(self, sid):
+        return self.subs[sid][2]
+
+    def get_count(self):
+        return self.count
+
+    #@returns: list of (sid, name, samples behind, samples lost)
+    def get_subscribers(self):
+        with self.subs_lock:
+            _c = self.count
+            return [(_sid, _s[0], _c - _s[1], _s[2]) for _sid, _s in self.subs.items()]
+
+    def get_dims(self):
+        return self.dims
+
+    def get_capacity(self):
+        return self.capacity
+
+class AreaIndex:
+    '''
+    Trapezoidal prefix integral of v over the real t axis: cum[i] is the area from t[0] to t[i].
+    The area between any two indices is cum[high] - cum[low], so queries are O(1) (and vectorized over arrays of
+    indices) instead of a cumsum per call. extend_ adds appended samples without touching the rest, into storage
+    that doubles its capacity when full (like SampleBuffer), so growing a run by k samples costs O(k) amortized.
+    Only entries past the current length are ever written, so views handed out earlier stay valid.
+    Modification functions: extend_, grow_
+    Getters: view, area, total, get_cumulative, cumulative_view, get_capacity, __len__
+    '''
+
+    #@param: t, v = time and voltage rows
+    #@param: chunk = initial capacity
+    def __init__(self, t, v, chunk=1024):
+        self.chunk = chunk
+        self.cum = np.zeros(max(len(t), chunk))
+        self.length = 0
+        self.t_last = 0.0
+        self.v_last = 0.0
+
+        self.extend_(t, v)
+
+    #@description: Appends samples that followed the ones already indexed.
+    def extend_(self, t, v):
+        if len(t) == 0:
+            return
+
+        _n = self.length
+        if _n == 0:
+            _t = t
+            _v = v
+            _c0 = 0.0
+        else:
+            _t = np.concatenate(([self.t_last], t))
+            _v = np.concatenate(([self.v_last], v))
+            _c0 = self.cum[_n - 1]
+
+        _steps = np.diff(_t) * (_v[1:] + _v[:-1]) * 0.5
+        _end = _n + len(t)
+        if _end > len(self.cum):
+            self.grow_(_end)
+
+        if _n == 0:
+            self.cum[0] = 0.0
+            np.cumsum(_steps, out=self.cum[1:_end])
+        else:
+            np.cumsum(_steps, out=self.cum[_n:_end])
+            self.cum[_n:_end] += _c0
+        # Length last: a reader never sees entries that are not written yet
+        self.length = _end
+
+        self.t_last = t[-1]
+        self.v_last = v[-1]
+
+    #@description: Doubles the capacity until it holds min_cap entries.
+    def grow_(self, min_cap):
+        cap = max(len(self.cum), self.chunk)
+        while cap < min_cap:
+            cap *= 2
+
+        _new = np.zeros(cap)
+        _new[:self.length] = self.cum[:self.length]
+        self.cum = _new
+
+    #@returns: view of the running area (same length as t), no copy
+    def view(self):
+        _n = self.length
+        return self.cum[:_n]
+
+    #@param: low, high = indices (ints or equal length arrays)
+    #@returns: area between t[low] and t[high], same shape as low/high
+    def area(self, low, high):
+        _c = self.view()
+        return _c[high] - _c[low]
+
+    #@returns: area of the whole run
+    def total(self):
+        if self.length == 0:
+            return 0.0
+        return self.cum[self.length - 1]
+
+    #@returns: copy of the running area (same length as t)
+    def get_cumulative(self):
+        return np.copy(self.view())
+
+    #@returns: read-only view of the running area, no copy
+    def cumulative_view(self):
+        _c = self.view()
+        _c.flags.writeable = False
+        return _c
+
+    def get_capacity(self):
+        return len(self.cum)
+
+    def __len__(self):
+        return self.length
+
+class PackedRun:
+    '''
+    Compact copy of a finished run for prev_data. Voltage is kept as the raw int16 ADS1115 codes plus the volts per code
+    of the gain they were read with, time as int64 nanoseconds. dt is derived from t and the area row is only stored when
+    it is not all zeros, so a sample of a raw single-rate run (what block_to_data makes) takes 10 bytes instead of the 32
+    of a float64 (4, N) array.
+    Every row is checked to round trip bit for bit and is kept as float64 where it does not, so packing never loses
+    data: volts that are not whole codes (decimated runs, or after normalize_volt_) take 8 bytes, as do times that are
+    not whole nanoseconds and dt rows that are not the differences of t (e.g. runs loaded from a session), so such
+    runs save little or nothing.
+    The rows of the old array are still available as computed arrays: get_volt, get_area, get_time, get_dt, run[index],
+    and np.asarray(run) / to_data rebuild the full (dims, N) array.
+    Getters: get_volt, get_area, get_time, get_dt, get_gain, is_raw, to_data, get_nbytes, __getitem__, __len__
+    '''
+
+    #@param: d = (dims, N) array ordered by indices
+    #@param: indices = GC.indices
+    #@param: gain = ADS1115 gain the voltages were read with
+    #@param: volts_per_code = full scale range / 32768 for that gain
+    def __init__(self, d, indices, gain, volts_per_code):
+        self.indices = indices
+        self.dims = d.shape[0]
+        self.length = d.shape[1]
+        self.gain = gain
+        self.volts_per_code = volts_per_code
+
+        v = d[indices['v']]
+        codes = np.rint(v / volts_per_code)
+        if np.all((codes >= -32768) & (codes <= 32767)) and np.array_equal(codes * volts_per_code, v):
+            self.codes = codes.astype(np.int16)
+            self.volt = None
+        else:
+            self.codes = None
+            self.volt = np.copy(v)
+
+        t = d[indices['t']]
+        t_ns = np.rint(t * 1e9).astype(np.int64)
+        if np.array_equal(t_ns * 1e-9, t):
+            self.t_ns = t_ns
+            self.time = None
+        else:
+            self.t_ns = None
+            self.time = np.copy(t)
+
+        # dt as block_to_data makes it: differences of t, the first one from the previous block
+        self.dt0 = d[indices['dt'], 0] if self.length > 0 else 0.0
+        self.dt = None
+        dt = d[indices['dt']]
+        if not np.array_equal(self.get_dt(), dt):
+            self.dt = np.copy(dt)
+
+        a = d[indices['a']]
+        self.area = np.copy(a) if np.any(a) else None
+
+    def get_volt(self):
+        if self.codes is None:
+            return np.copy(self.volt)
+        return self.codes * self.volts_per_code
+
+    def get_area(self):
+        if self.area is None:
+            return np.zeros(self.length)
+        return np.copy(self.area)
+
+    def get_time(self):
+        if self.t_ns is None:
+            return np.copy(self.time)
+        return self.t_ns * 1e-9
+
+    def get_dt(self):
+        if self.dt is not None:
+            return np.copy(self.dt)
+        dt = np.empty(self.length)
+        if self.length > 0:
+            dt[0] = self.dt0
+            dt[1:] = np.diff(self.get_time())
+        return dt
+
+    def get_gain(self):
+        return self.gain
+
+    #@returns: True if voltage is stored as raw codes
+    def is_raw(self):
+        return self.codes is not None
+
+    #@returns: (dims, N) float64 array ordered by indices, same as the array the run was packed from
+    def to_data(self):
+        d = np.zeros((self.dims, self.length))
+        _ind = self.indices
+        d[_ind['v']] = self.get_volt()
+        d[_ind['a']] = self.get_area()
+        d[_ind['t']] = self.get_time()
+        d[_ind['dt']] = self.get_dt()
+        return d
+
+    #@returns: bytes held by the arrays of this run
+    def get_nbytes(self):
+        _n = 0
+        for _a in (self.codes, self.volt, self.t_ns, self.time, self.dt, self.area):
+            if _a is not None:
+                _n += _a.nbytes
+        return _n
+
+    #@returns: row i (an index from indices) as a computed array, like data[i] on the unpacked array
+    def __getitem__(self, i):
+        _ind = self.indices
+        if i == _ind['v']:
+            return self.get_volt()
+        elif i == _ind['a']:
+            return self.get_area()
+        elif i == _ind['t']:
+            return self.get_time()
+        elif i == _ind['dt']:
+            return self.get_dt()
+        return self.to_data()[i]
+
+    def __array__(self, dtype=None, copy=None):
+        d = self.to_data()
+        if dtype is not None:
+            d = d.astype(dtype)
+        return d
+
+    @property
+    def shape(self):
+        return (self.dims, self.length)
+
+    def __len__(self):
+        return self.length
+
+#@description: Times appends into a single SampleBuffer and reports the average cost within each decade of length.
+def benchmark_appends(max_pts=10**7, dims=4):
+    buf = SampleBuffer(dims)
+    sample = np.zeros(dims)
+
+    print('SampleBuffer.append_ (dims = {:d})'.format(dims))
+    print('{:>12s} {:>16s} {:>16s}'.format('samples', 'ns/append', 'capacity'))
+
+    n = 0
+    checkpoint = 1000
+    t_start = time.perf_counter_ns()
+    while checkpoint <= max_pts:
+        while n < checkpoint:
+            sample[0] = n
+            buf.append_(sample)
+            n += 1
+
+        t_end = time.perf_counter_ns()
+        _span = checkpoint - checkpoint // 10 if checkpoint > 1000 else checkpoint
+        _ns = (t_end - t_start) / _span
+        print('{:>12d} {:>16.1f} {:>16d}'.format(checkpoint, _ns, buf.get_capacity()))
+
+        t_start = time.perf_counter_ns()
+        checkpoint *= 10
+
+#@description: Same measurement with the old np.append pattern. Quadratic, so it is capped well below the buffer benchmark.
+def benchmark_np_append(max_pts=10**5, dims=4):
+    old = np.zeros((dims, 0))
+
+    print('np.append (dims = {:d})'.format(dims))
+    print('{:>12s} {:>16s}'.format('samples', 'ns/append'))
+
+    n = 0
+    checkpoint = 1000
+    t_start = time.perf_counter_ns()
+    while checkpoint <= max_pts:
+        while n < checkpoint:
+            new = np.zeros((dims, 1))
+            new[0] = n
+            old = np.append(old, new, axis=1)
+            n += 1
+
+        t_end = time.perf_counter_ns()
+        _span = checkpoint - checkpoint // 10 if checkpoint > 1000 else checkpoint
+        _ns = (t_end - t_start) / _span
+        print('{:>12d} {:>16.1f}'.format(checkpoint, _ns))
+
+        t_start = time.perf_counter_ns()
+        checkpoint *= 10
+
+#@description: Peak memory allocated (tracemalloc) and time of the copying accessor pattern GC used before and of
+#               views with in-place writes: reading the run, normalizing the voltage row, and normalizing while a
+#               read-only view is held (one copy-on-write of the storage).
+def benchmark_views(n=10**6, dims=4):
+    buf = SampleBuffer(dims)
+    _rng = np.random.default_rng(0)
+    buf.extend_(np.vstack((_rng.random(n), np.zeros(n), np.arange(n) / 860, np.full(n, 1 / 860))))
+    _span = buf.view()[2, -1] - buf.view()[2, 0]
+
+    def read_copy():
+        return np.copy(buf.view())
+
+    def read_view():
+        return buf.frozen_view()
+
+    def normalize_copy():
+        v = np.copy(buf.view()[0])
+        _min = v.min()
+        v = v - _min
+        v = v / (v.sum() / n * _span)
+        v = abs(v)
+        buf.view()[0] = np.copy(v)
+
+    def normalize_in_place():
+        v = buf.writable_view()[0]
+        _min = v.min()
+        v -= _min
+        v /= v.sum() / n * _span
+        np.abs(v, out=v)
+        buf.touch_()
+
+    def normalize_held_view():
+        _held = buf.frozen_view()
+        normalize_in_place()
+
+    print('{:d} samples, {:d} rows ({:.1f} MB)'.format(n, dims, buf.view().nbytes / 1e6))
+    for name, func in (('read, copy', read_copy), ('read, frozen_view', read_view),
+                        ('normalize, copies', normalize_copy), ('normalize, in place', normalize_in_place),
+                        ('normalize, view held', normalize_held_view)):
+        buf.own_()
+        tracemalloc.start()
+        t_start = time.perf_counter()
+        _r = func()
+        t_end = time.perf_counter()
+        _peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{:<22s} {:8.2f} MB peak  {:7.2f} ms'.format(name, _peak / 1e6, (t_end - t_start) * 1e3))
+
+if __name__ == '__main__':
+    benchmark_appends()
+    print()
+    benchmark_np_append()
+    print()
+    benchmark_views()
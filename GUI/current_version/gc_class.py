@@ -21,6 +21,33 @@ Version:
 3.1 - 25 April 2020 - Functions to split into peaks, calculate the area of each region, and get the maximum.
 3.2 - 27 April 2020 - Moving mean works. Fixed indices.
 4.0 - 27 April 2020 - Finalized for capstone project submission. Pydocs final. Moved to main.py (=> .exe/bin)
+4.1 - 18 October 2026 - curr_data lives in a preallocated SampleBuffer (gc_buffer.py). append_curr_data_ replaces np.append per sample.
+4.2 - 18 October 2026 - Continuous conversion mode paced by ALERT/RDY (start_continuous_, read_conversions_), up to 860 SPS.
+4.3 - 18 October 2026 - read_block returns raw int16 codes and int64 ns timestamps as numpy arrays. block_to_data vectorizes volts/t/dt.
+4.4 - 18 October 2026 - Multi-channel scan over P0-P3/differential pairs (set_scan_list_, start_scan_) with a buffer per channel.
+4.5 - 18 October 2026 - GCAcquisitionProcess samples in its own process into shared memory rings (start_acquisition_process_).
+4.6 - 18 October 2026 - Acquisition process paced by DeadlineScheduler (gc_scheduler.py).
+4.7 - 18 October 2026 - get_curr_data_since for delta reads. In-place setters bump the buffer epoch.
+4.8 - 18 October 2026 - Sample bus (SampleBroadcast): every new sample is published to subscribers with their own cursors.
+4.9 - 18 October 2026 - prev_data runs packed as int16 codes + int64 ns timestamps (pack_run, gc_buffer.PackedRun).
+4.10 - 18 October 2026 - Oversample and decimate (set_decimation_, decimate_block) with streaming filters from gc_filter.py.
+4.11 - 18 October 2026 - break_into_peaks segmentation vectorized (define_peaks), same (low, high) output as the loop.
+4.12 - 18 October 2026 - analyze_peaks: one normalize/copy/segment pass into a PEAK_DTYPE structured table.
+4.13 - 18 October 2026 - Cached trapezoidal area index over t (get_area_index) behind integrate_volt, normalize_volt_, peak areas.
+4.14 - 18 October 2026 - integrate is trapezoidal over t and takes arrays of ranges. integrate_ranges batches over curr_data.
+4.15 - 18 October 2026 - PEAK_DTYPE moved to gc_peaks.py (shared with the online detector).
+4.16 - 18 October 2026 - smooth_ (mean/ema/savgol) with gc_filter smoothers. mov_mean_ uses the running-sum MovingMean.
+4.17 - 18 October 2026 - 'mad' peak threshold mode (set_peak_threshold_): rolling MAD noise on raw volts, no normalize pass.
+4.18 - 18 October 2026 - Non-destructive baseline correction (set_baseline_, get_baseline) for peaks and integrate_ranges.
+4.19 - 18 October 2026 - deconvolve_peaks: Gaussian/EMG component fits per peak region (gc_fit.py), one area per component.
+4.20 - 18 October 2026 - Selectable peak detector (set_peak_detector_, find_peaks): threshold, Savitzky-Golay derivatives or CWT ridges.
+4.21 - 18 October 2026 - Memoized processing pipeline (gc_pipeline.py). Peak methods read it instead of normalizing curr_data in place.
+4.22 - 18 October 2026 - Zero-copy accessor mode (set_zero_copy_): read-only views, copy-on-write, one in-place write per mutation.
+4.23 - 18 October 2026 - curr_data_lock is a gc_sync.RWLock: readers and acquisition appends no longer wait for each other. Wait counters.
+4.24 - 18 October 2026 - Batch analysis of stored runs (gc_batch.py): analyze_runs gives one peak table keyed by run number.
+4.25 - 18 October 2026 - Retention time alignment of stored runs (gc_align.py): FFT shifts, optional COW, cached per run.
+4.26 - 18 October 2026 - Lock shared with the acquisition process orders the SharedSampleRing stores on ARM.
+4.27 - 18 October 2026 - Runs align to the first run with 2 points by default (get_align_ref), not the empty first frame.
 '''
 
 
@@ -29,6 +56,7 @@ import board
 import busio
 import adafruit_ads1x15.ads1115 as ADS
 from adafruit_ads1x15.analog_in import AnalogIn
+import RPi.GPIO as GPIO
 
 # Extra
 import time
@@ -37,20 +65,63 @@ import time
 import numpy as np
 import matplotlib.pyplot as plt
 
-from threading import Lock
+from threading import Lock, RLock, Event
+import multiprocessing
+
+from gc_buffer import SampleBuffer, SharedSampleRing, SampleBroadcast, PackedRun, AreaIndex
+from gc_scheduler import DeadlineScheduler
+from gc_filter import make_decimator, make_smoother
+from gc_baseline import estimate_baseline
+from gc_fit import FIT_DTYPE, fit_regions
+from gc_peaks import PEAK_DTYPE, noise_thresholds, savgol_peaks, cwt_peaks, threshold_segments, peak_table
+from gc_pipeline import Pipeline, clean_time_step, baseline_step, smooth_step, normalize_step, area_step, normalize_row_
+from gc_sync import RWLock
+from gc_batch import RunBatch, RUN_PEAK_DTYPE, batch_areas, batch_smooth, analyze_batch
+from gc_align import RunAligner
+
+# Spawned (not forked) so the acquisition process inherits no GUI state or threads
+mp_spawn = multiprocessing.get_context('spawn')
+
+# ADS1115 registers and config bits (datasheet SBAS444, section 9.6)
+ADS_POINTER_CONVERSION = 0x00
+ADS_POINTER_CONFIG = 0x01
+ADS_POINTER_LO_THRESH = 0x02
+ADS_POINTER_HI_THRESH = 0x03
+ADS_CONFIG_OS_SINGLE = 0x8000
+ADS_CONFIG_MODE_CONTINUOUS = 0x0000
+ADS_CONFIG_MODE_SINGLE = 0x0100
+ADS_CONFIG_COMP_QUE_ONE = 0x0000
+ADS_CONFIG_GAIN = {2/3: 0x0000, 1: 0x0200, 2: 0x0400, 4: 0x0600, 8: 0x0800, 16: 0x0A00}
+ADS_CONFIG_RATE = {8: 0x0000, 16: 0x0020, 32: 0x0040, 64: 0x0060, 128: 0x0080, 250: 0x00A0, 475: 0x00C0, 860: 0x00E0}
+ADS_DIFF_MUX = {(0, 1): 0, (0, 3): 1, (1, 3): 2, (2, 3): 3}
+ADS_GAIN_FSR = {2/3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
 
 class GC:
     '''
-    Modification functions: clean_time_, normalize_volt_, mov_mean_, curr_to_prev_
-    Math functions: integrate_volt, integrate_volt_direct, break_into_peaks, break_into_peaks_ret_volt_copy,
-                        integrate_peaks, get_peak_local_maximas, calc_cumsum_into_area_
-    helper functions: define_peaks, reint_curr_data_, inc_run_num_, integrate
-    ADS configuration functions: reint_ADS, set_gain, set_mode
-    Lock functions: get_lock, is_locked
-    Getters: get_curr_data, get_volt, get_time
-    Setters: set_curr_data_, set_time_w_ref_, set_volt_, set_time_, set_time_w_ref_, set_area_
+    Modification functions: clean_time_, normalize_volt_, mov_mean_, smooth_, curr_to_prev_
+    Math functions: integrate_volt, integrate_volt_direct, integrate_ranges, break_into_peaks,
+                        break_into_peaks_ret_volt_copy, integrate_peaks, get_peak_local_maximas, calc_cumsum_into_area_,
+                        analyze_peaks, deconvolve_peaks, peak_threshold, find_peaks, is_raw_peak_mode
+    Pipeline functions: set_step_, toggle_step_, get_steps, is_step_enabled, run_pipeline, get_processed_data,
+                        peaks_step, peak_settings
+    Batch functions: get_run_batch, integrate_runs, smooth_runs, analyze_runs
+    Alignment functions: set_alignment_, get_align_ref, align_runs, get_aligned_run, get_aligned_grid
+    helper functions: define_peaks, define_peak_table, reint_curr_data_, inc_run_num_, integrate, pack_run
+    ADS configuration functions: reint_ADS, set_gain, set_mode, start_continuous_, stop_continuous_, write_ADS_register, get_mux_bits
+    Scan functions: set_scan_list_, start_scan_, stop_scan_, on_scan_ready_, read_scan_block, is_scanning, get_scan_rate
+    Acquisition process functions: start_acquisition_process_, stop_acquisition_process_, read_rings_, is_process_running,
+                                    get_ring_lost
+    Broadcast functions: set_bus_size_, subscribe_, unsubscribe_, read_subscription, get_subscription_lost, get_subscribers
+    Lock functions: get_lock, get_read_lock, get_append_lock, is_locked, get_lock_stats
+    Getters: get_curr_data, get_curr_data_since, get_volt, get_time, get_area_index, get_channel_data, get_num_channels,
+                get_peak_threshold_mode, get_baseline, get_corrected_volt, get_peak_area_index, get_baseline_method,
+                get_peak_detector, is_zero_copy
+    Setters: set_curr_data_, set_time_w_ref_, set_volt_, set_time_, set_time_w_ref_, set_area_, append_curr_data_, extend_curr_data_,
+                extend_channel_data_, set_peak_threshold_, set_baseline_, set_fit_, set_peak_detector_, set_zero_copy_
     Printer functions: print_voltage, print_value
-    Measurement functions: measure_voltage, measure_value
+    Measurement functions: measure_voltage, measure_value, read_block, codes_to_volts, block_to_data
+    Continuous mode functions: on_conversion_ready_, is_continuous, get_missed_conversions, set_decimation_, decimate_block,
+                                get_decimation
     '''
 
     #@param: single_ended = True if single ended ADC and vice-versa
@@ -75,8 +146,13 @@ class GC:
         self.dims = 4 #voltage, dt, t
         self.indices = {'v':0,'a':1,'t':2,'dt':3}
 
-        self.curr_data = np.zeros((self.dims, 0))
-        self.curr_data_lock = Lock()
+        # Preallocated, capacity-doubling store. Replaces np.append per sample.
+        self.curr_buffer = SampleBuffer(self.dims)
+        # Read mode for anything that only reads curr_data, append mode for acquisition, write mode (acquire/release,
+        # with) for everything that changes existing samples. Reads and appends do not wait for each other.
+        self.curr_data_lock = RWLock()
+        # Getters return copies, or with zero_copy read-only views (copy-on-write, see set_zero_copy_)
+        self.zero_copy = False
 
         self.prev_data = []
         self.run_num = 0
@@ -87,65 +163,165 @@ class GC:
 
         self.pk_volt_min_after_norm = 0.005
         self.pk_time_min = 10
+        # 'fixed': pk_volt_min_after_norm on normalized volts. 'mad': rolling baseline + pk_noise_sigma local noise
+        # units on raw volts (gc_peaks.noise_thresholds), no normalize pass. A peak ends below pk_noise_off_sigma,
+        # so noise on a flank does not split it, and is kept if its apex reaches pk_noise_min_sigma. Windows in samples.
+        self.pk_threshold_mode = 'fixed'
+        self.pk_noise_sigma = 5.0
+        self.pk_noise_off_sigma = 2.0
+        self.pk_noise_min_sigma = 10.0
+        self.pk_noise_window = 256
+        self.pk_base_window = 4096
+        # 'threshold': define_peaks with the thresholds above. 'savgol': Savitzky-Golay derivative zero crossings,
+        # 'cwt': wavelet ridges (gc_peaks). Both take raw volts and pk_width, the narrowest peak in samples, and use
+        # pk_noise_sigma / pk_noise_off_sigma / the windows above for apex height and peak ends.
+        self.pk_detector = 'threshold'
+        self.pk_width = 25
+
+        # Peak deconvolution (gc_fit.py): component model and worker processes (0/1 fits in this process)
+        self.fit_model = 'gauss'
+        self.fit_processes = 0
+        self.components = np.zeros(0, dtype=FIT_DTYPE)
         self.peaks = []
 
+        # Continuous conversion mode. Conversions are read on ALERT/RDY, see start_continuous_
+        self.continuous = False
+        self.data_rate = 860
+        self.rdy_pin = None
+        self.conv_lock = Lock()
+        self.conv_event = Event()
+        self.conv_codes = []
+        self.conv_times = []
+        self.conv_period_ns = 1e9 / self.data_rate
+        self.conv_t0_ns = 0
+        self.conv_last_ns = 0
+        self.conv_index = -1
+        self.conv_missed = 0
+
+        # Oversample and decimate: continuous conversions pass through a streaming low pass (gc_filter.py), see set_decimation_
+        self.decimation = 1
+        self.decimator = None
+
+        # Multi-channel scan. Entries are a port (single ended) or a (positive, negative) pair (differential).
+        # Channel 0 is the detector and shares curr_buffer, the others get their own buffer.
+        self.scanning = False
+        self.scan_list = []
+        self.scan_configs = []
+        self.scan_index = 0
+        self.scan_count = 0
+        self.scan_t0_ns = 0
+        self.scan_codes = []
+        self.scan_times = []
+        self.scan_read_buf = bytearray(2)
+        self.channel_buffers = [self.curr_buffer]
+        self.prev_channel_data = []
+
+        # Acquisition process. The child owns the ADS and writes one shared memory ring per channel.
+        self.acq_process = None
+        self.acq_stop = None
+        self.acq_ready = None
+        self.ring_lock = None
+        self.rings = []
+        self.ring_cursors = []
+        self.ring_lost = 0
+
+        # Live samples of curr_data for any number of consumers, each with its own cursor (see subscribe_)
+        self.bus = SampleBroadcast(self.dims)
+
+        # Trapezoidal prefix integral of curr_data, rebuilt when curr_buffer's epoch changes (see get_area_index).
+        # Readers share the lock, so the caches below have their own.
+        self.cache_lock = RLock()
+        self.area_index = None
+        self.area_index_version = None
+
+        # Baseline estimate ('als' or 'rollmin', see gc_baseline.py) subtracted on the fly by the peak and range
+        # integration methods. curr_data itself is never changed. Cached like area_index, with the corrected AreaIndex.
+        self.baseline_method = None
+        self.baseline_param = None
+        self.baseline = None
+        self.baseline_index = None
+        self.baseline_version = None
+
+        # Non-destructive processing of curr_data (gc_pipeline.py). The GUI toggles the data steps instead of calling
+        # the in-place modification functions; every stage is cached, see run_pipeline. The peak methods read the
+        # last step, which normalizes by itself when the detector needs it and the normalize step is off.
+        self.pipeline = Pipeline(self.indices)
+        self.pipeline.add_step_('clean_time', clean_time_step)
+        self.pipeline.add_step_('baseline', baseline_step)
+        self.pipeline.add_step_('smooth', smooth_step)
+        self.pipeline.add_step_('normalize', normalize_step)
+        self.pipeline.add_step_('area', area_step)
+        self.pipeline.add_step_('peaks', self.peaks_step, True, settings=None)
+
+        # Stored runs packed into one array (gc_batch.RunBatch), rebuilt when the list of runs changes.
+        # run_peaks is the last combined table from analyze_runs.
+        self.run_batch = None
+        self.run_batch_key = None
+        self.run_batch_runs = []
+        self.run_peaks = np.zeros(0, dtype=RUN_PEAK_DTYPE)
+
+        # Retention time alignment of stored runs to a reference run (gc_align.py), cached per run
+        self.aligner = RunAligner(self.indices)
+
     #@description: Subtracts initial time from all time points => t[0] = 0
     def clean_time_(self):
         if self.run_num > 0:
             to = self.time_out
             _e = self.curr_data_lock.acquire(to)
-            t = self.get_time()
+            if len(self.curr_buffer) > 0:
+                t = self.curr_buffer.writable_view()[self.indices['t']]
+                t -= t[0]
+                self.curr_buffer.touch_()
             _e = self.curr_data_lock.release()
 
-            t = t - t[0]
-
-            _e = self.curr_data_lock.acquire(to)
-            self.set_time_(t)
-            _e = self.curr_data_lock.release()
-
-    #@description: Calculates the cumulative sum of the voltage at each point and stores the result in area.
+    #@description: Stores the running area of the voltage over time (trapezoidal, from the area index) in area.
     def calc_cumsum_into_area_(self):
         to = self.time_out
         #ignore err for now
         _e = self.curr_data_lock.acquire(to)
-        voltage = self.get_volt()
-        _e = self.curr_data_lock.release()
-
-        cs = np.cumsum(voltage)
-
-        _e = self.curr_data_lock.acquire(to)
-        self.set_area_(cs)
+        cs = self.get_area_index().cumulative_view()
+        self.set_area_(cs[:len(self.curr_buffer)])
         _e = self.curr_data_lock.release()
 
-    #@description: Normalizes (integral[voltage] = 1 & min[voltage] = 0) the voltage in place.
+    #@description: Normalizes (integral[voltage] = 1 & min[voltage] = 0) the voltage in place: one pass of in-place
+    #               arithmetic on the voltage row under the lock, no copies (copy-on-write if views are out).
     def normalize_volt_(self):
         to = self.time_out
         #ignore error for now
         _e = self.curr_data_lock.acquire(to)
-        volt = self.get_volt()
+        if len(self.curr_buffer) > 0:
+            t = self.curr_buffer.view()[self.indices['t']]
+            _span = t[-1] - t[0]
+            _ai = self.get_area_index()
+
+            volt = self.curr_buffer.writable_view()[self.indices['v']]
+            _min = volt.min()
+
+            # Area of (volt - min) straight from the index, no new cumsum
+            _area = _ai.total() - _min * _span
+            volt -= _min
+            volt /= _area
+            np.abs(volt, out=volt)
+            self.curr_buffer.touch_()
         _e = self.curr_data_lock.release()
 
-        _min = volt.min()
-        volt = volt - _min
-
-        _area = self.integrate_volt_direct(volt)
-        volt = volt / _area
-
-        volt = abs(volt)
-
-        _e = self.curr_data_lock.acquire(to)
-        self.set_volt_(volt)
-        _e = self.curr_data_lock.release()
-
-    #@description: Applies moving mean of window size given to voltage via convolution
+    #@description: Applies moving mean of window size given to voltage. Running sum (gc_filter.MovingMean), same
+    #               result as np.convolve(mode='same') in O(n) instead of O(n * window).
     #@param: window size
     def mov_mean_(self, window):
+        self.smooth_('mean', window)
+
+    #@description: Smooths voltage in place with a gc_filter smoother, the batch counterpart of the live ones.
+    #@param: kind = 'mean', 'ema' or 'savgol' (see gc_filter.make_smoother)
+    #@param: window size
+    def smooth_(self, kind, window):
         to = self.time_out
-        _e = self.curr_data_lock.acquire(to)
-        volt = self.get_volt()
-        _e = self.curr_data_lock.release()
+        # Read straight from the buffer: only the GC's own setters rewrite existing samples
+        _e = self.curr_data_lock.acquire_read(to)
+        volt = self.curr_buffer.view()[self.indices['v']]
+        _e = self.curr_data_lock.release_read()
 
-        volt = np.convolve(volt, np.ones((window,))/window, mode='same')
+        volt = make_smoother(kind, window).filter(volt)
 
         _e = self.curr_data_lock.acquire(to)
         self.set_volt_(volt)
@@ -153,70 +329,62 @@ class GC:
 
     #@description: Appends current data copy to previoius data list and sets current data back to zero vector.
     def curr_to_prev_(self):
-        _l = self.curr_data_lock
+        _l = self.curr_data_lock.reader
         with _l:
             _d = self.get_curr_data()
+            _cd = [self.get_channel_data(i) for i in range(1, self.get_num_channels())]
 
-        self.prev_data.append(_d)
+        self.prev_data.append(self.pack_run(_d))
+        self.prev_channel_data.append([self.pack_run(_c) for _c in _cd])
         self.reint_curr_data_()
 
-    #@returns: int or float that is the area of voltage, including negatives
+    #@returns: int or float that is the area of voltage over time, including negatives
     def integrate_volt(self):
         to = self.time_out
         #ignore err for now
-        _e = self.curr_data_lock.acquire(to)
-        voltage = self.get_volt()
-        _e = self.curr_data_lock.release()
+        _e = self.curr_data_lock.acquire_read(to)
+        _ai = self.get_area_index()
+        _e = self.curr_data_lock.release_read()
 
-        if len(voltage) != 0:
-            _l = 0
-            _h = -1
-            _a = self.integrate(voltage, _l, _h)
+        if len(_ai) != 0:
+            _a = _ai.total()
             return _a
         else:
             print("No data")
 
     #@param: directly given voltage vector
+    #@param: t = time of each voltage point. None integrates over the sample index.
     #@returns: int or float that is the area of voltage, including negatives
-    def integrate_volt_direct(self, voltage):
+    def integrate_volt_direct(self, voltage, t=None):
         if len(voltage) != 0:
             _l = 0
             _h = -1
-            _a = self.integrate(voltage, _l, _h)
+            _a = self.integrate(voltage, _l, _h, t)
             return _a
         else:
             print("No data")
 
-    #@description: Breaks the voltage vector into potential peaks. Simple and untested algorithm.
-    #@returns: List of tuples of start and end index (both inclusive) of peaks
-    def break_into_peaks(self):
-        ep = self.epsilon
-        if abs(self.integrate_volt() - 1.0 ) > ep:
-            self.normalize_volt_()
+    #@description: Areas of the current voltage over time for a batch of index ranges in one call (see get_area_index).
+    #@param: lows, highs = equal length sequences of start and end indices (inclusive)
+    #@returns: numpy array of areas between t[lows[i]] and t[highs[i]]
+    def integrate_ranges(self, lows, highs):
         to = self.time_out
         #ignore err for now
-        _e = self.curr_data_lock.acquire(to)
-        volt = self.get_volt()
-        _e = self.curr_data_lock.release()
+        _e = self.curr_data_lock.acquire_read(to)
+        _ai = self.get_peak_area_index()
+        _e = self.curr_data_lock.release_read()
 
-        volt_thresh = self.pk_volt_min_after_norm
-        time_thresh = self.pk_time_min
+        _l = np.asarray(lows, dtype=np.int64)
+        _h = np.asarray(highs, dtype=np.int64)
+        areas = _ai.area(_l, _h)
 
-        peaks = []
+        return areas
 
-        num_pts = len(volt)
-        on_peak = False
-        low = 0
-        for i in range(0, num_pts):
-            if not on_peak:
-                if volt[i] >= volt_thresh:
-                    on_peak = True
-                    low = i
-            else:
-                if volt[i] <= volt_thresh:
-                    on_peak = False
-                    if i - low >= time_thresh:
-                        peaks.append((low, i))
+    #@description: Breaks the voltage vector into potential peaks. Simple and untested algorithm.
+    #@returns: List of tuples of start and end index (both inclusive) of peaks
+    def break_into_peaks(self):
+        table, volt = self.run_pipeline('peaks')
+        peaks = list(zip(table['start'].tolist(), table['end'].tolist()))
 
         return peaks
 
@@ -224,80 +392,389 @@ class GC:
     #@returns: List of tuples of start and end index (both inclusive) of peaks
     #@returns: Copy of voltage vector to save a little time in parent method.
     def break_into_peaks_ret_volt_copy(self):
-        ep = self.epsilon
-        if abs(self.integrate_volt() - 1.0 ) > ep:
-            self.normalize_volt_()
-        to = self.time_out
-        #ignore err for now
-        _e = self.curr_data_lock.acquire(to)
-        volt = self.get_volt()
-        _e = self.curr_data_lock.release()
-
-        volt_thresh = self.pk_volt_min_after_norm
-        time_thresh = self.pk_time_min
-
-        peaks = []
+        table, volt = self.run_pipeline('peaks')
+        peaks = list(zip(table['start'].tolist(), table['end'].tolist()))
 
-        num_pts = len(volt)
-        on_peak = False
-        low = 0
-        for i in range(0, num_pts):
-            if not on_peak:
-                if volt[i] >= volt_thresh:
-                    on_peak = True
-                    low = i
-            else:
-                if volt[i] <= volt_thresh:
-                    on_peak = False
-                    if i - low >= time_thresh:
-                        peaks.append((low, i))
-
-        return [peaks , volt ]
+        return [peaks , np.copy(volt) ]
 
     #@description: Calculates the area of peaks (calls within) of voltage.
     #@returns: List of areas corresponding to peaks in order
     def integrate_peaks(self):
-        [peaks , volt] = self.break_into_peaks_ret_volt_copy()
-
-        areas = []
-
-        for low, high in peaks:
-            _a = self.integrate(volt, low, high)
-            areas.append(_a)
+        table = self.analyze_peaks()
+        areas = table['area'].tolist()
 
         return areas
 
     #@description: Calculates the maximum values and indices of those maximas of voltage.
     #@returns: List of (max_index, max_val) pairs
     def get_peak_local_maximas(self):
-        [peaks,volt] = self.break_into_peaks_ret_volt_copy()
+        table = self.analyze_peaks()
+        maximas = list(zip(table['apex'].tolist(), table['apex_volt'].tolist()))
 
-        maximas = []
+        return maximas
 
-        for low, high in peaks:
-            arr = volt[low:high]
-            _m = np.max(arr)
-            _mi = arr.argmax() + low
-            maximas.append((_mi, _m))
+    #@description: Segments and measures all peaks of the processed run (the pipeline's peaks step, cached until the
+    #               data, a step or a peak setting changes). The table is also kept in self.peaks.
+    #@returns: numpy structured array of PEAK_DTYPE, one row per peak in time order
+    def analyze_peaks(self):
+        table, volt = self.run_pipeline('peaks')
+        table = np.copy(table)
+        self.peaks = table
+
+        return table
+
+    #@description: Fits every peak region from analyze_peaks as a sum of fit_model components (gc_fit.fit_regions),
+    #               so co-eluting compounds get separate areas. Regions are widened by half their width on each side
+    #               (the tails below the threshold belong to the components) and fitted above the straight line
+    #               joining the widened ends. The table is also kept in self.components.
+    #@returns: numpy structured array of FIT_DTYPE; region is the row of the peak table (self.peaks)
+    def deconvolve_peaks(self):
+        table = self.analyze_peaks()
+        _table, volt = self.run_pipeline('peaks')
+        t = self.run_pipeline('area')[self.indices['t']]
+
+        _pad = (table['end'] - table['start']) // 2
+        lows = np.maximum(table['start'] - _pad, 0)
+        highs = np.minimum(table['end'] + _pad, len(volt) - 1)
+
+        regions = []
+        for _s, _end in zip(lows.tolist(), highs.tolist()):
+            _t = t[_s:_end + 1]
+            _line = np.interp(_t, (_t[0], _t[-1]), (volt[_s], volt[_end]))
+            regions.append((_t, volt[_s:_end + 1] - _line))
+
+        comps = fit_regions(regions, self.fit_model, self.fit_processes)
+        self.components = comps
+
+        return comps
+
+    #@description: Picks the peak detection threshold.
+    #@param: mode = 'fixed' (pk_volt_min_after_norm after normalizing) or 'mad' (local noise on raw volts)
+    #@param: sigma = noise units above the rolling baseline, window/base_window = noise/baseline window in samples
+    def set_peak_threshold_(self, mode, sigma=None, window=None, base_window=None):
+        self.pk_threshold_mode = mode
+        if sigma is not None:
+            self.pk_noise_sigma = sigma
+        if window is not None:
+            self.pk_noise_window = window
+        if base_window is not None:
+            self.pk_base_window = base_window
+
+    #@returns: (start, end, apex) thresholds for define_peaks: (pk_volt_min_after_norm, None, None), or in 'mad' mode
+    #               three arrays of one value per point
+    def peak_threshold(self, volt):
+        if self.pk_threshold_mode == 'mad':
+            return noise_thresholds(volt, self.pk_noise_sigma, self.pk_noise_off_sigma, self.pk_noise_min_sigma,
+                                    self.pk_noise_window, self.pk_base_window)
+        return (self.pk_volt_min_after_norm, None, None)
+
+    def get_peak_threshold_mode(self):
+        return self.pk_threshold_mode
+
+    #@returns: True if peaks are found on raw volts ('mad' thresholds, savgol or cwt detector), False if on normalized
+    def is_raw_peak_mode(self):
+        return self.pk_detector != 'threshold' or self.pk_threshold_mode == 'mad'
+
+    #@description: Picks the peak detector used by break_into_peaks, analyze_peaks and deconvolve_peaks.
+    #@param: kind = 'threshold' (define_peaks), 'savgol' (gc_peaks.savgol_peaks) or 'cwt' (gc_peaks.cwt_peaks)
+    #@param: width = narrowest peak in samples: the Savitzky-Golay window, and a sixth of it the narrowest wavelet
+    def set_peak_detector_(self, kind, width=None):
+        self.pk_detector = kind
+        if width is not None:
+            self.pk_width = int(width)
+
+    def get_peak_detector(self):
+        return self.pk_detector
+
+    #@description: Segments volt with the detector picked by set_peak_detector_.
+    #@returns: List of (low, high) index tuples
+    def find_peaks(self, volt):
+        if self.pk_detector == 'savgol':
+            return savgol_peaks(volt, self.pk_width, self.pk_noise_sigma, self.pk_noise_off_sigma,
+                                self.pk_noise_window, self.pk_base_window)
+        if self.pk_detector == 'cwt':
+            _widths = np.geomspace(max(self.pk_width / 6, 1.0), 2 * self.pk_width, 10)
+            return cwt_peaks(volt, _widths, self.pk_noise_sigma, 3, self.pk_noise_off_sigma, self.pk_noise_window,
+                                self.pk_base_window)
+        return self.define_peaks(volt, *self.peak_threshold(volt))
+
+    #@description: Picks the baseline subtracted by the peak and range integration methods (the pipeline's baseline
+    #               step). Data is not modified.
+    #@param: method = None (no correction), 'als' or 'rollmin' (gc_baseline.estimate_baseline)
+    #@param: param = lam for 'als', window in samples for 'rollmin'
+    def set_baseline_(self, method, param=None):
+        if param is None:
+            param = 1e9 if method == 'als' else 501
+        self.baseline_method = method
+        self.baseline_param = param
+        if method is None:
+            self.pipeline.set_step_('baseline', False)
+        else:
+            self.pipeline.set_step_('baseline', True, method=method, param=param)
 
-        return maximas
+    def get_baseline_method(self):
+        return self.baseline_method
+
+    #@param: model = 'gauss' or 'emg', processes = worker processes for deconvolve_peaks (0 or 1: none)
+    def set_fit_(self, model, processes=0):
+        self.fit_model = model
+        self.fit_processes = processes
 
     '''
-    helper functions: reint_curr_data_, inc_run_num_, integrate
+    Pipeline functions: set_step_, toggle_step_, get_steps, is_step_enabled, run_pipeline, get_processed_data,
+                        peaks_step, peak_settings
     '''
-    def integrate(self, arr, low, high):
-        if low < len(arr) -1:
-            arr = arr[low:-1]
-            high = high - low
+    #@description: Switches a pipeline step on/off and/or re-tunes it. Nothing is computed until the output is asked for.
+    #@param: name = 'clean_time', 'baseline', 'smooth', 'normalize' or 'area' (see gc_pipeline.py for the parameters)
+    #@param: enabled = True/False, None keeps the current state
+    def set_step_(self, name, enabled=None, **params):
+        self.pipeline.set_step_(name, enabled, **params)
+
+    #@returns: True if the step is now enabled
+    def toggle_step_(self, name):
+        return self.pipeline.toggle_step_(name)
+
+    #@returns: list of (name, enabled, params) in pipeline order
+    def get_steps(self):
+        return self.pipeline.get_steps()
+
+    def is_step_enabled(self, name):
+        return self.pipeline.is_enabled(name)
+
+    #@description: Evaluates the pipeline up to stage. curr_data is copied in read mode (or, with zero_copy, taken as a
+    #               read-only view) only when its epoch or length changed since the last call; the steps run outside
+    #               the lock and only the stages whose input or parameters changed are recomputed.
+    #@returns: output of the stage, cached (do not modify): a (dims, N) array, or (peak table, volt) for 'peaks'
+    def run_pipeline(self, stage):
+        to = self.time_out
+        #ignore err for now
+        _e = self.curr_data_lock.acquire_read(to)
+        _b = self.curr_buffer
+        _ver = (_b.get_epoch(), len(_b))
+        if self.pipeline.get_source_version() != _ver:
+            # Appends may land meanwhile, the version is the length actually taken
+            _d = _b.frozen_view() if self.zero_copy else np.copy(_b.view())
+            self.pipeline.set_source_((_ver[0], _d.shape[1]), _d)
+        _e = self.curr_data_lock.release_read()
+
+        self.pipeline.set_step_('peaks', settings=self.peak_settings())
+        return self.pipeline.output(stage)
+
+    #@returns: curr_data after the enabled data steps (clean time, baseline, smooth, normalize, area): a copy, or with
+    #               zero_copy a read-only view of the cached output
+    def get_processed_data(self):
+        _d = self.run_pipeline('area')
+        if self.zero_copy:
+            _d = _d.view()
+            _d.flags.writeable = False
+            return _d
+        return np.copy(_d)
+
+    #@description: The pipeline's last step. Normalizes a copy first when the detector works on normalized volts and
+    #               the normalize step is off. With raw volts ('mad' thresholds, savgol/cwt) area is above the straight
+    #               line from start to end point.
+    #@param: settings = peak_settings(), only part of the cache key
+    #@returns: (PEAK_DTYPE table, volt it was measured on)
+    def peaks_step(self, d, indices, settings=None):
+        volt = d[indices['v']]
+        t = d[indices['t']]
+        if not self.is_raw_peak_mode() and not self.pipeline.is_enabled('normalize'):
+            volt = np.copy(volt)
+            normalize_row_(volt, t)
+
+        peaks = self.find_peaks(volt)
+        table = self.define_peak_table(volt, t, peaks, AreaIndex(t, volt))
+        if self.is_raw_peak_mode():
+            table['area'] -= 0.5 * (volt[table['start']] + volt[table['end']]) * table['width']
+
+        return (table, volt)
+
+    #@returns: tuple of every setting the peak step depends on
+    def peak_settings(self):
+        return (self.pk_volt_min_after_norm, self.pk_time_min, self.pk_threshold_mode, self.pk_noise_sigma,
+                self.pk_noise_off_sigma, self.pk_noise_min_sigma, self.pk_noise_window, self.pk_base_window,
+                self.pk_detector, self.pk_width)
 
-        tot_area = np.cumsum(arr)
-        if high == -1:
-            area = tot_area[-1]
-        elif high < len(arr) -1:
-            area = tot_area[high]
+    '''
+    Batch functions: get_run_batch, integrate_runs, smooth_runs, analyze_runs
+    '''
+    #@description: Packs runs end to end (gc_batch.RunBatch). Cached until the list holds other run objects.
+    #@param: runs = list of (dims, N) arrays or PackedRun. None uses prev_data.
+    #@returns: RunBatch (shared, do not modify its data)
+    def get_run_batch(self, runs=None):
+        if runs is None:
+            runs = self.prev_data
+        _key = tuple(map(id, runs))
+        if self.run_batch is None or self.run_batch_key != _key:
+            self.run_batch = RunBatch(runs, self.dims)
+            self.run_batch_key = _key
+            # Keeps the runs alive, so their ids cannot be reused while the key is
+            self.run_batch_runs = list(runs)
+        return self.run_batch
+
+    #@returns: numpy array of the trapezoidal area of voltage over time of every run [V s]
+    def integrate_runs(self, runs=None):
+        batch = self.get_run_batch(runs)
+        return batch_areas(batch, batch.get_row(self.indices['v']), batch.get_row(self.indices['t']))
+
+    #@description: Smooths the voltage of every run in one call (gc_batch.batch_smooth), same result as smooth_ per run.
+    #@param: kind = 'mean', 'ema' or 'savgol', window = samples
+    #@returns: new RunBatch with the smoothed voltage row
+    def smooth_runs(self, kind, window, runs=None):
+        batch = self.get_run_batch(runs)
+        _vi = self.indices['v']
+        return batch.with_row(_vi, batch_smooth(batch, batch.get_row(_vi), kind, window))
+
+    #@description: Finds and measures the peaks of every stored run with the current pipeline steps and peak settings,
+    #               as analyze_peaks would after loading each run. With the threshold detector in 'fixed' mode and no
+    #               baseline step, every run goes through smoothing, normalizing and segmentation together
+    #               (gc_batch.analyze_batch); otherwise the packed runs are taken one at a time through the same steps.
+    #               The table is also kept in self.run_peaks.
+    #@param: runs = list of (dims, N) arrays or PackedRun. None uses prev_data.
+    #@returns: numpy structured array of RUN_PEAK_DTYPE, run = index into runs, indices into that run
+    def analyze_runs(self, runs=None):
+        batch = self.get_run_batch(runs)
+        _steps = {_n:(_on, _p) for _n, _on, _p in self.pipeline.get_steps()}
+
+        if self.pk_detector == 'threshold' and self.pk_threshold_mode == 'fixed' and not _steps['baseline'][0]:
+            _smooth = None
+            if _steps['smooth'][0]:
+                _smooth = (_steps['smooth'][1].get('kind', 'mean'), _steps['smooth'][1].get('window', 3))
+            table = analyze_batch(batch, self.indices['v'], self.indices['t'], _smooth, self.pk_volt_min_after_norm,
+                                    self.pk_time_min)
         else:
+            _funcs = (('clean_time', clean_time_step), ('baseline', baseline_step), ('smooth', smooth_step),
+                        ('normalize', normalize_step))
+            tables = [np.zeros(0, dtype=RUN_PEAK_DTYPE)]
+            for i in range(batch.get_num_runs()):
+                _d = batch.get_run(i)
+                if _d.shape[1] == 0:
+                    continue
+                for _n, _f in _funcs:
+                    if _steps[_n][0]:
+                        _d = _f(_d, self.indices, **_steps[_n][1])
+                _t, _volt = self.peaks_step(_d, self.indices)
+
+                _rt = np.zeros(len(_t), dtype=RUN_PEAK_DTYPE)
+                for _f in PEAK_DTYPE.names:
+                    _rt[_f] = _t[_f]
+                _rt['run'] = i
+                tables.append(_rt)
+            table = np.concatenate(tables)
+
+        self.run_peaks = table
+
+        return table
+
+    '''
+    Alignment functions: set_alignment_, get_align_ref, align_runs, get_aligned_run, get_aligned_grid
+    '''
+    #@description: Alignment settings (gc_align.RunAligner.set_params_). Cached alignments are dropped if they change.
+    #@param: max_shift = largest drift searched [s], resolution = correlation grid spacing [s]
+    #@param: segment = COW segment length [s] (0: shifts only), slack = largest COW boundary move [s]
+    def set_alignment_(self, max_shift=None, resolution=None, segment=None, slack=None):
+        self.aligner.set_params_(max_shift, resolution, segment, slack)
+
+    #@description: Default alignment reference: the first run with at least 2 points. prev_data[0] is the empty frame
+    #               stored by the first Play, and a reference without points leaves every run unaligned (nan).
+    #@param: runs = list of (dims, N) arrays or PackedRun. None uses prev_data.
+    #@returns: index into runs, 0 if no run has 2 points
+    def get_align_ref(self, runs=None):
+        if runs is None:
+            runs = self.prev_data
+        for i in range(len(runs)):
+            if runs[i].shape[1] > 1:
+                return i
+        return 0
+
+    #@description: Aligns the retention times of runs to runs[ref]. Only runs not aligned to this reference before are
+    #               correlated, all of them together.
+    #@param: runs = list of (dims, N) arrays or PackedRun. None uses prev_data.
+    #@param: ref = index of the reference run, None for get_align_ref
+    #@returns: numpy structured array of gc_align.ALIGN_DTYPE, one row per run
+    def align_runs(self, runs=None, ref=None):
+        if runs is None:
+            runs = self.prev_data
+        if ref is None:
+            ref = self.get_align_ref(runs)
+        self.aligner.set_reference_(runs[ref])
+        return self.aligner.align(runs)
+
+    #@returns: float64 (dims, N) copy of runs[i] on the reference's time axis, cached (do not modify)
+    def get_aligned_run(self, i, runs=None, ref=None):
+        if runs is None:
+            runs = self.prev_data
+        if ref is None:
+            ref = self.get_align_ref(runs)
+        self.aligner.set_reference_(runs[ref])
+        return self.aligner.get_aligned_run(runs[i])
+
+    #@returns: (grid times, (len(runs), L) aligned voltages on the reference's grid, nan where a run has no data)
+    def get_aligned_grid(self, runs=None, ref=None):
+        if runs is None:
+            runs = self.prev_data
+        if ref is None:
+            ref = self.get_align_ref(runs)
+        self.aligner.set_reference_(runs[ref])
+        return self.aligner.get_aligned_grid(runs)
+
+    '''
+    helper functions: define_peaks, reint_curr_data_, inc_run_num_, integrate, pack_run
+    '''
+    #@description: Splits voltage into peaks with gc_peaks.threshold_segments. A peak starts at the first point >=
+    #               pk_volt_min_after_norm and ends at the next point <= it, and is kept if it spans at least pk_time_min
+    #               points, exactly like the old per-point on_peak loop.
+    #               With off_thresh, a peak instead starts at >= volt_thresh and ends at the first point <= off_thresh
+    #               (hysteresis).
+    #@param: volt_thresh = scalar or one threshold per point (peak_threshold). None uses pk_volt_min_after_norm.
+    #@param: off_thresh = end threshold (scalar or per point) below volt_thresh, or None
+    #@param: min_volt = peaks whose maximum stays below it (scalar or per point, taken at the start) are dropped, or None
+    #@returns: List of (low, high) index tuples
+    def define_peaks(self, volt, volt_thresh=None, off_thresh=None, min_volt=None):
+        if volt_thresh is None:
+            volt_thresh = self.pk_volt_min_after_norm
+        time_thresh = self.pk_time_min
+
+        lows, highs = threshold_segments(volt, volt_thresh, time_thresh, off_thresh, min_volt)
+        peaks = list(zip(lows.tolist(), highs.tolist()))
+
+        return peaks
+
+    #@description: Measures the peaks found by define_peaks (gc_peaks.peak_table).
+    #@param: volt, t = voltage and time rows of the run
+    #@param: peaks = list of (low, high) from define_peaks
+    #@param: index = AreaIndex of (t, volt). None builds one.
+    #@returns: numpy structured array of PEAK_DTYPE
+    def define_peak_table(self, volt, t, peaks, index=None):
+        if len(peaks) == 0:
+            return np.zeros(0, dtype=PEAK_DTYPE)
+
+        _p = np.array(peaks, dtype=np.int64)
+        table = peak_table(volt, t, _p[:, 0], _p[:, 1], index)
+
+        return table
+
+    #@description: Trapezoidal area of arr from index low to high (inclusive), weighted by the real spacing of t, so the
+    #               result does not depend on how many points were sampled. low/high may be arrays (one area per pair).
+    #@param: high = end index, negative counts from the end (-1 = last point)
+    #@param: t = time of each point. None integrates over the sample index (unit spacing).
+    def integrate(self, arr, low, high, t=None):
+        n = len(arr)
+        if t is None:
+            t = np.arange(n, dtype=np.float64)
+
+        low = np.asarray(low)
+        high = np.asarray(high)
+        high = np.where(high < 0, high + n, high)
+        if np.any(high >= n) or np.any(low < 0):
             print("High index in integration out of bounds")
-            area = tot_area[-1]
+            high = np.minimum(high, n - 1)
+            low = np.maximum(low, 0)
+
+        _ai = AreaIndex(t, arr)
+        area = _ai.area(low, high)
+        if np.ndim(area) == 0:
+            area = float(area)
 
         return area
 
@@ -306,14 +783,20 @@ class GC:
 
         _l = self.curr_data_lock
         with _l:
-            _z = np.zeros((_dims, 0))
-            self.set_curr_data_w_ref_(_z)
+            for _b in self.channel_buffers:
+                _b.clear_()
 
     def inc_run_num_(self):
         self.run_num += 1
 
+    #@description: Packs a (dims, N) run into int16 codes (current gain) and int64 ns timestamps for prev_data.
+    #@returns: PackedRun. Rows are still available as computed arrays (run[indices['v']], np.asarray(run), ...).
+    def pack_run(self, d):
+        _g = self.ads.gain
+        return PackedRun(d, self.indices, _g, ADS_GAIN_FSR[_g] / 32768)
+
     '''
-    ADS configuration functions: reint_ADS, set_gain, set_mode
+    ADS configuration functions: reint_ADS, set_gain, set_mode, start_continuous_, stop_continuous_, write_ADS_register, get_mux_bits
     '''
     def reinit_ADS(self):
         self.i2c = busio.I2C(board.SCL , board.SDA)
@@ -328,32 +811,134 @@ class GC:
         self.single_ended = se
         self.reinit_ADS()
 
+    #@description: Writes a 16 bit value to an ADS1115 register.
+    def write_ADS_register(self, reg, val):
+        _b = bytes([reg, (val >> 8) & 0xFF, val & 0xFF])
+        with self.ads.i2c_device as i2c:
+            i2c.write(_b)
+
+    #@returns: Config register MUX bits for the current port(s), or for channel if given (port or (positive, negative) pair)
+    def get_mux_bits(self, channel=None):
+        if channel is None:
+            channel = self.port0 if self.single_ended else (self.port0, self.port1)
+
+        if isinstance(channel, int):
+            _m = channel + 0x04
+        else:
+            _m = ADS_DIFF_MUX[tuple(channel)]
+        return _m << 12
+
+    #@description: Puts the ADS1115 in continuous conversion mode with ALERT/RDY pulsing after every conversion.
+    #               Each pulse triggers on_conversion_ready_, which reads the result. Collect them with read_block.
+    #@param: rate = data rate in samples per second, one of ADS_CONFIG_RATE (8 to 860)
+    #@param: rdy_pin = BCM number of the GPIO wired to ALERT/RDY
+    #@returns: True if started
+    def start_continuous_(self, rate, rdy_pin):
+        if rate not in ADS_CONFIG_RATE:
+            print('start_continuous: unsupported data rate {}'.format(rate))
+            return False
+
+        if self.continuous:
+            self.stop_continuous_()
+
+        self.data_rate = rate
+        self.rdy_pin = rdy_pin
+        self.conv_period_ns = 1e9 / rate
+        self.conv_index = -1
+        self.conv_missed = 0
+        if self.decimator is not None:
+            self.decimator.reset_()
+        with self.conv_lock:
+            self.conv_codes = []
+            self.conv_times = []
+
+        # Hi_thresh MSB = 1 and Lo_thresh MSB = 0 turn ALERT/RDY into a conversion ready output
+        self.write_ADS_register(ADS_POINTER_HI_THRESH, 0x8000)
+        self.write_ADS_register(ADS_POINTER_LO_THRESH, 0x0000)
+
+        _config = self.get_mux_bits()
+        _config |= ADS_CONFIG_GAIN[self.ads.gain]
+        _config |= ADS_CONFIG_MODE_CONTINUOUS
+        _config |= ADS_CONFIG_RATE[rate]
+        _config |= ADS_CONFIG_COMP_QUE_ONE
+        self.write_ADS_register(ADS_POINTER_CONFIG, _config)
+
+        # Leave the pointer on the conversion register so every read is a single 2 byte transfer
+        self.ads.get_last_result(False)
+
+        self.continuous = True
+
+        # ALERT/RDY is open drain, active low
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(rdy_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(rdy_pin, GPIO.FALLING, callback=self.on_conversion_ready_)
+
+        return True
+
+    #@description: Stops reading on ALERT/RDY and puts the ADS1115 back in single-shot power down (datasheet default config).
+    def stop_continuous_(self):
+        if not self.continuous:
+            return
+
+        GPIO.remove_event_detect(self.rdy_pin)
+        GPIO.cleanup(self.rdy_pin)
+        self.continuous = False
+
+        self.write_ADS_register(ADS_POINTER_CONFIG, 0x8583)
+
     '''
-    Lock functions: get_lock, is_locked
+    Lock functions: get_lock, get_read_lock, get_append_lock, is_locked, get_lock_stats
     '''
+    #@returns: the RWLock. Used directly (acquire/release, with) it is write mode, exclusive like the old Lock.
     def get_lock(self):
         return self.curr_data_lock
 
+    #@returns: Lock-like handle on read mode, for callers that only read curr_data
+    def get_read_lock(self):
+        return self.curr_data_lock.reader
+
+    #@returns: Lock-like handle on append mode, for the acquisition thread (append_/extend_ setters)
+    def get_append_lock(self):
+        return self.curr_data_lock.appender
+
+    #@returns: True if held in any mode
     def is_locked(self):
         _il = self.curr_data_lock.locked()
         return _il
 
+    #@returns: wait time counters per mode, see gc_sync.RWLock.get_stats
+    def get_lock_stats(self):
+        return self.curr_data_lock.get_stats()
+
     '''
     Getters: get_curr_data, get_volt, get_time
     '''
     def get_curr_data(self):
         _il = self.is_locked()
         if _il:
-            _d = np.copy(self.curr_data)
+            if self.zero_copy:
+                return self.curr_buffer.frozen_view()
+            _d = np.copy(self.curr_buffer.view())
             return _d
         else:
             print('get_curr_data: no access')
 
+    #@description: Delta read of curr_data for consumers that keep their own copy (see SampleBuffer.read_since).
+    #@returns: (copy of samples added since (epoch, cursor), epoch, cursor). A new epoch means replace instead of extend.
+    def get_curr_data_since(self, epoch, cursor):
+        _il = self.is_locked()
+        if _il:
+            return self.curr_buffer.read_since(epoch, cursor)
+        else:
+            print('get_curr_data_since: no access')
+
     def get_volt(self):
         is_locked = self.is_locked()
         _vi = self.indices['v']
         if is_locked:
-            _v = np.copy(self.curr_data[_vi])
+            if self.zero_copy:
+                return self.curr_buffer.frozen_view()[_vi]
+            _v = np.copy(self.curr_buffer.view()[_vi])
             return _v
         else:
             print('get_volt: no access')
@@ -362,29 +947,130 @@ class GC:
         _il = self.is_locked()
         _ti = self.indices['t']
         if _il:
-            _t = self.curr_data[_ti]
+            if self.zero_copy:
+                return self.curr_buffer.frozen_view()[_ti]
+            _t = self.curr_buffer.view()[_ti]
             return _t
         else:
             print('get_time: no access')
 
+    #@description: Prefix integral of the current voltage over time. Built once per curr_buffer epoch and extended
+    #               with samples appended since, so any number of range queries cost one pass over the data.
+    #               The *_ setters bump the epoch, which invalidates it.
+    #@returns: AreaIndex
+    def get_area_index(self):
+        _il = self.is_locked()
+        if _il:
+            _b = self.curr_buffer
+            with self.cache_lock:
+                _d = _b.view()
+                _ver = (_b.get_epoch(), _d.shape[1])
+                _old = self.area_index_version
+                _vi = self.indices['v']
+                _ti = self.indices['t']
+
+                if _old is None or _old[0] != _ver[0] or _old[1] > _ver[1]:
+                    self.area_index = AreaIndex(_d[_ti], _d[_vi])
+                elif _old[1] < _ver[1]:
+                    self.area_index.extend_(_d[_ti, _old[1]:], _d[_vi, _old[1]:])
+
+                self.area_index_version = _ver
+                return self.area_index
+        else:
+            print('get_area_index: no access')
+
+    #@description: Baseline of the current voltage from set_baseline_'s method, recomputed when curr_buffer's epoch or
+    #               length or the method changes. The AreaIndex of the corrected voltage is cached with it.
+    #@returns: numpy array of len(curr_data), zeros without a baseline method
+    def get_baseline(self):
+        _il = self.is_locked()
+        if _il:
+            _b = self.curr_buffer
+            with self.cache_lock:
+                _d = _b.view()
+                _ver = (_b.get_epoch(), _d.shape[1], self.baseline_method, self.baseline_param)
+                if self.baseline_version != _ver:
+                    _v = _d[self.indices['v']]
+                    if self.baseline_method is None:
+                        self.baseline = np.zeros(len(_v))
+                    else:
+                        self.baseline = estimate_baseline(_v, self.baseline_method, self.baseline_param)
+                    self.baseline_index = None
+                    self.baseline_version = _ver
+                return self.baseline
+        else:
+            print('get_baseline: no access')
+
+    #@returns: copy of voltage minus the baseline (plain copy without a baseline method)
+    def get_corrected_volt(self):
+        _il = self.is_locked()
+        if _il:
+            if self.baseline_method is None:
+                return self.get_volt()
+            with self.cache_lock:
+                _base = self.get_baseline()
+                return self.curr_buffer.view()[self.indices['v'], :len(_base)] - _base
+        else:
+            print('get_corrected_volt: no access')
+
+    #@returns: AreaIndex the peak and range integration methods use: of the baseline corrected voltage if a method is
+    #               set, otherwise get_area_index
+    def get_peak_area_index(self):
+        _il = self.is_locked()
+        if _il:
+            if self.baseline_method is None:
+                return self.get_area_index()
+            with self.cache_lock:
+                _base = self.get_baseline()
+                if self.baseline_index is None:
+                    _d = self.curr_buffer.view()[:, :len(_base)]
+                    self.baseline_index = AreaIndex(_d[self.indices['t']], _d[self.indices['v']] - _base)
+                return self.baseline_index
+        else:
+            print('get_peak_area_index: no access')
+
     def get_dims(self):
         return self.dims
 
+    #@returns: copy of the (dims, N) data of scan channel i. Channel 0 is curr_data.
+    def get_channel_data(self, i):
+        _il = self.is_locked()
+        if _il:
+            if self.zero_copy:
+                return self.channel_buffers[i].frozen_view()
+            _d = np.copy(self.channel_buffers[i].view())
+            return _d
+        else:
+            print('get_channel_data: no access')
+
+    def get_num_channels(self):
+        return len(self.channel_buffers)
+
     '''
-    Setters: set_curr_data_, set_time_w_ref_, set_volt_, set_time_, set_time_w_ref_, set_area_
+    Setters: set_curr_data_, set_time_w_ref_, set_volt_, set_time_, set_time_w_ref_, set_area_, set_zero_copy_
+    Row setters write d into the buffer in place, one copy (after a copy-on-write if read-only views are out).
+    They and set_curr_data_ need the lock in write mode; the append/extend setters only in append mode.
     '''
+    #@description: Accessor mode. With on, get_curr_data/get_volt/get_time/get_channel_data/get_processed_data
+    #               return read-only views instead of copies: writing to one raises, and later writes to curr_data
+    #               go to fresh storage (SampleBuffer.own_) so a view keeps the values it was taken with.
+    def set_zero_copy_(self, on):
+        self.zero_copy = on
+
+    def is_zero_copy(self):
+        return self.zero_copy
+
     def set_curr_data_(self, d):
         _il = self.is_locked()
         if _il:
-            d = np.copy(d)
-            self.curr_data = d
+            self.curr_buffer.set_(d)
         else:
             print('set_curr_data: no access')
 
     def set_curr_data_w_ref_(self, d):
         _il = self.is_locked()
         if _il:
-            self.curr_data = d
+            self.curr_buffer.set_w_ref_(d)
         else:
             print('set_curr_data_w_ref: no access')
 
@@ -392,8 +1078,8 @@ class GC:
         is_locked = self.is_locked()
         _vi= self.indices['v']
         if is_locked:
-            d = np.copy(d)
-            self.curr_data[_vi] = d
+            self.curr_buffer.writable_view()[_vi] = d
+            self.curr_buffer.touch_()
         else:
             print('set_volt: no access')
 
@@ -401,8 +1087,8 @@ class GC:
         _il = self.is_locked()
         _ti = self.indices['t']
         if _il:
-            d = np.copy(d)
-            self.curr_data[_ti] = d
+            self.curr_buffer.writable_view()[_ti] = d
+            self.curr_buffer.touch_()
         else:
             print('set_time: no access')
 
@@ -410,7 +1096,8 @@ class GC:
         _il = self.is_locked()
         _ti = self.indices['t']
         if _il:
-            self.curr_data[_ti] = d
+            self.curr_buffer.writable_view()[_ti] = d
+            self.curr_buffer.touch_()
         else:
             print('set_time_w_ref: no access')
 
@@ -418,11 +1105,39 @@ class GC:
         _il = self.is_locked()
         _ai = self.indices['a']
         if _il:
-            d = np.copy(d)
-            self.curr_data[_ai] = d
+            self.curr_buffer.writable_view()[_ai] = d
+            self.curr_buffer.touch_()
         else:
             print('set_area_w_ref: no access')
 
+    #@description: Appends one sample (length dims, ordered by indices) to curr_data. Amortized O(1).
+    def append_curr_data_(self, sample):
+        _il = self.is_locked()
+        if _il:
+            self.curr_buffer.append_(sample)
+            self.bus.publish_(np.reshape(sample, (self.dims, 1)))
+        else:
+            print('append_curr_data: no access')
+
+    #@description: Appends a (dims, k) block of samples to curr_data in one copy.
+    def extend_curr_data_(self, block):
+        _il = self.is_locked()
+        if _il:
+            self.curr_buffer.extend_(block)
+            self.bus.publish_(block)
+        else:
+            print('extend_curr_data: no access')
+
+    #@description: Appends a (dims, k) block of samples to scan channel i. Channel 0 is curr_data.
+    def extend_channel_data_(self, i, block):
+        _il = self.is_locked()
+        if _il:
+            self.channel_buffers[i].extend_(block)
+            if i == 0:
+                self.bus.publish_(block)
+        else:
+            print('extend_channel_data: no access')
+
     '''
     Printer functions: print_voltage, print_value
     '''
@@ -436,11 +1151,378 @@ class GC:
     Measurement functions: measure_voltage, measure_value
     '''
     def measure_voltage(self):
+        if self.continuous:
+            _c = self.measure_value()
+            return float(self.codes_to_volts(_c))
         return self.chan.voltage
 
     def measure_value(self):
+        if self.continuous:
+            _raw = self.ads.get_last_result(True)
+            return np.uint16(_raw).view(np.int16)
         return self.chan.value
 
+    #@description: Reads a block of raw conversions in one call, without per sample float conversion.
+    #               Continuous mode: takes up to n conversions delivered on ALERT/RDY, waiting at most to seconds for the first.
+    #               Single-shot mode: n back-to-back conversions.
+    #@param: n = maximum number of conversions
+    #@param: to = time out in seconds (continuous mode). Defaults to self.time_out
+    #@returns: (int16 array of codes, int64 array of timestamps in ns). Empty arrays on time out.
+    def read_block(self, n, to=None):
+        if self.continuous:
+            if to is None:
+                to = self.time_out
+
+            self.conv_event.wait(to)
+            with self.conv_lock:
+                _c = self.conv_codes[:n]
+                _t = self.conv_times[:n]
+                del self.conv_codes[:n]
+                del self.conv_times[:n]
+                if len(self.conv_codes) == 0:
+                    self.conv_event.clear()
+
+            codes = np.array(_c, dtype=np.uint16).view(np.int16)
+            times = np.array(_t, dtype=np.int64)
+        else:
+            codes = np.empty(n, dtype=np.int16)
+            times = np.empty(n, dtype=np.int64)
+            _chan = self.chan
+            for i in range(n):
+                codes[i] = _chan.value
+                times[i] = time.monotonic_ns()
+
+        return (codes, times)
+
+    #@description: Converts signed ADS1115 codes to volts with the current gain.
+    #@returns: numpy array of volts
+    def codes_to_volts(self, codes):
+        _fsr = ADS_GAIN_FSR[self.ads.gain]
+        return np.asarray(codes) * (_fsr / 32768)
+
+    #@description: Builds a (dims, k) block for extend_curr_data_ from read_block output in a few vectorized passes.
+    #@param: t_last = time [s] of the previous sample, for the first dt. None at the start of a run (dt = 0).
+    #@returns: (dims, k) numpy array ordered by indices
+    def block_to_data(self, codes, times, t_last):
+        _vi = self.indices['v']
+        _ti = self.indices['t']
+        _dti = self.indices['dt']
+
+        block = np.zeros((self.dims, len(codes)))
+        t = times * 1e-9
+
+        block[_vi] = self.codes_to_volts(codes)
+        block[_ti] = t
+        block[_dti, 1:] = np.diff(t)
+        if t_last is not None and len(t) > 0:
+            block[_dti, 0] = t[0] - t_last
+        # a default zero
+
+        return block
+
+    '''
+    Continuous mode functions: on_conversion_ready_, is_continuous, get_missed_conversions, set_decimation_, decimate_block,
+                                get_decimation
+    '''
+    #@description: ALERT/RDY falling edge callback, runs on the RPi.GPIO thread. Stores the raw conversion and timestamps it
+    #               as t0 + k * period, where k counts conversions and period is measured against the monotonic clock.
+    #               Edges missed while busy show up as a gap of several periods and are counted in conv_missed.
+    def on_conversion_ready_(self, channel):
+        _t = time.monotonic_ns()
+        _raw = self.ads.get_last_result(True)
+
+        if self.conv_index < 0:
+            self.conv_t0_ns = _t
+            _k = 0
+        else:
+            _steps = max(1, round((_t - self.conv_last_ns) / self.conv_period_ns))
+            _k = self.conv_index + _steps
+            self.conv_missed += _steps - 1
+            # ADS oscillator is only +-10% of nominal, so track the real period
+            self.conv_period_ns = (_t - self.conv_t0_ns) / _k
+
+        self.conv_index = _k
+        self.conv_last_ns = _t
+        _t_hw = self.conv_t0_ns + int(_k * self.conv_period_ns)
+
+        with self.conv_lock:
+            self.conv_codes.append(_raw)
+            self.conv_times.append(_t_hw)
+        self.conv_event.set()
+
+    def is_continuous(self):
+        return self.continuous
+
+    def get_missed_conversions(self):
+        return self.conv_missed
+
+    #@description: Continuous conversions are low pass filtered and only every factor-th is kept, e.g. 860 SPS / 172 = 5 SPS.
+    #@param: factor = decimation factor, 1 turns decimation off
+    #@param: kind = 'fir' (windowed sinc) or 'cic' (cascaded integrator-comb)
+    def set_decimation_(self, factor, kind='fir'):
+        factor = max(1, int(factor))
+        self.decimation = factor
+        if factor > 1:
+            self.decimator = make_decimator(kind, factor)
+        else:
+            self.decimator = None
+
+    #@description: Runs a read_block batch through the decimator. State carries over to the next call.
+    #@returns: (filtered codes as float64, int64 ns timestamps). The input unchanged if decimation is off.
+    def decimate_block(self, codes, times):
+        if self.decimator is None:
+            return (codes, times)
+        return self.decimator.process(codes, times)
+
+    def get_decimation(self):
+        return self.decimation
+
+    '''
+    Scan functions: set_scan_list_, start_scan_, stop_scan_, on_scan_ready_, read_scan_block, is_scanning, get_scan_rate
+    '''
+    #@description: Sets the channels to round-robin through and gives each its own buffer.
+    #@param: channels = list of ports (0 to 3, single ended) and/or [positive, negative] differential pairs from ADS_DIFF_MUX
+    def set_scan_list_(self, channels):
+        self.scan_list = [c if isinstance(c, int) else tuple(c) for c in channels]
+
+        _bufs = [self.curr_buffer]
+        for _c in self.scan_list[1:]:
+            _bufs.append(SampleBuffer(self.dims))
+
+        with self.curr_data_lock:
+            self.channel_buffers = _bufs
+
+    #@description: Round-robins the mux over scan_list with single-shot conversions at rate, paced by ALERT/RDY.
+    #               on_scan_ready_ starts the next channel before reading the finished one, so the converter only idles
+    #               for one register write per switch and the aggregate rate stays close to rate.
+    #@param: rate = data rate in samples per second, one of ADS_CONFIG_RATE. Shared by all channels.
+    #@param: rdy_pin = BCM number of the GPIO wired to ALERT/RDY
+    #@returns: True if started
+    def start_scan_(self, rate, rdy_pin):
+        if rate not in ADS_CONFIG_RATE or len(self.scan_list) == 0:
+            print('start_scan: unsupported data rate {} or empty scan list'.format(rate))
+            return False
+
+        if self.continuous:
+            self.stop_continuous_()
+        if self.scanning:
+            self.stop_scan_()
+
+        self.data_rate = rate
+        self.rdy_pin = rdy_pin
+
+        self.scan_configs = []
+        for _c in self.scan_list:
+            _config = ADS_CONFIG_OS_SINGLE
+            _config |= self.get_mux_bits(_c)
+            _config |= ADS_CONFIG_GAIN[self.ads.gain]
+            _config |= ADS_CONFIG_MODE_SINGLE
+            _config |= ADS_CONFIG_RATE[rate]
+            _config |= ADS_CONFIG_COMP_QUE_ONE
+            _b = bytes([ADS_POINTER_CONFIG, (_config >> 8) & 0xFF, _config & 0xFF])
+            self.scan_configs.append(_b)
+
+        with self.conv_lock:
+            self.scan_codes = [[] for _c in self.scan_list]
+            self.scan_times = [[] for _c in self.scan_list]
+        self.scan_index = 0
+        self.scan_count = 0
+
+        # Hi_thresh MSB = 1 and Lo_thresh MSB = 0 turn ALERT/RDY into a conversion ready output
+        self.write_ADS_register(ADS_POINTER_HI_THRESH, 0x8000)
+        self.write_ADS_register(ADS_POINTER_LO_THRESH, 0x0000)
+
+        self.scanning = True
+
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(rdy_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(rdy_pin, GPIO.FALLING, callback=self.on_scan_ready_)
+
+        self.scan_t0_ns = time.monotonic_ns()
+        with self.ads.i2c_device as i2c:
+            i2c.write(self.scan_configs[0])
+
+        return True
+
+    #@description: Stops the scan and puts the ADS1115 back in single-shot power down (datasheet default config).
+    def stop_scan_(self):
+        if not self.scanning:
+            return
+
+        GPIO.remove_event_detect(self.rdy_pin)
+        GPIO.cleanup(self.rdy_pin)
+        self.scanning = False
+
+        self.write_ADS_register(ADS_POINTER_CONFIG, 0x8583)
+
+    #@description: ALERT/RDY falling edge callback while scanning, runs on the RPi.GPIO thread.
+    #               Writes the next channel's config (starting its conversion) and then reads the finished result,
+    #               which stays in the conversion register until the new conversion completes.
+    def on_scan_ready_(self, channel):
+        _t = time.monotonic_ns()
+        _i = self.scan_index
+        _next = (_i + 1) % len(self.scan_configs)
+        _buf = self.scan_read_buf
+
+        with self.ads.i2c_device as i2c:
+            i2c.write(self.scan_configs[_next])
+            i2c.write_then_readinto(bytes([ADS_POINTER_CONVERSION]), _buf)
+
+        self.scan_index = _next
+        self.scan_count += 1
+        _raw = (_buf[0] << 8) | _buf[1]
+
+        with self.conv_lock:
+            self.scan_codes[_i].append(_raw)
+            self.scan_times[_i].append(_t)
+        self.conv_event.set()
+
+    #@description: Takes up to n pending conversions per channel, waiting at most to seconds for the first.
+    #@returns: list with one (int16 codes, int64 timestamps in ns) pair per scan channel
+    def read_scan_block(self, n, to=None):
+        if to is None:
+            to = self.time_out
+
+        self.conv_event.wait(to)
+
+        _blocks = []
+        with self.conv_lock:
+            _empty = True
+            for i in range(len(self.scan_codes)):
+                _c = self.scan_codes[i][:n]
+                _t = self.scan_times[i][:n]
+                del self.scan_codes[i][:n]
+                del self.scan_times[i][:n]
+                _empty = _empty and len(self.scan_codes[i]) == 0
+                _blocks.append((_c, _t))
+            if _empty:
+                self.conv_event.clear()
+
+        blocks = []
+        for _c, _t in _blocks:
+            codes = np.array(_c, dtype=np.uint16).view(np.int16)
+            times = np.array(_t, dtype=np.int64)
+            blocks.append((codes, times))
+
+        return blocks
+
+    def is_scanning(self):
+        return self.scanning
+
+    #@returns: aggregate conversions per second over all channels since start_scan_
+    def get_scan_rate(self):
+        _dt = time.monotonic_ns() - self.scan_t0_ns
+        if self.scan_count == 0 or _dt <= 0:
+            return 0.0
+        return self.scan_count * 1e9 / _dt
+
+    '''
+    Acquisition process functions: start_acquisition_process_, stop_acquisition_process_, read_rings_, is_process_running,
+                                    get_ring_lost
+    '''
+    #@description: Moves sampling into GCAcquisitionProcess, which owns the ADS1115 and writes into shared memory rings
+    #               (one per channel). This process maps the rings read-only, so GUI threads, plotting and the GIL
+    #               can never delay a conversion. Pull the samples with read_rings_.
+    #@param: settings = dict with 'mode' ('single', 'continuous' or 'scan'), 'rate', 'rdy_pin', 'scan', 'block_size'
+    #                   and 'sampling_period' (single mode)
+    #@param: capacity = samples per ring. A reader that falls further behind loses the oldest samples (get_ring_lost).
+    def start_acquisition_process_(self, settings, capacity):
+        if self.acq_process is not None:
+            self.stop_acquisition_process_()
+
+        _n = len(settings['scan']) if settings['mode'] == 'scan' else 1
+
+        # Orders the ring's data stores before its count on the Pi's ARM cores (see SharedSampleRing)
+        self.ring_lock = mp_spawn.Lock()
+        self.rings = [SharedSampleRing(self.dims, capacity, readonly=True, lock=self.ring_lock) for i in range(_n)]
+        self.ring_cursors = [0] * _n
+        self.ring_lost = 0
+
+        self.acq_stop = mp_spawn.Event()
+        self.acq_ready = mp_spawn.Event()
+
+        _s = dict(settings)
+        _s['single_ended'] = self.single_ended
+        _names = [_r.get_name() for _r in self.rings]
+
+        self.acq_process = GCAcquisitionProcess(_s, _names, self.acq_stop, self.acq_ready, self.ring_lock)
+        self.acq_process.start()
+
+    #@description: Stops the acquisition process and frees the rings. Stop readers (read_rings_) first.
+    def stop_acquisition_process_(self):
+        if self.acq_process is None:
+            return
+
+        self.acq_stop.set()
+        self.acq_process.join(self.time_out + 1)
+        if self.acq_process.is_alive():
+            print('stop_acquisition_process: process did not exit, terminating')
+            self.acq_process.terminate()
+            self.acq_process.join()
+
+        for _r in self.rings:
+            _r.close_()
+            _r.unlink_()
+
+        self.rings = []
+        self.ring_cursors = []
+        self.ring_lock = None
+        self.acq_process = None
+
+    #@description: Waits (at most to seconds) for new samples and copies out everything written since the last call.
+    #@returns: list with one (dims, n) block per channel, n may be 0
+    def read_rings_(self, to=None):
+        if to is None:
+            to = self.time_out
+
+        self.acq_ready.wait(to)
+        self.acq_ready.clear()
+
+        blocks = []
+        for i in range(len(self.rings)):
+            _b, _c, _lost = self.rings[i].read_since(self.ring_cursors[i])
+            self.ring_cursors[i] = _c
+            self.ring_lost += _lost
+            blocks.append(_b)
+
+        return blocks
+
+    def is_process_running(self):
+        return self.acq_process is not None
+
+    #@returns: number of samples overwritten before this process read them
+    def get_ring_lost(self):
+        return self.ring_lost
+
+    '''
+    Broadcast functions: set_bus_size_, subscribe_, unsubscribe_, read_subscription, get_subscription_lost, get_subscribers
+    Every sample added to curr_data (append_curr_data_, extend_curr_data_, extend_channel_data_ on channel 0) is also
+    published on the bus. Consumers read it without the curr_data lock, so a slow one never holds up acquisition or the others.
+    '''
+    #@description: Replaces the bus with one of capacity samples. Existing subscriptions are dropped, call before subscribing.
+    def set_bus_size_(self, capacity):
+        self.bus = SampleBroadcast(self.dims, capacity)
+
+    #@param: name = label for get_subscribers, e.g. 'plot'
+    #@returns: subscriber id. The subscription starts at the next sample published.
+    def subscribe_(self, name):
+        return self.bus.subscribe_(name)
+
+    def unsubscribe_(self, sid):
+        self.bus.unsubscribe_(sid)
+
+    #@returns: ((dims, n) copy of the samples published since the last read, number lost to overflow since the last read)
+    def read_subscription(self, sid):
+        return self.bus.read_(sid)
+
+    #@returns: total samples subscriber sid has lost because it fell more than the bus size behind
+    def get_subscription_lost(self, sid):
+        return self.bus.get_lost(sid)
+
+    #@returns: list of (sid, name, samples behind, samples lost)
+    def get_subscribers(self):
+        return self.bus.get_subscribers()
+
     '''
     Temporary/old methods
     '''
@@ -478,9 +1560,75 @@ class GC:
     # old, dont trust
     def coll_volt_const_pts_self(self, num_pts):
         self.run_num += 1
-        self.prev_data.append(self.curr_data)
-        self.curr_data = self.coll_volt_const_pts(num_pts)
-        print(self.curr_data)
+        self.prev_data.append(np.copy(self.curr_buffer.view()))
+        self.curr_buffer.set_w_ref_(self.coll_volt_const_pts(num_pts))
+        print(self.curr_buffer.view())
+
+class GCAcquisitionProcess(mp_spawn.Process):
+    '''
+    Owns the ADS1115 in its own (spawned) process and writes samples into the SharedSampleRing(s) made by
+    GC.start_acquisition_process_. Nothing here shares the GIL with wxPython or matplotlib.
+    '''
+
+    #@param: settings = see GC.start_acquisition_process_, plus 'single_ended'
+    #@param: ring_names = shared memory names, one ring per channel
+    #@param: stop_event, ready_event = multiprocessing Events. ready_event is set after every write.
+    #@param: ring_lock = multiprocessing Lock the readers of the rings use (SharedSampleRing ordering), or None
+    def __init__(self, settings, ring_names, stop_event, ready_event, ring_lock=None):
+        super(GCAcquisitionProcess, self).__init__(daemon=True)
+
+        self.settings = settings
+        self.ring_names = ring_names
+        self.stop_event = stop_event
+        self.ready_event = ready_event
+        self.ring_lock = ring_lock
+
+    def run(self):
+        s = self.settings
+        gc = GC(s['single_ended'])
+        rings = [SharedSampleRing(name=_n, lock=self.ring_lock) for _n in self.ring_names]
+
+        _ti = gc.indices['t']
+        mode = s['mode']
+        bs = s['block_size']
+        sp = s['sampling_period']
+
+        if mode == 'scan':
+            gc.set_scan_list_(s['scan'])
+            gc.start_scan_(s['rate'], s['rdy_pin'])
+        elif mode == 'continuous':
+            gc.set_decimation_(s['decimation'], s['decimation_filter'])
+            gc.start_continuous_(s['rate'], s['rdy_pin'])
+
+        t_prev = [None] * len(rings)
+        sched = DeadlineScheduler(sp, self.stop_event)
+
+        while not self.stop_event.is_set():
+            if mode == 'scan':
+                blocks = gc.read_scan_block(bs)
+            elif mode == 'continuous':
+                _c, _t = gc.read_block(bs)
+                blocks = [gc.decimate_block(_c, _t)]
+            else:
+                if not sched.wait_next():
+                    break
+                blocks = [gc.read_block(1)]
+
+            for i in range(len(rings)):
+                codes, times = blocks[i]
+                if len(codes) == 0:
+                    continue
+
+                new = gc.block_to_data(codes, times, t_prev[i])
+                t_prev[i] = new[_ti, -1]
+                rings[i].write_(new)
+
+            self.ready_event.set()
+
+        gc.stop_scan_()
+        gc.stop_continuous_()
+        for _r in rings:
+            _r.close_()
 
 if __name__ == '__main__':
     pass
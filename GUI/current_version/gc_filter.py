@@ -0,0 +1,439 @@
+'''
+Name: gc_filter.py
+Authors: Conor Green and Matt McPartlan
+Description: Streaming filters for the sample stream. Each filter works on whole numpy blocks and carries its state
+                between calls, so filtering block by block gives the same result as filtering the whole run at once.
+Usage: Import from gc_class.py / gc_gui.py. Call as main to check block-wise against one-shot output and time the
+                decimators and smoothers.
+Version:
+1.0 - 18 October 2026 - Initial creation. DecimatingFIR and CICDecimator for oversample-and-decimate acquisition.
+1.1 - 18 October 2026 - Streaming smoothers: MovingMean (running sum), SavitzkyGolay, ExpSmoother. make_smoother.
+'''
+
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+#@description: Windowed sinc (Blackman) low pass for decimation by factor. Passband edge at 0.8 * the output Nyquist.
+#@param: taps_per_phase = taps per output sample. More taps give a sharper cutoff at a higher cost.
+#@returns: numpy array of taps_per_phase * factor + 1 taps with unit DC gain
+def design_lowpass(factor, taps_per_phase=8):
+    n = taps_per_phase * factor + 1
+    fc = 0.4 / factor
+    k = np.arange(n) - (n - 1) / 2
+
+    h = 2 * fc * np.sinc(2 * fc * k) * np.blackman(n)
+    return h / h.sum()
+
+class DecimatingFIR:
+    '''
+    Low pass FIR followed by keeping every factor-th output. Only the kept outputs are computed (one matrix-vector
+    product over a strided window view per block) and the last len(taps) - 1 inputs are carried to the next block.
+    Output timestamps are the input timestamps delayed by the filter's group delay (half its length), so peaks
+    stay where they were on the time axis.
+    Functions: process, reset_
+    Getters: get_factor, get_delay
+    '''
+
+    #@param: factor = decimation factor (input rate / output rate)
+    #@param: taps = filter taps. None designs a low pass with design_lowpass.
+    def __init__(self, factor, taps=None):
+        if taps is None:
+            taps = design_lowpass(factor)
+
+        self.factor = factor
+        self.taps = np.asarray(taps, dtype=np.float64)
+        self.rev_taps = self.taps[::-1].copy()
+        self.delay = (len(self.taps) - 1) // 2
+
+        self.reset_()
+
+    #@description: Forgets the carried samples. The next block starts a new stream.
+    def reset_(self):
+        self.hist = None
+        self.t_hist = None
+        self.count = 0
+
+    #@description: The stream is assumed to have sat at its first value before it started (no ramp up from zero).
+    #               Timestamps before the first one are extrapolated with the block's mean spacing.
+    def prime_(self, x, times):
+        _m = len(self.taps) - 1
+        self.hist = np.full(_m, float(x[0]))
+
+        _dt = (times[-1] - times[0]) // (len(times) - 1) if len(times) > 1 else 0
+        self.t_hist = times[0] - _dt * np.arange(_m, 0, -1, dtype=np.int64)
+
+    #@param: x = block of input samples (e.g. raw codes)
+    #@param: times = int64 ns timestamps of x
+    #@returns: (filtered samples, int64 ns timestamps), one per factor inputs. Empty if the block is too short.
+    def process(self, x, times):
+        if len(x) == 0:
+            return (np.zeros(0), np.zeros(0, dtype=np.int64))
+        if self.hist is None:
+            self.prime_(x, times)
+
+        R = self.factor
+        _m = len(self.taps) - 1
+
+        buf = np.concatenate((self.hist, np.asarray(x, dtype=np.float64)))
+        t_buf = np.concatenate((self.t_hist, np.asarray(times, dtype=np.int64)))
+
+        # First input of this block that completes a group of factor inputs
+        _s = (R - 1 - self.count) % R
+        win = sliding_window_view(buf, _m + 1)[_s::R]
+        y = win @ self.rev_taps
+        t = t_buf[_s + _m - self.delay::R][:len(y)]
+
+        self.hist = buf[len(buf) - _m:]
+        self.t_hist = t_buf[len(t_buf) - _m:]
+        self.count += len(x)
+
+        return (y, t)
+
+    def get_factor(self):
+        return self.factor
+
+    #@returns: group delay in input samples
+    def get_delay(self):
+        return self.delay
+
+class CICDecimator:
+    '''
+    Cascaded integrator-comb decimator: order integrators at the input rate, keep every factor-th value, order combs
+    at the output rate. No multiplies, so it is the cheapest choice for large factors, at the cost of a droopier
+    passband than DecimatingFIR. Integrators run in int64 on the raw codes; wrap-around cancels exactly in the combs.
+    The gain factor ** order is divided out.
+    Functions: process, reset_
+    Getters: get_factor, get_delay
+    '''
+
+    #@param: factor = decimation factor (input rate / output rate)
+    #@param: order = number of integrator/comb stages
+    def __init__(self, factor, order=3):
+        self.factor = factor
+        self.order = order
+        self.gain = float(factor) ** order
+        self.delay = order * (factor - 1) // 2
+
+        self.reset_()
+
+    #@description: Forgets the integrator/comb state. The next block starts a new stream.
+    def reset_(self):
+        self.integ = np.zeros(self.order, dtype=np.int64)
+        self.comb = np.zeros(self.order, dtype=np.int64)
+        self.t_hist = None
+        self.count = 0
+        self.primed = False
+
+    #@description: Runs order * factor copies of the first sample through the stages (output dropped), so the
+    #               stream starts settled at its first value instead of ramping up from zero.
+    def prime_(self, x, times):
+        self.primed = True
+        _n = self.order * self.factor
+        self.run_stages(np.full(_n, int(x[0]), dtype=np.int64))
+        self.count = 0
+
+        _dt = (times[-1] - times[0]) // (len(times) - 1) if len(times) > 1 else 0
+        self.t_hist = times[0] - _dt * np.arange(self.delay, 0, -1, dtype=np.int64)
+
+    #@returns: comb output (unscaled) for integer input x, updating the carried state
+    def run_stages(self, x):
+        R = self.factor
+
+        y = x
+        for i in range(self.order):
+            y = np.cumsum(y) + self.integ[i]
+            self.integ[i] = y[-1]
+
+        _s = (R - 1 - self.count) % R
+        self.count += len(x)
+        y = y[_s::R]
+
+        for i in range(self.order):
+            _prev = np.concatenate(([self.comb[i]], y[:-1]))
+            if len(y) > 0:
+                self.comb[i] = y[-1]
+            y = y - _prev
+
+        return y
+
+    #@param: x = block of integer input samples (raw ADS1115 codes)
+    #@param: times = int64 ns timestamps of x
+    #@returns: (filtered samples, int64 ns timestamps), one per factor inputs
+    def process(self, x, times):
+        if len(x) == 0:
+            return (np.zeros(0), np.zeros(0, dtype=np.int64))
+        if not self.primed:
+            self.prime_(x, times)
+
+        R = self.factor
+        _s = (R - 1 - self.count) % R
+
+        y = self.run_stages(np.asarray(x, dtype=np.int64)) / self.gain
+
+        t_buf = np.concatenate((self.t_hist, np.asarray(times, dtype=np.int64)))
+        t = t_buf[_s:_s + R * len(y):R]
+        self.t_hist = t_buf[len(t_buf) - self.delay:] if self.delay > 0 else t_buf[:0]
+
+        return (y, t)
+
+    def get_factor(self):
+        return self.factor
+
+    #@returns: group delay in input samples
+    def get_delay(self):
+        return self.delay
+
+#@description: Builds a decimator by name.
+#@param: kind = 'fir' or 'cic'
+def make_decimator(kind, factor):
+    if kind == 'cic':
+        return CICDecimator(factor)
+    return DecimatingFIR(factor)
+
+class MovingMean:
+    '''
+    Moving mean over window samples with a running sum: each new sample adds one value and drops the one window
+    samples back, so a block costs O(block) whatever the window. Centered like np.convolve(mode='same'), so every
+    output is (window - 1) // 2 samples behind the newest input (get_delay). The stream is zero padded at both ends,
+    also like np.convolve, so process over all blocks followed by flush gives GC.mov_mean_'s result.
+    Functions: process, flush, filter, reset_
+    Getters: get_window, get_delay
+    '''
+
+    #@param: window = samples averaged
+    def __init__(self, window):
+        self.window = int(window)
+        self.delay = (self.window - 1) // 2
+
+        self.reset_()
+
+    #@description: Forgets the carried samples. The next block starts a new stream.
+    def reset_(self):
+        self.hist = np.zeros(self.window - 1)
+        # Outputs before the first input (the left half of the first window) are not returned
+        self.skip = self.delay
+        self.started = False
+
+    #@returns: sum of the window ending at every sample of buf past the carried history
+    def window_sums(self, buf):
+        c = np.concatenate(([0.0], np.cumsum(buf)))
+        return c[self.window:] - c[:len(c) - self.window]
+
+    #@param: x = block of new samples
+    #@returns: filtered samples, one per input once the first delay inputs have been seen
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return np.zeros(0)
+        self.started = True
+
+        _m = self.window - 1
+        buf = np.concatenate((self.hist, x))
+        y = self.window_out(buf)
+
+        self.hist = buf[len(buf) - _m:]
+        _k = min(self.skip, len(y))
+        self.skip -= _k
+
+        return y[_k:]
+
+    #@returns: filtered values for the windows ending at the new samples of buf
+    def window_out(self, buf):
+        return self.window_sums(buf) / self.window
+
+    #@description: Ends the stream: pads with zeros to get the last delay outputs, then resets.
+    #@returns: the outputs still held back by the delay
+    def flush(self):
+        y = self.process(np.zeros(self.delay)) if self.started else np.zeros(0)
+        self.reset_()
+        return y
+
+    #@description: One-shot filtering of a whole run (reset, process, flush).
+    #@returns: numpy array of the same length as x
+    def filter(self, x):
+        self.reset_()
+        return np.concatenate((self.process(x), self.flush()))
+
+    def get_window(self):
+        return self.window
+
+    #@returns: samples between the newest input and the newest output
+    def get_delay(self):
+        return self.delay
+
+#@description: Savitzky-Golay taps: least squares fit of a degree order polynomial over window (odd) samples.
+#@param: deriv = derivative of the fit returned (0 smooths), dt = sample spacing for derivatives
+#@returns: numpy array of window taps for np.convolve (or SavitzkyGolay)
+def design_savgol(window, order, deriv=0, dt=1.0):
+    _h = (window - 1) // 2
+    z = np.arange(-_h, _h + 1, dtype=np.float64)
+    A = z[:, np.newaxis] ** np.arange(order + 1)
+
+    # Row deriv of the pseudo inverse evaluates that fit coefficient at the center; convolution flips it
+    c = np.linalg.pinv(A)[deriv] * np.prod(np.arange(1, deriv + 1)) / dt ** deriv
+    return c[::-1].copy()
+
+class SavitzkyGolay(MovingMean):
+    '''
+    Savitzky-Golay smoothing (or derivative) as a centered FIR: same carried history, delay and zero padded edges as
+    MovingMean, with one matrix-vector product over a strided window view per block instead of the running sum.
+    Keeps peak heights and widths better than the moving mean for the same noise reduction.
+    Functions: process, flush, filter, reset_
+    Getters: get_window, get_delay, get_taps
+    '''
+
+    #@param: window = odd number of samples in each fit, order = polynomial degree
+    #@param: deriv, dt = see design_savgol
+    def __init__(self, window, order=2, deriv=0, dt=1.0):
+        if window % 2 == 0:
+            window += 1
+        self.taps = design_savgol(window, order, deriv, dt)
+        self.rev_taps = self.taps[::-1].copy()
+
+        super(SavitzkyGolay, self).__init__(window)
+
+    def window_out(self, buf):
+        return sliding_window_view(buf, self.window) @ self.rev_taps
+
+    def get_taps(self):
+        return self.taps
+
+class ExpSmoother:
+    '''
+    Exponential smoothing y[k] = y[k-1] + alpha * (x[k] - y[k-1]) with y carried between blocks. No delay. The
+    recursion is solved in closed form over chunks short enough that (1 - alpha) ** -length stays well inside float
+    range, so a block is a few cumsums instead of a Python loop. Starts at the first sample (no ramp up from zero).
+    Functions: process, flush, filter, reset_
+    Getters: get_alpha, get_delay
+    '''
+
+    #@param: alpha = weight of the newest sample, 0 < alpha <= 1. 2 / (span + 1) matches a span sample moving mean.
+    def __init__(self, alpha):
+        self.alpha = float(alpha)
+
+        _decay = -np.log1p(-self.alpha) if self.alpha < 1 else np.inf
+        self.chunk = max(int(18.0 / _decay), 1)
+
+        self.reset_()
+
+    def reset_(self):
+        self.y = None
+
+    #@param: x = block of new samples
+    #@returns: smoothed samples, one per input
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return np.zeros(0)
+        if self.y is None:
+            self.y = x[0]
+
+        a = self.alpha
+        out = np.empty(len(x))
+        for i in range(0, len(x), self.chunk):
+            _x = x[i:i + self.chunk]
+            # y[j] = (1-a)^(j+1) * (y_prev + a * sum_{l<=j} x[l] / (1-a)^(l+1))
+            _p = (1.0 - a) ** np.arange(1, len(_x) + 1)
+            _y = _p * (self.y + a * np.cumsum(_x / _p)) if a < 1 else _x
+            out[i:i + len(_x)] = _y
+            self.y = _y[-1]
+
+        return out
+
+    #@description: Nothing is held back, only resets.
+    def flush(self):
+        self.reset_()
+        return np.zeros(0)
+
+    def filter(self, x):
+        self.reset_()
+        return self.process(x)
+
+    def get_alpha(self):
+        return self.alpha
+
+    def get_delay(self):
+        return 0
+
+#@description: Builds a smoother by name, all sized by a window in samples.
+#@param: kind = 'mean', 'ema' or 'savgol'
+def make_smoother(kind, window):
+    if kind == 'ema':
+        return ExpSmoother(2.0 / (window + 1))
+    if kind == 'savgol':
+        return SavitzkyGolay(window)
+    return MovingMean(window)
+
+#@description: Filters a synthetic 860 SPS stream in blocks of 256 and in one call, and compares timing and output.
+def benchmark_decimators(n=10**6, factor=172):
+    rng = np.random.default_rng(0)
+    t = np.arange(n, dtype=np.int64) * 1162791
+    x = (2000 * np.exp(-((t * 1e-9 - 500) / 20) ** 2) + rng.normal(0, 50, n)).astype(np.int16)
+
+    for kind in ('fir', 'cic'):
+        whole = make_decimator(kind, factor)
+        y_all, t_all = whole.process(x, t)
+
+        blocks = make_decimator(kind, factor)
+        _ys = []
+        _ts = []
+        t_start = time.perf_counter()
+        for i in range(0, n, 256):
+            _y, _t = blocks.process(x[i:i + 256], t[i:i + 256])
+            _ys.append(_y)
+            _ts.append(_t)
+        t_end = time.perf_counter()
+
+        y_blk = np.concatenate(_ys)
+        t_blk = np.concatenate(_ts)
+        _same = np.allclose(y_all, y_blk) and np.array_equal(t_all, t_blk)
+        _noise_in = np.std(x[:n // 4])
+        _noise_out = np.std(y_all[:len(y_all) // 4])
+
+        print('{:s}: {:d} -> {:d} samples, {:.1f} ns/input sample in blocks of 256, block-wise == one-shot: {}, '
+                'noise {:.1f} -> {:.1f} codes'.format(kind, n, len(y_blk), (t_end - t_start) / n * 1e9, _same,
+                _noise_in, _noise_out))
+
+#@description: Smooths a synthetic stream in blocks of 256 and compares with the batch result (np.convolve for
+#               the FIR smoothers, a plain loop for the EMA) and with re-running np.convolve over the growing run.
+def benchmark_smoothers(n=10**5, window=51):
+    rng = np.random.default_rng(0)
+    x = np.sin(np.arange(n) / 500) + rng.normal(0, 0.1, n)
+
+    for kind in ('mean', 'savgol', 'ema'):
+        f = make_smoother(kind, window)
+        if kind == 'ema':
+            ref = np.empty(n)
+            _y = x[0]
+            for i in range(n):
+                _y += f.get_alpha() * (x[i] - _y)
+                ref[i] = _y
+        else:
+            _taps = f.get_taps() if kind == 'savgol' else np.ones(window) / window
+            ref = np.convolve(x, _taps, mode='same')
+
+        _ys = []
+        t_start = time.perf_counter()
+        for i in range(0, n, 256):
+            _ys.append(f.process(x[i:i + 256]))
+        _ys.append(f.flush())
+        t_end = time.perf_counter()
+        y = np.concatenate(_ys)
+
+        print('{:s}: {:.2f} us/sample in blocks of 256, block-wise == batch: {}'.format(kind,
+                (t_end - t_start) / n * 1e6, len(y) == n and np.allclose(y, ref, atol=1e-9)))
+
+    # What a live refresh cost before: the whole run so far convolved again every block
+    _w = np.ones(window) / window
+    t_start = time.perf_counter()
+    for i in range(256, 20001, 256):
+        np.convolve(x[:i], _w, mode='same')
+    t_end = time.perf_counter()
+    print('np.convolve over the growing run: {:.2f} us/sample (first 20000 samples)'.format(
+            (t_end - t_start) / 20000 * 1e6))
+
+if __name__ == '__main__':
+    benchmark_decimators()
+    benchmark_smoothers()
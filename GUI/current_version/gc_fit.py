@@ -0,0 +1,221 @@
+'''
+Name: gc_fit.py
+Authors: Conor Green and Matt McPartlan
+Description: Peak deconvolution. Each region from peak segmentation is fitted as a sum of Gaussian or exponentially
+                modified Gaussian (EMG) components, so co-eluting compounds get one area each.
+Usage: Import from gc_class.py (GC.deconvolve_peaks). Call as main to fit a synthetic run serially and with a pool.
+Requires: scipy (least_squares, erfc/erfcx), see Installation/Libraries.md.
+Version:
+1.0 - 18 October 2026 - Initial creation. Gaussian/EMG models with analytic Jacobians, apex/residual warm starts, process pool.
+'''
+
+import time
+import multiprocessing
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.special import erfc, erfcx
+from scipy.ndimage import maximum_filter1d, uniform_filter1d
+
+# One row per fitted component. region = row of the peak table it came from, center/sigma/tau in seconds
+# (tau 0 for Gaussians), height = highest point of the component, rms = fit residual of its whole region.
+FIT_DTYPE = np.dtype([('region', np.int64), ('area', np.float64), ('center', np.float64), ('sigma', np.float64),
+                        ('tau', np.float64), ('height', np.float64), ('rms', np.float64)])
+
+SQRT2 = np.sqrt(2.0)
+SQRT2PI = np.sqrt(2.0 * np.pi)
+
+#@description: Sum of Gaussians, each parametrized by (area, center, sigma).
+#@param: p = flat parameter array, 3 per component
+#@returns: (model values, Jacobian of shape (len(t), len(p))) with want_jac, else model values
+def gauss_model(p, t, want_jac=False):
+    A, mu, s = p[0::3, np.newaxis], p[1::3, np.newaxis], p[2::3, np.newaxis]
+    x = t - mu
+    f = A / (s * SQRT2PI) * np.exp(-0.5 * (x / s) ** 2)
+    if not want_jac:
+        return f.sum(axis=0)
+
+    J = np.empty((len(p), len(t)))
+    J[0::3] = f / A
+    J[1::3] = f * x / s ** 2
+    J[2::3] = f * (x ** 2 / s ** 3 - 1.0 / s)
+    return (f.sum(axis=0), J.T)
+
+#@description: Sum of EMGs (Gaussian convolved with an exponential tail of time constant tau), each parametrized by
+#               (area, center, sigma, tau). exp * erfc is evaluated through erfcx where it would overflow.
+#@param: p = flat parameter array, 4 per component
+#@returns: (model values, Jacobian of shape (len(t), len(p))) with want_jac, else model values
+def emg_model(p, t, want_jac=False):
+    A, mu, s, tau = p[0::4, np.newaxis], p[1::4, np.newaxis], p[2::4, np.newaxis], p[3::4, np.newaxis]
+    x = t - mu
+    z = (s / tau - x / s) / SQRT2
+    gauss = np.exp(-0.5 * (x / s) ** 2)
+
+    # g = exp(s^2 / (2 tau^2) - x / tau) * erfc(z), and exp(lnE - z^2) = gauss
+    _zp = np.maximum(z, 0.0)
+    _lnE = np.minimum(0.5 * (s / tau) ** 2 - x / tau, 700.0)
+    g = np.where(z >= 0, gauss * erfcx(_zp), np.exp(_lnE) * erfc(np.minimum(z, 0.0)))
+
+    c = A / (2.0 * tau)
+    f = c * g
+    if not want_jac:
+        return f.sum(axis=0)
+
+    # dg = g * dlnE - 2 / sqrt(pi) * gauss * dz
+    k = 2.0 / np.sqrt(np.pi) * gauss
+    J = np.empty((len(p), len(t)))
+    J[0::4] = g / (2.0 * tau)
+    J[1::4] = c * (g / tau - k / (s * SQRT2))
+    J[2::4] = c * (g * s / tau ** 2 - k * (1.0 / tau + x / s ** 2) / SQRT2)
+    J[3::4] = c * (g * (x / tau ** 2 - s ** 2 / tau ** 3) + k * s / (tau ** 2 * SQRT2)) - f / tau
+    return (f.sum(axis=0), J.T)
+
+MODELS = {'gauss':(gauss_model, 3), 'emg':(emg_model, 4)}
+
+#@description: Apex estimates for the warm start: local maxima of the smoothed region that rise at least min_sigma
+#               noise units and min_frac of the highest point. Shoulders are added later from the fit residual.
+#@param: noise = noise standard deviation of y
+#@returns: numpy array of indices into y, at least one
+def find_apexes(y, noise, min_sigma=5.0, min_frac=0.05):
+    _w = max(len(y) // 25, 1)
+    ys = uniform_filter1d(y, _w, mode='nearest')
+
+    _span = max(len(y) // 10, 3)
+    _min = max(min_frac * ys.max(), min_sigma * noise)
+    cand = (ys == maximum_filter1d(ys, _span, mode='nearest')) & (ys >= _min)
+
+    # Flat tops give runs of equal maxima, keep the first point of each
+    idx = np.flatnonzero(cand)
+    if len(idx) == 0:
+        return np.array([int(np.argmax(ys))])
+    idx = idx[np.concatenate(([True], np.diff(idx) > 1))]
+    return idx
+
+#@returns: noise standard deviation from the median absolute first difference
+def mad_noise(y):
+    if len(y) < 3:
+        return 0.0
+    _d = np.diff(y)
+    return 1.4826 * np.median(np.abs(_d - np.median(_d))) / np.sqrt(2)
+
+#@description: Starting parameters from apex indices: center at the apex, sigma from the distance to the neighbouring
+#               apexes (or the region edges), area from height * sigma * sqrt(2 pi), tau = sigma.
+#@returns: (p0, lower bounds, upper bounds) flat arrays
+def initial_guess(t, y, apexes, model):
+    _n = MODELS[model][1]
+    _dt = (t[-1] - t[0]) / max(len(t) - 1, 1)
+
+    _edges = np.concatenate(([t[0]], t[apexes], [t[-1]]))
+    _gap = np.minimum(np.diff(_edges)[:-1], np.diff(_edges)[1:])
+    sigma = np.maximum(_gap / 2.5, 2 * _dt)
+    area = np.maximum(y[apexes], 0.0) * sigma * SQRT2PI
+
+    _cols = [area, t[apexes], sigma] + ([sigma] if _n == 4 else [])
+    p0 = np.column_stack(_cols).ravel()
+
+    _span = t[-1] - t[0]
+    lo = np.column_stack([np.zeros_like(area), np.full_like(area, t[0]), np.full_like(area, 0.5 * _dt)]
+                            + ([np.full_like(area, 0.5 * _dt)] if _n == 4 else [])).ravel()
+    hi = np.column_stack([np.full_like(area, np.inf), np.full_like(area, t[-1]), np.full_like(area, _span)]
+                            + ([np.full_like(area, _span)] if _n == 4 else [])).ravel()
+    return (p0, lo, hi)
+
+#@description: Least squares fit of the components in p0 (trust region, analytic Jacobian).
+#@returns: scipy OptimizeResult
+def fit_components(func, t, y, p0, lo, hi):
+    p0 = np.clip(p0, lo, hi)
+    return least_squares(lambda p: func(p, t) - y, p0, jac=lambda p: func(p, t, True)[1], bounds=(lo, hi),
+                            method='trf', x_scale='jac')
+
+#@description: Fits one region. Starts with a component on every apex from find_apexes, then adds one at the highest
+#               point of the smoothed residual while that stands min_sigma noise units out, like a peak would (a
+#               shoulder the apex search missed), and the fit improves, warm starting from the previous parameters each time. Module level
+#               (not a method) so a process pool can pickle it.
+#@param: job = (region number, t, y, model) with y already baseline corrected
+#@returns: list of FIT_DTYPE row tuples, one per component
+def fit_region(job, max_components=8, min_sigma=5.0):
+    region, t, y, model = job
+    func, _n = MODELS[model]
+    noise = mad_noise(y)
+    _w = max(len(y) // 25, 1)
+
+    p0, lo, hi = initial_guess(t, y, find_apexes(y, noise, min_sigma), model)
+    res = fit_components(func, t, y, p0, lo, hi)
+
+    while len(res.x) // _n < max_components:
+        _r = uniform_filter1d(-res.fun, _w, mode='nearest')
+        _i = int(np.argmax(_r))
+        if _r[_i] < min_sigma * noise:
+            break
+
+        _p, _lo, _hi = initial_guess(t, _r, np.array([_i]), model)
+        _p[2] = min(_p[2], np.median(res.x[2::_n]))
+        if _n == 4:
+            _p[3] = _p[2]
+        _new = fit_components(func, t, y, np.concatenate((res.x, _p)), np.concatenate((lo, _lo)),
+                                np.concatenate((hi, _hi)))
+        if _new.cost > 0.95 * res.cost:
+            break
+        res = _new
+        lo = np.concatenate((lo, _lo))
+        hi = np.concatenate((hi, _hi))
+
+    p = res.x.reshape(-1, _n)
+    p = p[np.argsort(p[:, 1])]
+    rms = np.sqrt(np.mean(res.fun ** 2))
+
+    rows = []
+    for _c in p:
+        _height = func(_c, t).max()
+        _tau = _c[3] if _n == 4 else 0.0
+        rows.append((region, _c[0], _c[1], _c[2], _tau, _height, rms))
+    return rows
+
+#@description: Fits every region, in a process pool when processes > 1 and there is more than one region.
+#@param: regions = list of (t, y) pairs, y baseline corrected
+#@param: model = 'gauss' or 'emg'
+#@returns: numpy structured array of FIT_DTYPE, components of region 0 first
+def fit_regions(regions, model='gauss', processes=0):
+    jobs = [(i, np.asarray(_t, dtype=np.float64), np.asarray(_y, dtype=np.float64), model)
+            for i, (_t, _y) in enumerate(regions)]
+
+    if processes > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(fit_region, jobs)
+    else:
+        results = [fit_region(_j) for _j in jobs]
+
+    rows = [_r for _rows in results for _r in _rows]
+    return np.array(rows, dtype=FIT_DTYPE)
+
+#@description: Checks the analytic Jacobians against finite differences, then fits 40 regions of two overlapping
+#               components each, serially and with a pool, and reports the area error.
+def benchmark_fit(n_regions=40, processes=4):
+    rng = np.random.default_rng(0)
+    for model, p in (('gauss', np.array([1.0, 5.0, 0.8, 0.5, 6.5, 0.6])),
+                        ('emg', np.array([1.0, 5.0, 0.8, 0.7, 0.5, 6.5, 0.6, 0.4]))):
+        t = np.linspace(0, 12, 400)
+        J = MODELS[model][0](p, t, True)[1]
+        _fd = np.column_stack([(MODELS[model][0](p + _e, t) - MODELS[model][0](p - _e, t)) / 2e-6
+                                for _e in np.eye(len(p)) * 1e-6])
+        print('{:s} Jacobian max |analytic - finite difference|: {:.2e}'.format(model, np.max(np.abs(J - _fd))))
+
+    t = np.linspace(0, 12, 600)
+    regions = []
+    truth = []
+    for i in range(n_regions):
+        _a = rng.uniform(0.5, 2.0, 2)
+        _p = np.array([_a[0], 5.0, 0.7, _a[1], 6.8, 0.6])
+        regions.append((t, gauss_model(_p, t) + rng.normal(0, 0.005, len(t))))
+        truth.extend(_a.tolist())
+
+    for _proc in (0, processes):
+        t_start = time.perf_counter()
+        table = fit_regions(regions, 'gauss', _proc)
+        t_end = time.perf_counter()
+        _err = np.max(np.abs(table['area'] - np.array(truth))) if len(table) == len(truth) else np.nan
+        print('{:d} regions, processes={:d}: {:.3f} s, {:d} components, max area error {:.4f}'.format(n_regions,
+                _proc, t_end - t_start, len(table), _err))
+
+if __name__ == '__main__':
+    benchmark_fit()
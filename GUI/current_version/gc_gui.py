@@ -26,6 +26,32 @@ Version (mainly for final report later):
 3.3 - 25 April 2020 - Label peaks works.
 3.4 - 27 April 2020 - Low pass filter works. Run numbers added to .gc json file type.
 4.0 - 27 April 2020 - Finalized to submit for capstone course. Will move to main.py (=>.exe/bin)
+4.1 - 18 October 2026 - GCData appends each sample with gc.append_curr_data_ instead of copying and np.append-ing the whole run.
+4.2 - 18 October 2026 - ADS_CONTINUOUS option. GCData.run_continuous reads ALERT/RDY paced conversions instead of sleep polling.
+4.3 - 18 October 2026 - GCData moves whole read_block batches into gc (one lock and notify per block, ADS_BLOCK_SIZE).
+4.4 - 18 October 2026 - ADS_SCAN option and GCData.run_scan for multi-channel acquisition.
+4.5 - 18 October 2026 - ACQ_PROCESS option. GCData.run_ring copies samples out of the acquisition process' shared memory.
+4.6 - 18 October 2026 - All four threads run on DeadlineScheduler (monotonic deadlines, no sleep polling). Jitter printed on stop.
+4.7 - 18 October 2026 - GCReceiver and DetectorPanel copy only the samples added since their last update (epoch/cursor).
+4.8 - 18 October 2026 - GCReceiver (plot) reads a subscription on gc's sample bus instead of waiting on the Condition. BUS_SIZE option.
+4.9 - 18 October 2026 - prev_data holds PackedRun (int16 codes, int64 ns), about a third of the memory of float64 arrays.
+4.10 - 18 October 2026 - ADS_DECIMATION/DECIMATION_FILTER options: oversample at ADS_DATA_RATE and decimate with a streaming FIR/CIC.
+4.11 - 18 October 2026 - Peak labels read the table from gc.analyze_peaks (one analysis pass instead of two).
+4.12 - 18 October 2026 - GCPeakWatcher: online peak detection on a bus subscription (ONLINE_PEAKS), table kept in online_peaks.
+4.13 - 18 October 2026 - SMOOTHING option for the low pass menu. LIVE_SMOOTHING filters new plot samples in GCReceiver.
+4.14 - 18 October 2026 - PEAK_THRESHOLD/PEAK_NOISE_SIGMA/PEAK_NOISE_WINDOW options passed to gc.set_peak_threshold_.
+4.15 - 18 October 2026 - BASELINE/BASELINE_PARAM options passed to gc.set_baseline_.
+4.16 - 18 October 2026 - Deconvolve Peaks menu item (on_deconvolve). FIT_MODEL/FIT_PROCESSES options.
+4.17 - 18 October 2026 - PEAK_DETECTOR/PEAK_WIDTH options passed to gc.set_peak_detector_.
+4.18 - 18 October 2026 - Data > Operations toggle gc's pipeline steps instead of overwriting gc's curr_data.
+4.19 - 18 October 2026 - ZERO_COPY option (gc.set_zero_copy_): gc hands out read-only views instead of copies.
+4.20 - 18 October 2026 - curr_data_frame_lock is a gc_sync.RWLock. Appends to gc and the frame take append mode, readers read
+                            mode, so the plot and menus no longer hold up acquisition. Lock waits printed on stop.
+4.21 - 18 October 2026 - Data > Analyze All Runs (on_analyze_runs): peaks and areas of every previous run in one gc.analyze_runs call.
+4.22 - 18 October 2026 - Data > Align Runs (on_align_runs): previous runs aligned to the first one and overlaid. ALIGN_* options.
+4.23 - 18 October 2026 - GCReceiver reads once more after stop and flushes the smoother's held back columns.
+4.24 - 18 October 2026 - PRINT_STATS option: scheduler, bus overflow and lock wait stats on stop only when set.
+4.25 - 18 October 2026 - Align Runs aligns to the first run with 2 points (the first frame stored is empty) and names it.
 '''
 
 import numpy as np
@@ -51,6 +77,12 @@ from threading import Thread
 
 import serial
 
+from gc_scheduler import DeadlineScheduler
+from gc_buffer import SampleBuffer
+from gc_sync import RWLock
+from gc_peaks import OnlinePeakDetector
+from gc_filter import make_smoother
+
 imdir = '.images'
 
 # Frames
@@ -76,12 +108,13 @@ class GCFrame(wx.Frame):
         self.temp_thread_running = False
         self.establish_temperature_thread_()
 
-        # including curr_data_frame and curr_data_frame_lock
-        self.curr_data_frame_lock = threading.Lock()
+        # including curr_data_frame and curr_data_frame_lock. GCReceiver appends in append mode, the plot and menus
+        # read in read mode (.reader), anything that replaces the frame data takes it exclusively (with/acquire).
+        self.curr_data_frame_lock = RWLock()
         self.establish_GC_()
 
         _dims = self.gc.get_dims()
-        self.curr_data_frame = np.zeros((_dims, 0))
+        self.curr_data_frame = SampleBuffer(_dims)
         self.update_curr_data_()
 
         self.prev_data = []
@@ -90,6 +123,10 @@ class GCFrame(wx.Frame):
         self.data_running = False
         self.data_paused = False
 
+        # OnlinePeakDetector thread (ONLINE_PEAKS) and the table it left at the last stop
+        self.peak_thread = None
+        self.online_peaks = None
+
 
     '''
     Building functions
@@ -137,6 +174,20 @@ class GCFrame(wx.Frame):
         se = self.options['single_ended']
         self.gc = GC(se)
         self.gc_lock = self.gc.get_lock()
+        self.gc.set_bus_size_(self.options['BUS_SIZE'])
+        self.gc.set_decimation_(self.options['ADS_DECIMATION'], self.options['DECIMATION_FILTER'])
+        self.gc.set_peak_threshold_(self.options['PEAK_THRESHOLD'], self.options['PEAK_NOISE_SIGMA'],
+                                    self.options['PEAK_NOISE_WINDOW'])
+        self.gc.set_baseline_(self.options['BASELINE'], self.options['BASELINE_PARAM'])
+        self.gc.set_fit_(self.options['FIT_MODEL'], self.options['FIT_PROCESSES'])
+        self.gc.set_peak_detector_(self.options['PEAK_DETECTOR'], self.options['PEAK_WIDTH'])
+        self.gc.set_zero_copy_(self.options['ZERO_COPY'])
+        self.gc.set_alignment_(self.options['ALIGN_MAX_SHIFT'], self.options['ALIGN_RESOLUTION'],
+                                self.options['ALIGN_SEGMENT'], self.options['ALIGN_SLACK'])
+
+        _scan = self.options['ADS_SCAN']
+        if len(_scan) > 1:
+            self.gc.set_scan_list_(_scan)
 
     def establish_options_(self, uo):
         self.options = {'frame_size':(1200,600), 'sash_size':400, 'data_samp_rate':5.0,
@@ -146,7 +197,15 @@ class GCFrame(wx.Frame):
                         'gc_file_indices': {'cd':'Current Data', 'pd':'Previous Data', 'rn':'Run Number'},
                         'window':3}
 
-        _constants = {'BODY_FONT_SIZE': 11, 'HEADER_FONT_SIZE':18,'EXTRA_SPACE':10, 'BORDER':10}
+        _constants = {'BODY_FONT_SIZE': 11, 'HEADER_FONT_SIZE':18,'EXTRA_SPACE':10, 'BORDER':10,
+                        'ADS_CONTINUOUS':False, 'ADS_DATA_RATE':860, 'ALERT_RDY_PIN':17, 'ADS_BLOCK_SIZE':256,
+                        'ADS_SCAN':[], 'ACQ_PROCESS':False, 'ACQ_RING_SIZE':65536, 'BUS_SIZE':65536,
+                        'ADS_DECIMATION':1, 'DECIMATION_FILTER':'fir', 'ONLINE_PEAKS':False,
+                        'ONLINE_PEAK_SIGMA':5.0, 'SMOOTHING':'mean', 'LIVE_SMOOTHING':False,
+                        'PEAK_THRESHOLD':'fixed', 'PEAK_NOISE_SIGMA':5.0, 'PEAK_NOISE_WINDOW':256,
+                        'BASELINE':None, 'BASELINE_PARAM':None, 'FIT_MODEL':'gauss', 'FIT_PROCESSES':0,
+                        'PEAK_DETECTOR':'threshold', 'PEAK_WIDTH':25, 'ZERO_COPY':True, 'ALIGN_MAX_SHIFT':30.0,
+                        'ALIGN_RESOLUTION':0.1, 'ALIGN_SEGMENT':0.0, 'ALIGN_SLACK':1.0, 'PRINT_STATS':False}
         self.options.update(_constants)
         self.options.update(uo)
         self.options['frame_size'] = self.options['DEFAULT_FRAME_SIZE']
@@ -177,7 +236,7 @@ class GCFrame(wx.Frame):
         with _gcl:
             self.gc.set_curr_data_w_ref_(cd)
 
-        self.prev_data = pd
+        self.prev_data = [self.gc.pack_run(_d) for _d in pd]
         self.run_number = rn
 
     def parse_session(self, name):
@@ -234,25 +293,24 @@ class GCFrame(wx.Frame):
 
         return numpy_dict
 
+    #@description: Copies gc's run, after the enabled pipeline steps, into the frame.
     def update_curr_data_(self):
-        _gcl = self.gc.get_lock()
-        with _gcl:
-            _d = self.gc.get_curr_data()
+        _d = self.gc.get_processed_data()
 
         _l = self.curr_data_frame_lock
         with _l:
             self.set_curr_data_(_d)
 
     def curr_to_prev_(self):
-        _l = self.curr_data_frame_lock
+        _l = self.curr_data_frame_lock.reader
         with _l:
             _d = self.get_curr_data_copy()
 
-        self.prev_data.append(_d)
+        self.prev_data.append(self.gc.pack_run(_d))
         self.re_int_curr_data()
 
     def prev_to_curr_(self):
-        d = self.prev_data.pop()
+        d = np.asarray(self.prev_data.pop())
 
         _l = self.curr_data_frame_lock
         with _l:
@@ -271,13 +329,17 @@ class GCFrame(wx.Frame):
     def set_curr_data_(self, d):
         _il = self.is_frame_data_locked()
         if _il:
-            d = np.copy(d)
-            self.curr_data_frame = d
+            self.curr_data_frame.set_(d)
 
     def set_curr_data_w_ref_(self, d):
         _il = self.is_frame_data_locked()
         if _il:
-            self.curr_data_frame = d
+            self.curr_data_frame.set_w_ref_(d)
+
+    def extend_curr_data_(self, d):
+        _il = self.is_frame_data_locked()
+        if _il:
+            self.curr_data_frame.extend_(d)
 
     '''
         Getters
@@ -285,18 +347,26 @@ class GCFrame(wx.Frame):
     def get_curr_data(self):
         _il = self.is_frame_data_locked()
         if _il:
-            _d = self.curr_data_frame
+            _d = self.curr_data_frame.view()
 
         return _d
 
     def get_curr_data_copy(self):
         _il = self.is_frame_data_locked()
         if _il:
-            _d = self.curr_data_frame
+            _d = self.curr_data_frame.view()
             _c = np.copy(_d)
 
         return _c
 
+    #@description: Delta read for the detector panel, see SampleBuffer.read_since
+    def get_curr_data_since(self, epoch, cursor):
+        _il = self.is_frame_data_locked()
+        if _il:
+            _r = self.curr_data_frame.read_since(epoch, cursor)
+
+        return _r
+
     def get_prev_data_copy(self):
         _pd = self.prev_data
         _pdc = [ np.copy(_item) for _item in _pd ]
@@ -363,21 +433,55 @@ class GCFrame(wx.Frame):
         self.curr_to_prev_()
         self.gc.curr_to_prev_()
 
-        gcl = self.gc_lock
+        # Append mode: GCData's appends and GCReceiver's resync exclude each other, gc's readers stay out of it
+        gcl = self.gc.get_append_lock()
         self.gc_cond = threading.Condition(gcl)
+        self.gc_lock.reset_stats_()
+        self.curr_data_frame_lock.reset_stats_()
 
         gc = self.gc
         condition = self.gc_cond
         _ind = self.options['indices']
-        self.data_rover_thread = GCData(gc, condition, _ind, args = ( sp, ep ) )
+
+        _dr = self.options['ADS_DATA_RATE']
+        _pin = self.options['ALERT_RDY_PIN']
+        _scan = self.options['ADS_SCAN']
+        bs = self.options['ADS_BLOCK_SIZE']
+        # Decimation needs the continuous stream at ADS_DATA_RATE to filter
+        _dec = self.options['ADS_DECIMATION']
+        _cont = self.options['ADS_CONTINUOUS'] or _dec > 1
+        if self.options['ACQ_PROCESS']:
+            if len(_scan) > 1:
+                _mode = 'scan'
+            elif _cont:
+                _mode = 'continuous'
+            else:
+                _mode = 'single'
+            _settings = {'mode':_mode, 'rate':_dr, 'rdy_pin':_pin, 'scan':_scan, 'block_size':bs, 'sampling_period':sp,
+                            'decimation':_dec, 'decimation_filter':self.options['DECIMATION_FILTER']}
+            gc.start_acquisition_process_(_settings, self.options['ACQ_RING_SIZE'])
+        elif len(_scan) > 1:
+            gc.start_scan_(_dr, _pin)
+        elif _cont:
+            gc.start_continuous_(_dr, _pin)
+
+        self.data_rover_thread = GCData(gc, condition, _ind, args = ( sp, ep, bs ) )
 
         rsp = self.options['plot_refresh_rate']
         lock = self.curr_data_frame_lock
-        self.receiver_thread = GCReceiver(self, lock, gc, condition, args = ( rsp, ep ))
+        sid = gc.subscribe_('plot')
+        _sm = make_smoother(self.options['SMOOTHING'], self.options['window']) if self.options['LIVE_SMOOTHING'] else None
+        self.receiver_thread = GCReceiver(self, lock, gc, condition, args = ( rsp, ep, sid, _sm ))
 
         self.data_rover_thread.start()
         self.receiver_thread.start()
 
+        self.peak_thread = None
+        if self.options['ONLINE_PEAKS']:
+            _psid = gc.subscribe_('peaks')
+            self.peak_thread = GCPeakWatcher(gc, _ind, args = ( rsp, _psid, self.options['ONLINE_PEAK_SIGMA'] ))
+            self.peak_thread.start()
+
         self.plotter_thread = GCPlotter(self, args=(rsp,ep))
         self.plotter_thread.start()
 
@@ -396,15 +500,43 @@ class GCFrame(wx.Frame):
         self.plotter_thread.stop()
         self.plotter_thread.join()
 
+        self.data_rover_thread.stop()
+        self.data_rover_thread.join()
+
+        # After the producer, so the receiver's and the watcher's last reads see every sample
         self.receiver_thread.stop()
         self.receiver_thread.join()
 
-        self.data_rover_thread.stop()
-        self.data_rover_thread.join()
+        if self.peak_thread is not None:
+            self.peak_thread.stop()
+            self.peak_thread.join()
+            self.online_peaks = self.peak_thread.get_table()
+            print('Online peaks: {:d} found'.format(len(self.online_peaks)))
+
+        # Scheduler, overflow and lock wait stats with PRINT_STATS. Lost samples are reported regardless.
+        _stats = self.options['PRINT_STATS']
+        if _stats:
+            self.plotter_thread.scheduler.print_stats('GCPlotter')
+            self.receiver_thread.scheduler.print_stats('GCReceiver')
+        for _sid, _name, _behind, _lost in self.gc.get_subscribers():
+            if _stats or _lost > 0:
+                print('Subscriber {:s}: {:d} samples lost to overflow'.format(_name, _lost))
+        if _stats:
+            self.gc_lock.print_stats('gc curr_data_lock')
+            self.curr_data_frame_lock.print_stats('curr_data_frame_lock')
+        self.gc.unsubscribe_(self.receiver_thread.sid)
+        if self.peak_thread is not None:
+            self.gc.unsubscribe_(self.peak_thread.sid)
+        if _stats and not (self.gc.is_continuous() or self.gc.is_scanning() or self.gc.is_process_running()):
+            self.data_rover_thread.scheduler.print_stats('GCData')
+
+        self.gc.stop_continuous_()
+        self.gc.stop_scan_()
+        self.gc.stop_acquisition_process_()
 
         self.data_running = False
 
-        if self.curr_data_frame_lock.locked():
+        if self.curr_data_frame_lock.is_writing():
             self.curr_data_frame_lock.release()
 
         print('Message: Stopped data collection threads.')
@@ -475,17 +607,21 @@ class GCFrame(wx.Frame):
     def on_previous_set(self, err):
         self.prev_to_curr_()
 
+    # The Operations menu toggles pipeline steps (GC.toggle_step_), curr_data in gc is never overwritten
+
     def on_data_integrate(self, err):
         if not self.data_running:
-            ans = self.gc.integrate_volt()
-            print("The integral of voltage over the sampling period is: ")
-            print(ans)
-            self.gc.calc_cumsum_into_area_()
+            self.gc.set_step_('area', True)
             self.update_curr_data_()
+            with self.curr_data_frame_lock.reader:
+                _a = self.get_curr_data()[self.options['indices']['a']]
+                ans = _a[-1] if len(_a) > 0 else None
+            print("The integral of voltage over the sampling period [V s] is: ")
+            print(ans)
 
     def on_data_normalize(self, err):
         if not self.data_running:
-            self.gc.normalize_volt_()
+            self.gc.toggle_step_('normalize')
             self.update_curr_data_()
 
             self.panel_detector.update_curr_data_()
@@ -493,7 +629,7 @@ class GCFrame(wx.Frame):
 
     def on_clean_time(self, err):
         if not self.data_running:
-            self.gc.clean_time_()
+            self.gc.toggle_step_('clean_time')
             self.update_curr_data_()
 
             self.panel_detector.update_curr_data_()
@@ -505,17 +641,51 @@ class GCFrame(wx.Frame):
 
     def on_label_peaks(self, err):
         if not self.data_running:
-            areas = self.gc.integrate_peaks()
-            # list of (x,y) pairs
-            maximas = self.gc.get_peak_local_maximas()
+            # one row per peak: start, end, apex, apex_volt, area, width, height
+            peaks = self.gc.analyze_peaks()
 
+            self.update_curr_data_()
             self.panel_detector.update_curr_data_()
-            self.panel_detector.label_peaks_(areas, maximas)
+            self.panel_detector.label_peaks_(peaks)
+
+    def on_deconvolve(self, err):
+        if not self.data_running:
+            comps = self.gc.deconvolve_peaks()
+            print('Peak components ({:s}): region, area [V s], center [s], sigma [s], tau [s]'.format(
+                    self.options['FIT_MODEL']))
+            for _c in comps:
+                print('{:d} {:.6g} {:.3f} {:.3f} {:.3f}'.format(_c['region'], _c['area'], _c['center'], _c['sigma'],
+                        _c['tau']))
+
+    # Every run in prev_data at once (gc_batch.py), without loading them into curr_data with prev_to_curr_
+    def on_analyze_runs(self, err):
+        if not self.data_running:
+            peaks = self.gc.analyze_runs(self.prev_data)
+            areas = self.gc.integrate_runs(self.prev_data)
+            _counts = np.bincount(peaks['run'], minlength=len(self.prev_data))
+            print('Previous runs: run, peaks, area [V s], peak areas (normalized)')
+            for i in range(len(self.prev_data)):
+                _a = peaks['area'][peaks['run'] == i]
+                print('{:d} {:d} {:.6g} {:s}'.format(i, _counts[i], areas[i], ' '.join('{:.4f}'.format(_x) for _x in _a)))
+
+    # Aligned runs are cached in gc, so aligning again after a new run only correlates that run
+    def on_align_runs(self, err):
+        if not self.data_running and len(self.prev_data) > 0:
+            _ref = self.gc.get_align_ref(self.prev_data)
+            table = self.gc.align_runs(self.prev_data, _ref)
+            print('Previous runs aligned to run {:d}: run, shift [s], warp [s], correlation before, after'.format(_ref))
+            for _r in table:
+                print('{:d} {:.3f} {:.3f} {:.3f} {:.3f}'.format(_r['run'], _r['shift'], _r['warp'], _r['corr_raw'],
+                        _r['corr']))
+
+            runs = [self.gc.get_aligned_run(i, self.prev_data, _ref) for i in range(len(self.prev_data))]
+            self.panel_detector.overlay_runs_(runs)
 
     def on_mov_mean(self, err):
         if not self.data_running:
             _w = self.options['window']
-            self.gc.mov_mean_(_w)
+            _on = self.gc.is_step_enabled('smooth')
+            self.gc.set_step_('smooth', not _on, kind=self.options['SMOOTHING'], window=_w)
             self.update_curr_data_()
 
             self.panel_detector.update_curr_data_()
@@ -789,7 +959,7 @@ class SaveasGC(SaveasWindow):
         _time = time.strftime('%H:%M:%S',time.localtime())
         time_str = 'Time at save: ' + _time
 
-        _l = self.parent.curr_data_frame_lock
+        _l = self.parent.curr_data_frame_lock.reader
         with _l:
             data = self.parent.get_curr_data_copy()
 
@@ -940,6 +1110,8 @@ class GCTemperature(Thread):
         self.ov_location = self.frame.options['OVEN_INDEX']
         self.inj_location = self.frame.options['INJ_INDEX']
 
+        self.scheduler = DeadlineScheduler(self.sp, self._stop_event)
+
 
     def stop(self):
         self._stop_event.set()
@@ -948,22 +1120,13 @@ class GCTemperature(Thread):
         return self._stop_event.is_set()
 
     def run(self):
-        sampling_period = self.sp
-        epsilon = self.ep
-
         o_l = self.ov_location
         d_l = self.inj_location
 
-        t_last = time.time()
-
-        while not self.stopped():
-            t_curr= time.time()
-            while (t_curr - epsilon -t_last < sampling_period):
-                time.sleep(.1)
-                t_curr = time.time()
-
-            t_last = t_curr
+        sched = self.scheduler
+        sched.reset_()
 
+        while sched.wait_next():
             bit_response = self.query_temp()
 
             temperatures = self.parse_response(bit_response)
@@ -1071,6 +1234,7 @@ class GCPlotter(Thread):
         self.ep = kwargs['args'][1]
 
         self._stop_event = threading.Event()
+        self.scheduler = DeadlineScheduler(self.sp, self._stop_event)
 
     def stop(self):
         self._stop_event.set()
@@ -1079,18 +1243,10 @@ class GCPlotter(Thread):
         return self._stop_event.is_set()
 
     def run(self):
-        sampling_period = self.sp
-        epsilon = self.ep
-
-        t_last = time.time()
-        while not self.stopped():
-            t_curr= time.time()
-            while (t_curr - epsilon -t_last < sampling_period):
-                time.sleep(.1)
-                t_curr = time.time()
-
-            t_last = t_curr
+        sched = self.scheduler
+        sched.reset_()
 
+        while sched.wait_next():
             self.frame.panel_detector.update_curr_data_()
             func = self.frame.panel_detector.draw
             wx.CallAfter(func)
@@ -1101,8 +1257,15 @@ class GCReceiver(Thread):
 
         self.sp = kwargs['args'][0]
         self.ep = kwargs['args'][1]
+        self.sid = kwargs['args'][2]
         self.time_out = 1
 
+        # Optional gc_filter smoother for the plotted voltage (LIVE_SMOOTHING). Columns whose smoothed value is
+        # still held back by the filter's delay wait in pending.
+        self.smoother = kwargs['args'][3]
+        self.pending = None
+        self.v_ind = frame.options['indices']['v']
+
         self._stop_event = threading.Event()
 
         self.frame = frame
@@ -1111,6 +1274,8 @@ class GCReceiver(Thread):
 
         self.gc_cond = condition
 
+        self.scheduler = DeadlineScheduler(self.sp, self._stop_event)
+
     def stop(self):
         self._stop_event.set()
 
@@ -1118,29 +1283,116 @@ class GCReceiver(Thread):
         return self._stop_event.is_set()
 
     def run(self):
-        sampling_period = self.sp
-        epsilon = self.ep
-        to = self.time_out
+        sched = self.scheduler
+        sched.reset_()
 
-        t_last = time.time()
-        while not self.stopped():
-            t_curr= time.time()
-            while (t_curr - epsilon -t_last < sampling_period):
-                time.sleep(.01)
-                t_curr = time.time()
+        while sched.wait_next():
+            self.read_()
+        # Whatever arrived between the last cycle and stop, then the columns held back by the smoother's delay
+        self.read_()
+        self.flush_()
+
+    #@description: Appends everything new on the subscription to the frame's copy, or resyncs it after an overflow.
+    def read_(self):
+        # Bus reads never take gc's lock, only the resync after an overflow does
+        new, lost = self.gc.read_subscription(self.sid)
 
-            t_last = t_curr
+        if lost > 0:
             with self.gc_cond:
-                val = self.gc_cond.wait(to)
+                gc_d = self.gc.get_curr_data()
+                self.gc.read_subscription(self.sid)
+            gc_d = self.smooth_(gc_d, restart=True)
+            with self.data_lock:
+                self.frame.set_curr_data_(gc_d)
+        elif new.shape[1] > 0:
+            new = self.smooth_(new)
+            with self.data_lock.appender:
+                self.frame.extend_curr_data_(new)
+
+    #@description: Ends the smoother's stream: the pending columns get the outputs of its tail (zero padded, like
+    #               GC.mov_mean_ over the whole run) and are appended, so the frame's copy is as long as gc's.
+    def flush_(self):
+        _sm = self.smoother
+        if _sm is None:
+            return
 
-            if val:
-                with self.gc_cond:
-                    gc_d = self.gc.get_curr_data()
-                with self.data_lock:
-                    self.frame.set_curr_data_(gc_d)
+        y = _sm.flush()
+        if self.pending is None or self.pending.shape[1] == 0:
+            return
 
-            else:
-              print("Error: Timeout on data reception reached.")
+        out = self.pending[:, :len(y)].copy()
+        out[self.v_ind] = y[:out.shape[1]]
+        self.pending = None
+        with self.data_lock.appender:
+            self.frame.extend_curr_data_(out)
+
+    #@description: Only the new columns go through the smoother, so a refresh costs O(new samples).
+    #@param: restart = block is a whole run (resync), the smoother starts over
+    #@returns: the columns whose voltage is now smoothed (block unchanged without a smoother)
+    def smooth_(self, block, restart=False):
+        _sm = self.smoother
+        if _sm is None:
+            return block
+        if restart:
+            _sm.reset_()
+            self.pending = None
+
+        y = _sm.process(block[self.v_ind])
+        if self.pending is not None:
+            block = np.concatenate((self.pending, block), axis=1)
+
+        out = block[:, :len(y)].copy()
+        out[self.v_ind] = y
+        self.pending = block[:, len(y):]
+        return out
+
+class GCPeakWatcher(Thread):
+    '''
+    Runs the online peak detector (gc_peaks.OnlinePeakDetector) on its own subscription to gc's sample bus during
+    acquisition. Events are printed as they happen. The finished table is read with get_table after stop.
+    '''
+    def __init__(self, gc, indices, *args, **kwargs):
+        super(GCPeakWatcher, self).__init__()
+
+        self.sp = kwargs['args'][0]
+        self.sid = kwargs['args'][1]
+        self.indices = indices
+        self.gc = gc
+
+        self._stop_event = threading.Event()
+
+        self.detector = OnlinePeakDetector(on_sigma=kwargs['args'][2])
+        self.scheduler = DeadlineScheduler(self.sp, self._stop_event)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def run(self):
+        sched = self.scheduler
+        sched.reset_()
+
+        while sched.wait_next():
+            self.read_()
+        # Whatever arrived between the last cycle and stop
+        self.read_()
+
+    #@description: Feeds everything new on the subscription to the detector. Samples lost to overflow are skipped.
+    def read_(self):
+        new, lost = self.gc.read_subscription(self.sid)
+        if lost > 0:
+            print('GCPeakWatcher: {:d} samples lost, peak areas may be short'.format(lost))
+        if new.shape[1] == 0:
+            return
+
+        for _kind, _i, _t, _v in self.detector.process(new[self.indices['v']], new[self.indices['t']]):
+            print('Peak {:s} at {:.2f} s ({:.5f} V)'.format(_kind, _t, _v))
+
+    #@returns: PEAK_DTYPE table of the peaks finished so far
+    def get_table(self):
+        return self.detector.get_table()
 
 class GCData(Thread):
     def __init__(self, gc, condition, indices, *args, **kwargs):
@@ -1148,6 +1400,7 @@ class GCData(Thread):
 
         self.sp = kwargs['args'][0]
         self.ep = kwargs['args'][1]
+        self.block_size = kwargs['args'][2]
         self.indices = indices
         self.gc = gc
         self._stop_event = threading.Event()
@@ -1157,6 +1410,10 @@ class GCData(Thread):
         #
         self.avail = False
 
+        self.time_out = 1
+
+        self.scheduler = DeadlineScheduler(self.sp, self._stop_event)
+
     def stop(self):
         self._stop_event.set()
 
@@ -1176,48 +1433,111 @@ class GCData(Thread):
         return self.avail
 
     def run(self):
-        t_last = time.time()
+        if self.gc.is_process_running():
+            self.run_ring()
+            return
+        elif self.gc.is_scanning():
+            self.run_scan()
+            return
+        elif self.gc.is_continuous():
+            self.run_continuous()
+            return
+
+        _ti = self.indices['t']
+
+        # time [s] of the previous sample, for dt
+        t_prev = None
 
-        sampling_period = self.sp
-        epsilon = self.ep
-        dims = self.gc.get_dims()
+        sched = self.scheduler
+        sched.reset_()
+
+        while sched.wait_next():
+            # Deadlines keep ticking while paused, so sampling resumes on the same grid
+            if self.paused():
+                continue
+
+            codes, times = self.gc.read_block(1)
+            new = self.gc.block_to_data(codes, times, t_prev)
+            t_prev = new[_ti, -1]
+
+            with self.condition:
+                self.gc.extend_curr_data_(new)
+                self.condition.notify_all()
+
+    #@description: Continuous (ALERT/RDY) acquisition. The ADS1115 paces the samples, so there is no sleeping here.
+    #               Each pass moves a whole block (up to block_size conversions) with one lock and one notify.
+    #               Conversions that arrive while paused are dropped, same as the single-shot loop skipping them.
+    #               With ADS_DECIMATION > 1 every block is low pass filtered and decimated first (gc.decimate_block).
+    def run_continuous(self):
+        to = self.time_out
+        bs = self.block_size
+        _ti = self.indices['t']
+
+        t_prev = None
 
         while not self.stopped():
-            while self.paused():
-                time.sleep(.01)
-                if self.stopped():
-                    return
+            codes, times = self.gc.read_block(bs, to)
+            # Filter even while paused so the decimator state stays continuous
+            codes, times = self.gc.decimate_block(codes, times)
 
-            t_curr= time.time()
-            while (t_curr - epsilon -t_last < sampling_period):
-                time.sleep(.01)
-                t_curr = time.time()
+            if self.paused() or len(codes) == 0:
+                continue
 
-            v = self.gc.measure_voltage()
+            new = self.gc.block_to_data(codes, times, t_prev)
+            t_prev = new[_ti, -1]
 
-            dt = t_curr - t_last
-            t = t_curr
-            t_last = t_curr
+            with self.condition:
+                self.gc.extend_curr_data_(new)
+                self.condition.notify_all()
 
-            new = np.zeros((dims, 1))
+    #@description: Multi-channel scan. Each block is split per channel and appended to that channel's buffer
+    #               (channel 0 is curr_data), so every channel keeps its own timestamps.
+    def run_scan(self):
+        to = self.time_out
+        bs = self.block_size
+        _ti = self.indices['t']
 
-            ind = self.indices
-            _vi = ind['v']
-            _dti = ind['dt']
-            _ti = ind['t']
+        num_ch = self.gc.get_num_channels()
+        t_prev = [None] * num_ch
 
-            new[_vi] = v
-            new[_dti] = dt
-            new[_ti] = t
-            # a default zero
+        while not self.stopped():
+            blocks = self.gc.read_scan_block(bs, to)
+
+            if self.paused():
+                continue
+
+            news = []
+            for i in range(num_ch):
+                codes, times = blocks[i]
+                if len(codes) == 0:
+                    news.append(None)
+                    continue
+
+                new = self.gc.block_to_data(codes, times, t_prev[i])
+                t_prev[i] = new[_ti, -1]
+                news.append(new)
 
             with self.condition:
-                old = self.gc.get_curr_data()
+                for i in range(num_ch):
+                    if news[i] is not None:
+                        self.gc.extend_channel_data_(i, news[i])
+                self.condition.notify_all()
+
+    #@description: Acquisition runs in GCAcquisitionProcess. This thread only copies new samples out of the
+    #               shared memory rings into gc, so nothing on the GUI side can stall a conversion.
+    def run_ring(self):
+        to = self.time_out
+
+        while not self.stopped():
+            blocks = self.gc.read_rings_(to)
 
-            new = np.append(old, new, axis=1)
+            if self.paused():
+                continue
 
             with self.condition:
-                self.gc.set_curr_data_(new)
+                for i in range(len(blocks)):
+                    if blocks[i].shape[1] > 0:
+                        self.gc.extend_channel_data_(i, blocks[i])
                 self.condition.notify_all()
 
 #Panels
@@ -1233,6 +1553,12 @@ class DetectorPanel(wx.Panel):
 
         self.fonts = parent.create_fonts()
 
+        # Own copy of the frame data, topped up with only the new samples (update_curr_data_)
+        self.panel_buffer = SampleBuffer(len(self.indices))
+        self.curr_data = self.panel_buffer.view()
+        self.epoch = -1
+        self.cursor = 0
+
         self.create_panel()
 
     def create_panel(self):
@@ -1338,8 +1664,11 @@ class DetectorPanel(wx.Panel):
 
         return hbox
 
-    def label_peaks_(self, areas, maximas):
-        num_pts = len(areas)
+    #@param: peaks = peak table from GC.analyze_peaks
+    def label_peaks_(self, peaks):
+        num_pts = len(peaks)
+        areas = peaks['area']
+        apexes = peaks['apex']
 
         cd = self.get_curr_data()
         ind = self.gcframe.options['indices']
@@ -1354,7 +1683,7 @@ class DetectorPanel(wx.Panel):
         for i in range(0,num_pts):
             _astr = str(areas[i])
             _text = 'Relative area:\n' + _astr[:accuracy]
-            max_index , max_val  = maximas[i]
+            max_index = apexes[i]
             _x = t[max_index]
             _y = v[max_index]
             self.axes.annotate(_text, xy= (_x,_y), xytext=(20,-20), xycoords='data', textcoords = 'offset pixels')
@@ -1367,6 +1696,24 @@ class DetectorPanel(wx.Panel):
         func = self.canvas.draw
         wx.CallAfter(func)
 
+    #@param: runs = list of (dims, N) runs on a common time axis (GC.get_aligned_run), labelled by position
+    def overlay_runs_(self, runs):
+        _vi = self.indices['v']
+        _ti = self.indices['t']
+
+        self.axes.cla()
+        for i, _r in enumerate(runs):
+            self.axes.plot(_r[_ti], _r[_vi], label='Run ' + str(i))
+        self.axes.legend()
+
+        _xstr = self.units_str['x-axis']
+        _ystr = self.units_str['y-axis']
+        self.axes.set_xlabel(_xstr)
+        self.axes.set_ylabel(_ystr)
+
+        func = self.canvas.draw
+        wx.CallAfter(func)
+
     def fill_under_(self):
         cd = self.get_curr_data()
         _vi = self.indices['v']
@@ -1408,8 +1755,16 @@ class DetectorPanel(wx.Panel):
         self.gcframe.on_plot_btn()
 
     def update_curr_data_(self):
-        with self.gcframe.curr_data_frame_lock:
-            self.curr_data = self.gcframe.get_curr_data_copy()
+        _e = self.epoch
+        with self.gcframe.curr_data_frame_lock.reader:
+            _d, self.epoch, self.cursor = self.gcframe.get_curr_data_since(_e, self.cursor)
+
+        if self.epoch == _e:
+            self.panel_buffer.extend_(_d)
+        else:
+            self.panel_buffer.set_w_ref_(_d)
+
+        self.curr_data = self.panel_buffer.view()
 
     def clear_plot_btn_evt(self, event):
         self.gcframe.on_clr_btn()
@@ -1599,6 +1954,9 @@ class GCMenuBar(wx.MenuBar):
         _label_peaks = grapher_menu.Append(wx.ID_ANY, '&Label Peaks')
         self.parent.Bind(wx.EVT_MENU, self.parent.on_label_peaks, _label_peaks)
 
+        _deconvolve = grapher_menu.Append(wx.ID_ANY, '&Deconvolve Peaks')
+        self.parent.Bind(wx.EVT_MENU, self.parent.on_deconvolve, _deconvolve)
+
         return grapher_menu
 
     def create_data_menu(self):
@@ -1607,6 +1965,12 @@ class GCMenuBar(wx.MenuBar):
         prev_set = data_menu.Append(wx.ID_ANY, '&Previous Set')
         self.parent.Bind(wx.EVT_MENU, self.parent.on_previous_set, prev_set)
 
+        analyze_runs = data_menu.Append(wx.ID_ANY, '&Analyze All Runs')
+        self.parent.Bind(wx.EVT_MENU, self.parent.on_analyze_runs, analyze_runs)
+
+        align_runs = data_menu.Append(wx.ID_ANY, '&Align Runs')
+        self.parent.Bind(wx.EVT_MENU, self.parent.on_align_runs, align_runs)
+
         data_menu_ops = wx.Menu()
         integ = data_menu_ops.Append(wx.ID_ANY, '&Integrate')
         self.parent.Bind(wx.EVT_MENU, self.parent.on_data_integrate, integ )
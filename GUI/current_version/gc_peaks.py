@@ -0,0 +1,898 @@
+'''
+Name: gc_peaks.py
+Authors: Conor Green and Matt McPartlan
+Description: Peak table layout, robust noise thresholds, the Savitzky-Golay derivative and wavelet ridge detectors
+                (GC.find_peaks), and the online (streaming) peak detector that runs during acquisition.
+Usage: Import from gc_class.py / gc_gui.py. Call as main to check the 'mad' thresholds on quantized blank runs and
+                savgol_peaks on blank and smoothed runs, time the online detector, then the offline detectors against
+                the original threshold loop on synthetic runs of 1e4 to 1e7 points.
+Version:
+1.0 - 18 October 2026 - Initial creation. PEAK_DTYPE (moved from gc_class.py) and OnlinePeakDetector.
+1.1 - 18 October 2026 - rolling_median, rolling_mad_noise, noise_thresholds for thresholds on raw volts.
+1.2 - 18 October 2026 - savgol_peaks and cwt_peaks (FFT wavelet transform) detectors. rolling_median covers the tail.
+1.3 - 18 October 2026 - threshold_segments and peak_table (moved from GC.define_peaks/define_peak_table) for gc_batch.py.
+1.4 - 18 October 2026 - savgol_peaks: no crash without apexes, noise of already smoothed volts (block_mad), edges skipped.
+1.5 - 18 October 2026 - OnlinePeakDetector: baseline is a line fit, so it follows drift through peaks; max_time rebase.
+1.6 - 18 October 2026 - rolling_mad_noise does not collapse to 0 on quantized volts (robust_std, quantization_noise).
+1.7 - 18 October 2026 - savgol_peaks and cwt_peaks keep a noise floor on quantized volts; cwt_peaks skips the run ends.
+'''
+
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import next_fast_len, rfft, irfft, rfftfreq
+from scipy.ndimage import convolve1d, maximum_filter1d
+
+from gc_filter import design_savgol, make_smoother
+from gc_buffer import AreaIndex
+
+# Row of a peak table (GC.analyze_peaks, OnlinePeakDetector). Indices into the run, width in seconds. Height is above
+# the line joining the start and end points (analyze_peaks) or above the running baseline (OnlinePeakDetector).
+PEAK_DTYPE = np.dtype([('start', np.int64), ('end', np.int64), ('apex', np.int64), ('apex_volt', np.float64),
+                        ('area', np.float64), ('width', np.float64), ('height', np.float64)])
+
+#@description: Median over a window sliding in steps of hop, interpolated back to every sample. The default hop of
+#               one window (back to back blocks) touches every value once, whatever the window. Baseline and noise
+#               change slowly compared with the window, so the interpolation loses little. The last window is aligned
+#               with the end of x, so the tail is covered too.
+#@returns: numpy array of len(x)
+def rolling_median(x, window, hop=None):
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if n == 0:
+        return np.zeros(0)
+    window = max(min(int(window), n), 1)
+    if hop is None:
+        hop = window
+
+    starts = np.arange(0, n - window + 1, hop)
+    if starts[-1] != n - window:
+        starts = np.append(starts, n - window)
+    med = np.median(sliding_window_view(x, window)[starts], axis=1)
+    centers = starts + (window - 1) / 2
+
+    # Carry the end slopes over the half windows before the first and after the last center, so a drifting
+    # baseline is followed to the ends of the run
+    out = np.interp(np.arange(n), centers, med)
+    if len(centers) > 1:
+        _i = np.arange(n)
+        _lo = _i < centers[0]
+        _hi = _i > centers[-1]
+        out[_lo] = med[0] + (_i[_lo] - centers[0]) * (med[1] - med[0]) / (centers[1] - centers[0])
+        out[_hi] = med[-1] + (_i[_hi] - centers[-1]) * (med[-1] - med[-2]) / (centers[-1] - centers[-2])
+    return out
+
+#@description: Standard deviation of every row of win from its median absolute deviation, which ignores the peaks'
+#               flanks. Volts quantized to ADC codes with noise under about half a code have more than half their
+#               differences exactly 0, and the MAD collapses to 0 (so every code flip would clear any threshold). Where
+#               the MAD gives under half the estimate from the mean absolute deviation (the two agree for Gaussian
+#               noise), the root mean square deviation is used instead, with the top tenth clipped to the 90th
+#               percentile so flanks count no more than any other tenth, and scaled by 1.097 to match Gaussian noise.
+#               The few-valued differences of codes come out about right and a little high, never short.
+#@param: win = (windows, window) array
+#@returns: numpy array with one standard deviation per window
+def robust_std(win):
+    _dev = np.abs(win - np.median(win, axis=-1, keepdims=True))
+    std = 1.4826 * np.median(_dev, axis=-1)
+    _few = std < 0.5 * np.sqrt(np.pi / 2) * np.mean(_dev, axis=-1)
+    if np.any(_few):
+        _d = _dev[_few]
+        _d = np.minimum(_d, np.quantile(_d, 0.9, axis=-1, keepdims=True))
+        std = np.where(_few, 0.0, std)
+        std[_few] = 1.097 * np.sqrt(np.mean(_d * _d, axis=-1))
+    return std
+
+#@description: Noise floor of quantized volts: the smallest step between two samples (one ADC code on raw volts, in
+#               whatever units they were scaled to) over sqrt(12), the standard deviation of rounding to it. A lone
+#               code flip then stays under the thresholds, however few flips the mean absolute deviation counts.
+#               Steps under 1e-9 of the largest volt are float rounding (a smoother's running sums), not codes, and
+#               that resolution is the least floor. Unquantized volts have tiny steps and get a negligible floor.
+#@returns: float
+def quantization_noise(volt):
+    if len(volt) < 2:
+        return 0.0
+    _tol = 1e-9 * np.max(np.abs(volt))
+    _d = np.abs(np.diff(volt))
+    _d = _d[_d > _tol]
+    if len(_d) == 0:
+        return _tol
+    return max(_d.min() / np.sqrt(12), _tol)
+
+#@description: Local noise standard deviation from the first difference over a sliding window (robust_std, same hop
+#               scheme as rolling_median), at least quantization_noise. Differences ignore the baseline level and slow
+#               drift, so raw volts work without normalizing, and the median ignores the peaks' own flanks.
+#@returns: numpy array of len(volt)
+def rolling_mad_noise(volt, window, hop=None):
+    volt = np.asarray(volt, dtype=np.float64)
+    n = len(volt)
+    if n < 3:
+        return np.zeros(n)
+    d = np.diff(volt)
+    window = max(min(int(window), len(d)), 2)
+    if hop is None:
+        hop = window
+
+    win = sliding_window_view(d, window)[::hop]
+
+    # d[i] sits between volt[i] and volt[i + 1]
+    centers = np.arange(len(win)) * hop + window / 2
+    noise = np.interp(np.arange(n), centers, robust_std(win) / np.sqrt(2))
+    return np.maximum(noise, quantization_noise(volt))
+
+#@description: Standard deviation of x from its median absolute deviation (robust_std) in windows stepping by hop
+#               (back to back by default), for x with no baseline left in it (e.g. differences).
+#@returns: (window centers, standard deviation per window) numpy arrays, empty for fewer than 2 points
+def block_mad(x, window, hop=None):
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if n < 2:
+        return (np.zeros(0), np.zeros(0))
+    window = max(min(int(window), n), 2)
+    if hop is None:
+        hop = window
+
+    win = sliding_window_view(x, window)[::hop]
+
+    centers = np.arange(len(win)) * hop + (window - 1) / 2
+    return (centers, robust_std(win))
+
+#@description: Peak thresholds for raw volts: rolling baseline plus on_sigma / off_sigma / min_sigma local noise units.
+#@param: window = samples in each noise window, base_window = samples in each baseline window (much wider than a peak)
+#@returns: (on, off, min) numpy arrays of len(volt): start/end thresholds and the lowest apex kept, for GC.define_peaks
+def noise_thresholds(volt, on_sigma, off_sigma, min_sigma, window, base_window):
+    base = rolling_median(volt, base_window)
+    noise = rolling_mad_noise(volt, window)
+    return (base + on_sigma * noise, base + off_sigma * noise, base + min_sigma * noise)
+
+#@description: First index of the maximum of x in each [starts[i], ends[i]) (disjoint, ends[i] > starts[i]), in a few
+#               array passes.
+#@returns: numpy array of indices into x
+def segment_argmax(x, starts, ends):
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    n = len(x)
+    _m = np.maximum.reduceat(x, np.ravel(np.column_stack((starts, np.minimum(ends, n - 1)))))[::2]
+    _m = np.maximum(_m, x[starts])
+
+    seg = np.searchsorted(starts, np.arange(n), side='right') - 1
+    inside = (seg >= 0) & (np.arange(n) < ends[np.maximum(seg, 0)])
+    _cand = np.flatnonzero(inside & (x == _m[np.maximum(seg, 0)]))
+    _first = np.unique(seg[_cand], return_index=True)[1]
+    return _cand[_first]
+
+#@description: Threshold segmentation (GC.define_peaks). A peak starts at the first point >= volt_thresh and ends at the
+#               next point <= it, and is kept if it spans at least time_thresh points. Vectorized version of the old
+#               per-point on_peak loop with identical output, including points exactly at the threshold (each one
+#               flips the state, as in the loop) and a peak still open at the end being dropped.
+#               With off_thresh, a peak instead starts at >= volt_thresh and ends at the first point <= off_thresh
+#               (hysteresis).
+#@param: volt_thresh = scalar or one threshold per point
+#@param: off_thresh = end threshold (scalar or per point) below volt_thresh, or None
+#@param: min_volt = peaks whose maximum stays below it (scalar or per point, taken at the start) are dropped, or None
+#@returns: (lows, highs) int64 index arrays, both inclusive
+def threshold_segments(volt, volt_thresh, time_thresh, off_thresh=None, min_volt=None):
+    num_pts = len(volt)
+    if num_pts == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    above = volt > volt_thresh
+    equal = volt == volt_thresh
+
+    # State after each point: the last point off the threshold decides (above => on), every threshold point
+    # after it toggles. Before the first such point the loop starts off.
+    if off_thresh is not None:
+        # Hysteresis: the last point at/above start or at/below end decides
+        _ev = np.where(volt >= volt_thresh, 1, np.where(volt <= off_thresh, -1, 0))
+        last = np.maximum.accumulate(np.where(_ev != 0, np.arange(num_pts), -1))
+        on = (last >= 0) & (_ev[np.maximum(last, 0)] > 0)
+    elif equal.any():
+        _idx = np.where(equal, -1, np.arange(num_pts))
+        last = np.maximum.accumulate(_idx)
+        n_eq = np.cumsum(equal)
+
+        base = np.where(last >= 0, above[np.maximum(last, 0)], False)
+        n_eq_at_last = np.where(last >= 0, n_eq[np.maximum(last, 0)], 0)
+        on = base ^ ((n_eq - n_eq_at_last) % 2 == 1)
+    else:
+        on = above
+
+    edges = np.diff(on.astype(np.int8), prepend=np.int8(0))
+    lows = np.flatnonzero(edges == 1)
+    highs = np.flatnonzero(edges == -1)
+    lows = lows[:len(highs)]
+
+    keep = highs - lows >= time_thresh
+    if min_volt is not None and len(lows) > 0:
+        _max = np.maximum.reduceat(volt, np.ravel(np.column_stack((lows, highs))))[::2]
+        keep &= _max >= np.broadcast_to(min_volt, volt.shape)[lows]
+
+    return (lows[keep], highs[keep])
+
+#@description: Measures peaks in a few array passes (GC.define_peak_table). Area is the trapezoidal area from t[low]
+#               to t[high], apex the first maximum of volt[low:high], height above the line from start to end point.
+#@param: lows, highs = int64 index arrays from a segmentation, sorted and disjoint
+#@param: index = AreaIndex of (t, volt). None builds one.
+#@returns: numpy structured array of PEAK_DTYPE
+def peak_table(volt, t, lows, highs, index=None):
+    table = np.zeros(len(lows), dtype=PEAK_DTYPE)
+    if len(lows) == 0:
+        return table
+
+    n = len(volt)
+
+    # Apex over [low, high): max per segment, then the first index in the segment holding it
+    _bounds = np.ravel(np.column_stack((lows, highs)))
+    apex_volt = np.maximum.reduceat(volt, _bounds)[::2]
+
+    seg = np.searchsorted(lows, np.arange(n), side='right') - 1
+    inside = (seg >= 0) & (np.arange(n) < highs[np.maximum(seg, 0)])
+    _cand = np.flatnonzero(inside & (volt == apex_volt[np.maximum(seg, 0)]))
+    _first = np.unique(seg[_cand], return_index=True)[1]
+    apex = _cand[_first]
+
+    if index is None:
+        index = AreaIndex(t, volt)
+    area = index.area(lows, highs)
+
+    _frac = (apex - lows) / (highs - lows)
+    baseline = volt[lows] + _frac * (volt[highs] - volt[lows])
+
+    table['start'] = lows
+    table['end'] = highs
+    table['apex'] = apex
+    table['apex_volt'] = apex_volt
+    table['area'] = area
+    table['width'] = t[highs] - t[lows]
+    table['height'] = apex_volt - baseline
+
+    return table
+
+#@description: Turns apex positions into (low, high) peak ranges. A peak reaches out to the last point at or below off
+#               on either side, and neighbouring apexes are split at the point of highest second derivative between
+#               them (the valley, or the flattest point between a peak and its shoulder).
+#@param: ys, d2 = smoothed voltage and its second derivative, off = end threshold (scalar or per point)
+#@param: apexes = sorted apex indices, at least 2 apart
+#@returns: List of (low, high) index tuples
+def apex_segments(ys, d2, apexes, off):
+    n = len(ys)
+    if len(apexes) == 0:
+        return []
+    idx = np.arange(n)
+    below = ys <= off
+
+    lows = np.maximum.accumulate(np.where(below, idx, 0))[apexes]
+    highs = np.minimum.accumulate(np.where(below, idx, n - 1)[::-1])[::-1][apexes]
+
+    split = segment_argmax(d2, apexes[:-1] + 1, apexes[1:])
+    lows[1:] = np.maximum(lows[1:], split)
+    highs[:-1] = np.minimum(highs[:-1], split)
+
+    keep = highs - lows >= 2
+    return list(zip(lows[keep].tolist(), highs[keep].tolist()))
+
+#@description: Savitzky-Golay derivative detector. Apexes are downward zero crossings of the smoothed first derivative;
+#               shoulders are minima of the second derivative (upward zero crossings of the third) with no apex
+#               within half a window. Heights are tested against the noise left after smoothing, which is several
+#               times lower than the raw noise the single threshold has to clear, so small peaks are found too.
+#@param: window = odd number of points per fit, about the width of the narrowest peak
+#@param: on_sigma, off_sigma = apex height / end level in units of the smoothed noise above the rolling baseline
+#@param: noise_window, base_window = see noise_thresholds
+#@returns: List of (low, high) index tuples
+def savgol_peaks(volt, window, on_sigma=5.0, off_sigma=2.0, noise_window=256, base_window=4096):
+    volt = np.asarray(volt, dtype=np.float64)
+    window = max(int(window) | 1, 5)
+    if len(volt) < 2 * window:
+        return []
+
+    _taps = [design_savgol(window, 3, k) for k in range(4)]
+    ys, d1, d2, d3 = [convolve1d(volt, _t, mode='nearest') for _t in _taps]
+
+    h = ys - rolling_median(volt, base_window)
+    noise = rolling_mad_noise(volt, noise_window)
+    # Only a flat run has no noise (not even one code step), and no peaks
+    if not np.any(noise > 0):
+        return []
+    n0 = noise * np.sqrt(np.sum(_taps[0] ** 2))
+    n2 = noise * np.sqrt(np.sum(_taps[2] ** 2))
+
+    # The first difference assumes white noise and misses most of the noise of volts that were smoothed already (the
+    # pipeline's smooth step). Differences of ys and d2 over a window, about their correlation length, measure their
+    # noise whatever the input: one factor per run (medians, so peaks hardly count) scales the local estimates up.
+    # White input gives about 1 (a little more from peak flanks) and is left alone. Every 4th point is plenty for it.
+    if len(volt) > 4 * window:
+        _e0 = np.median(block_mad((ys[window:] - ys[:-window])[::4], noise_window)[1]) / np.sqrt(2)
+        _e2 = np.median(block_mad((d2[window:] - d2[:-window])[::4], noise_window)[1]) / np.sqrt(2)
+        _c0 = _e0 / np.median(n0)
+        _c2 = _e2 / np.median(n2)
+        if _c0 > 1.5:
+            n0 = n0 * _c0
+        if _c2 > 1.5:
+            n2 = n2 * _c2
+
+    apex = np.flatnonzero((d1[:-1] > 0) & (d1[1:] <= 0))
+    apex = apex + (ys[apex + 1] > ys[apex])
+    apex = apex[h[apex] >= on_sigma * n0[apex]]
+
+    sh = np.flatnonzero((d3[:-1] < 0) & (d3[1:] >= 0)) + 1
+    sh = sh[(d2[sh] <= -on_sigma * n2[sh]) & (h[sh] >= on_sigma * n0[sh])]
+    if len(apex) > 0 and len(sh) > 0:
+        _j = np.clip(np.searchsorted(apex, sh), 1, len(apex)) - 1
+        _near = np.minimum(np.abs(sh - apex[_j]), np.abs(sh - apex[np.minimum(_j + 1, len(apex) - 1)]))
+        sh = sh[_near > window // 2]
+
+    # Within a window of either end the fits run past the data (and a smoothed run ramps in from 0)
+    apexes = np.union1d(apex, sh)
+    apexes = apexes[(apexes >= window) & (apexes < len(volt) - window)]
+    if len(apexes) == 0:
+        return []
+    apexes = apexes[np.concatenate(([True], np.diff(apexes) >= 2))]
+
+    return apex_segments(h, d2, apexes, off_sigma * n0)
+
+#@description: Ridge lines of the continuous wavelet transform of x (Du, Kibbe & Lin 2006, as scipy's
+#               find_peaks_cwt). The Ricker wavelet response at every width comes from one FFT of x times the wavelet's
+#               analytic spectrum, one inverse FFT per width. Local maxima are linked into ridges from the widest scale
+#               down, keeping ridges at least min_length scales long whose best signal-to-noise ratio (response over
+#               the MAD of its scale) reaches min_snr.
+#@param: widths = wavelet widths in points, widest first
+#@param: floor = lowest noise of x per point, taken through each wavelet as white noise
+#@returns: numpy array of ridge end positions (indices into x), sorted, with their best signal-to-noise ratio
+def cwt_ridges(x, widths, min_snr, min_length, floor=0.0):
+    n = len(x)
+    _p = int(4 * widths[0])
+    N = next_fast_len(n + 2 * _p)
+    X = rfft(np.pad(x, _p, mode='edge'), N)
+    omega2 = (2 * np.pi * rfftfreq(N)) ** 2
+
+    C = np.zeros(n, dtype=np.int64)
+    V = np.zeros(n)
+    pos = []
+    strength = []
+    for s in widths:
+        _g = max(int(round(s / 2)), 1)
+        _H = s * s * omega2 * np.exp(-0.5 * s * s * omega2)
+        W = irfft(X * _H, N)[_p:_p + n]
+        # Noise of this scale from every 4th point, plenty for robust_std. The floor's gain is the wavelet's norm
+        # (Parseval): the response of quantized volts is spiky and its MAD falls short of the white noise under it.
+        _noise = max(robust_std(W[::4]), floor * np.sqrt(2.0 * np.sum(_H * _H) / N))
+        if _noise == 0:
+            break
+
+        M = np.zeros(n, dtype=bool)
+        M[1:-1] = (W[1:-1] >= W[:-2]) & (W[1:-1] > W[2:]) & (W[1:-1] > 0)
+
+        # Ridges with no maximum within the gap at this scale end at the previous one
+        _done = np.flatnonzero((C >= min_length) & (V >= min_snr) & ~maximum_filter1d(M, 2 * _g + 1))
+        pos.append(_done)
+        strength.append(V[_done])
+
+        _Cd = maximum_filter1d(C, 2 * _g + 1)
+        _Vd = maximum_filter1d(V, 2 * _g + 1)
+        C = np.where(M, _Cd + 1, 0)
+        V = np.where(M, np.maximum(_Vd, W / _noise), 0.0)
+
+    _last = np.flatnonzero((C >= min_length) & (V >= min_snr))
+    pos = np.concatenate(pos + [_last])
+    strength = np.concatenate(strength + [V[_last]])
+    _o = np.argsort(pos, kind='stable')
+    return (pos[_o], strength[_o])
+
+#@description: Continuous wavelet transform peak detector (cwt_ridges). Shoulders and small peaks give their own
+#               ridges at the narrower widths. Long runs are transformed in blocks of chunk points (with a margin of
+#               8 widest widths on each side), which keeps the FFTs in cache; apexes are taken from each block's middle.
+#@param: widths = wavelet widths in points (sigma of the Ricker), e.g. geometric from narrowest to widest peak
+#@param: min_snr = ridge maximum over the noise (MAD) of its scale
+#@param: off_sigma, noise_window, base_window = peak ends, as in savgol_peaks
+#@returns: List of (low, high) index tuples
+def cwt_peaks(volt, widths, min_snr=5.0, min_length=3, off_sigma=2.0, noise_window=256, base_window=4096,
+                chunk=2**18):
+    volt = np.asarray(volt, dtype=np.float64)
+    n = len(volt)
+    widths = np.sort(np.asarray(widths, dtype=np.float64))[::-1]
+    if n < 8 * widths[-1]:
+        return []
+
+    x = volt - rolling_median(volt, base_window)
+    noise = rolling_mad_noise(volt, noise_window)
+    if not np.any(noise > 0):
+        return []
+    _m = int(8 * widths[0])
+    pos = []
+    strength = []
+    for _s in range(0, n, chunk):
+        _lo = max(_s - _m, 0)
+        _hi = min(_s + chunk + _m, n)
+        _pos, _str = cwt_ridges(x[_lo:_hi], widths, min_snr, min_length, np.median(noise[_lo:_hi]))
+        _pos = _pos + _lo
+        _k = (_pos >= _s) & (_pos < _s + chunk)
+        pos.append(_pos[_k])
+        strength.append(_str[_k])
+    pos = np.concatenate(pos)
+    strength = np.concatenate(strength)
+    if len(pos) == 0:
+        return []
+
+    # Ridges ending close together are one peak, keep the strongest
+    group = np.cumsum(np.concatenate(([True], np.diff(pos) > widths[-1])))
+    _best = np.lexsort((-strength, group))
+    _first = np.concatenate(([True], np.diff(group[_best]) > 0))
+    apexes = np.sort(pos[_best[_first]])
+    # Within the widest width of either end the wavelets run past the data (and a smoothed run ramps in from 0)
+    apexes = apexes[(apexes >= widths[0]) & (apexes < n - widths[0])]
+    if len(apexes) == 0:
+        return []
+    apexes = apexes[np.concatenate(([True], np.diff(apexes) >= 2))]
+
+    _win = max(int(2 * widths[-1]) | 1, 5)
+    _taps = design_savgol(_win, 3)
+    ys = convolve1d(x, _taps, mode='nearest')
+    d2 = convolve1d(x, design_savgol(_win, 3, 2), mode='nearest')
+    n0 = noise * np.sqrt(np.sum(_taps ** 2))
+
+    return apex_segments(ys, d2, apexes, off_sigma * n0)
+
+#@description: The original per sample threshold loop of GC.break_into_peaks (before define_peaks was vectorized),
+#               kept as the reference for benchmark_detectors.
+#@returns: List of (low, high) index tuples
+def threshold_loop_peaks(volt, volt_thresh, time_thresh):
+    peaks = []
+    on_peak = False
+    low = 0
+    for i in range(0, len(volt)):
+        if not on_peak:
+            if volt[i] >= volt_thresh:
+                on_peak = True
+                low = i
+        else:
+            if volt[i] <= volt_thresh:
+                on_peak = False
+                if i - low >= time_thresh:
+                    peaks.append((low, i))
+    return peaks
+
+class OnlinePeakDetector:
+    '''
+    Finds peaks in sample batches as they arrive. Keeps a running baseline (line fit to the medians of the points
+    between peaks over the last tau seconds) and noise estimate (MAD of the first difference, so slow drift does not
+    count as noise). A peak starts when the voltage rises on_sigma noise above the baseline and ends when it falls back
+    below off_sigma. The line carries a drift on through a peak, where no quiet points update it. A running average
+    would lag a drift by slope * tau, and once that lag passes off_sigma the voltage never falls back below it and the
+    detector stays on one endless peak. Anything on-peak for longer than max_time (a step in the baseline) is closed
+    there and the line is moved down or up onto the lowest stretch of those points. Every batch is
+    handled with array operations plus a loop over the (few) peak segments in it, so the cost is O(batch).
+    Events are (kind, index, time, volt) tuples with kind 'start', 'apex' or 'end'. 'start' is sent (with the index
+    where the peak began) once the peak is min_points long and min_sigma high, so noise on the flanks raises no
+    events. 'apex' is sent once the voltage has dropped apex_sigma noise (or apex_frac of the height) below
+    the highest point so far, and again if a higher point follows (the last one sent is the apex in the table).
+    Areas are of volt - baseline over time, accumulated batch by batch.
+    Functions: process, reset_, update_stats_, rebase_, check_start_, send_apex_, close_peak_
+    Getters: get_table, get_events, get_baseline, get_slope, get_noise, is_on_peak
+    '''
+
+    #@param: on_sigma, off_sigma = start/end thresholds in units of noise above the baseline (hysteresis)
+    #@param: apex_sigma, apex_frac = drop below the running maximum that confirms the apex, in units of noise and as a
+    #               fraction of the height. The larger of the two counts, so noise on a tall flank is not an apex.
+    #@param: min_points = shortest peak kept, in samples (like GC.pk_time_min)
+    #@param: min_sigma = smallest apex height kept, in units of noise. Noise dips on a slow flank split off short
+    #               fragments only a few noise units high, this drops them.
+    #@param: warmup = samples used to seed baseline and noise before detection starts
+    #@param: tau = span [s] of the baseline fit and time constant of the running noise average. Much longer than a
+    #               peak, so the slope comes from more than the last gap between peaks.
+    #@param: stat_points = quiet samples collected before each baseline/noise update, so the update rate does not
+    #               depend on the batch size
+    #@param: max_batch = longer batches are split, so the thresholds keep up with the baseline within one call
+    #@param: max_time = longest peak [s]. Longer ones are taken for a baseline step, closed, and the baseline reset.
+    def __init__(self, on_sigma=5.0, off_sigma=2.0, apex_sigma=5.0, apex_frac=0.1, min_points=10, min_sigma=10.0,
+                    warmup=256, tau=60.0, stat_points=256, max_batch=4096, max_time=60.0):
+        self.on_sigma = on_sigma
+        self.off_sigma = off_sigma
+        self.apex_sigma = apex_sigma
+        self.apex_frac = apex_frac
+        self.min_points = min_points
+        self.min_sigma = min_sigma
+        self.warmup = warmup
+        self.tau = tau
+        self.stat_points = stat_points
+        self.max_batch = max_batch
+        self.max_time = max_time
+
+        self.reset_()
+
+    #@description: Forgets everything. The next batch starts a new run at index 0.
+    def reset_(self):
+        self.count = 0
+        self.seed_v = []
+        self.quiet_v = []
+        self.quiet_t = []
+        self.quiet_span = 0.0
+        # (time, median, weight) of each quiet block in the baseline fit, see update_stats_
+        self.blocks = []
+        # Baseline is baseline + slope * (t - t_base)
+        self.baseline = None
+        self.slope = 0.0
+        self.t_base = None
+        self.noise = None
+
+        self.on_peak = False
+        # Time the voltage went on-peak and the points since (for rebase_)
+        self.t_on = None
+        self.peak_v = []
+        self.peak_t = []
+        self.t_last = None
+        self.v_last = None
+
+        # Peak still in progress (dict), see process
+        self.open = None
+
+        self.rows = []
+        self.events = []
+
+    #@param: volt, t = voltage and time of the new samples, in order
+    #@returns: list of events raised by this batch
+    def process(self, volt, t):
+        volt = np.asarray(volt, dtype=np.float64)
+        t = np.asarray(t, dtype=np.float64)
+        _n0 = len(self.events)
+
+        if len(volt) > self.max_batch:
+            for i in range(0, len(volt), self.max_batch):
+                self.process(volt[i:i + self.max_batch], t[i:i + self.max_batch])
+            return self.events[_n0:]
+
+        # Seed baseline and noise from the first warmup samples
+        if self.baseline is None:
+            _k = min(len(volt), self.warmup - len(self.seed_v))
+            self.seed_v.extend(volt[:_k].tolist())
+            self.count += _k
+            if _k > 0:
+                self.t_last = t[_k - 1]
+                self.v_last = volt[_k - 1]
+            volt = volt[_k:]
+            t = t[_k:]
+            if len(self.seed_v) < self.warmup:
+                return []
+
+            _s = np.array(self.seed_v)
+            self.baseline = np.median(_s)
+            self.t_base = self.t_last
+            self.blocks = [(float(self.t_base), float(self.baseline), 1.0)]
+            self.noise = max(self.mad_noise(_s), 1e-12)
+            self.seed_v = []
+
+        n = len(volt)
+        if n == 0:
+            return []
+
+        b = self.baseline + self.slope * (t - self.t_base)
+        _on = b + self.on_sigma * self.noise
+        _off = b + self.off_sigma * self.noise
+
+        # Hysteresis: rising through _on switches on, falling through _off switches off, otherwise keep the state
+        _ev = np.zeros(n, dtype=np.int8)
+        _ev[volt >= _on] = 1
+        _ev[volt <= _off] = -1
+        _idx = np.where(_ev != 0, np.arange(n), -1)
+        _last = np.maximum.accumulate(_idx)
+        state = np.where(_last >= 0, _ev[np.maximum(_last, 0)] > 0, self.on_peak)
+
+        # Trapezoid steps of volt - baseline, the first one joins the previous batch
+        _tp = np.concatenate(([self.t_last], t)) if self.t_last is not None else np.concatenate(([t[0]], t))
+        _vp = np.concatenate(([self.v_last], volt)) if self.v_last is not None else np.concatenate(([volt[0]], volt))
+        _bp = self.baseline + self.slope * (_tp - self.t_base)
+        steps = np.diff(_tp) * ((_vp[1:] + _vp[:-1]) - (_bp[1:] + _bp[:-1])) * 0.5
+        cs = np.concatenate(([0.0], np.cumsum(steps)))
+
+        # A peak left open by the previous batch that ends on this batch's first point
+        if self.open is not None and not state[0]:
+            self.open['area'] += steps[0]
+            self.close_peak_(self.count, t[0], volt[0])
+
+        # Runs of on-peak samples in this batch. One starting at 0 may continue the open peak.
+        _edges = np.diff(np.concatenate(([False], state, [False])).astype(np.int8))
+        starts = np.flatnonzero(_edges == 1)
+        ends = np.flatnonzero(_edges == -1)
+
+        for _s, _e in zip(starts, ends):
+            _new = self.open is None
+            if _new:
+                self.open = {'start':self.count + _s, 't_start':t[_s], 'apex':self.count + _s, 't_apex':t[_s],
+                                'v_start':volt[_s], 'apex_volt':volt[_s], 'area':0.0, 'start_sent':False,
+                                'apex_sent':False, 'baseline':b[_s]}
+
+            _p = self.open
+            _seg = volt[_s:_e]
+            # steps[_s] joins the previous point to _s, part of the peak only if it was already open
+            _p['area'] += cs[_e] - cs[_s + 1 if _new else _s]
+
+            _m = int(_seg.argmax())
+            if _seg[_m] > _p['apex_volt']:
+                _p['apex'] = self.count + _s + _m
+                _p['t_apex'] = t[_s + _m]
+                _p['apex_volt'] = _seg[_m]
+                _p['apex_sent'] = False
+
+            self.check_start_(self.count + _e)
+            if _p['start_sent'] and not _p['apex_sent']:
+                _after = _seg[max(_p['apex'] - self.count - _s, 0):]
+                _drop = max(self.apex_sigma * self.noise, self.apex_frac * (_p['apex_volt'] - _p['baseline']))
+                if np.any(_after <= _p['apex_volt'] - _drop):
+                    self.send_apex_()
+
+            if _e < n:
+                # volt[_e] is the first point back under _off, the peak ends there
+                _p['area'] += steps[_e]
+                self.close_peak_(self.count + _e, t[_e], volt[_e])
+
+        # Baseline and noise follow the points between peaks, weighted by the time they span
+        _quiet = ~state
+        self.quiet_v.append(volt[_quiet])
+        self.quiet_t.append(t[_quiet])
+        self.quiet_span += np.sum(np.diff(_tp)[_quiet])
+        if sum(len(_q) for _q in self.quiet_v) >= self.stat_points:
+            self.update_stats_()
+
+        # Points since the voltage went on-peak, for rebase_ if that lasts longer than max_time
+        if state[-1]:
+            _k = n - int(np.argmin(state[::-1])) if not state.all() else 0
+            if _k > 0 or not self.on_peak:
+                self.t_on = t[_k]
+                self.peak_v = []
+                self.peak_t = []
+            self.peak_v.append(volt[_k:])
+            self.peak_t.append(t[_k:])
+        self.on_peak = bool(state[-1])
+
+        self.count += n
+        self.t_last = t[-1]
+        self.v_last = volt[-1]
+
+        if self.on_peak and t[-1] - self.t_on > self.max_time:
+            self.rebase_()
+
+        return self.events[_n0:]
+
+    #@description: Adds the median of the collected quiet samples to the baseline fit, weighted by the time they span,
+    #               and refits the line over the blocks of the last tau seconds. The slope is left at 0 until the
+    #               blocks span tau / 4, so a few blocks close together do not tilt it. Noise moves towards their MAD
+    #               noise.
+    def update_stats_(self):
+        _base = np.concatenate(self.quiet_v)
+        _w = 1.0 - np.exp(-self.quiet_span / self.tau)
+        self.noise = max((1.0 - _w) * self.noise + _w * self.mad_noise(_base), 1e-12)
+
+        _tq = np.concatenate(self.quiet_t)
+        _tm = float(np.mean(_tq))
+        self.blocks.append((_tm, float(np.median(_base)), float(self.quiet_span)))
+        _k = 0
+        while len(self.blocks) - _k > 2 and self.blocks[_k][0] < _tm - self.tau:
+            _k += 1
+        del self.blocks[:_k]
+
+        _tb, _vb, _wb = np.array(self.blocks).T
+        _wb = np.maximum(_wb, 1e-12)
+        self.t_base = np.average(_tb, weights=_wb)
+        self.baseline = np.average(_vb, weights=_wb)
+        self.slope = 0.0
+        if _tb[-1] - _tb[0] >= self.tau / 4:
+            _dt = _tb - self.t_base
+            self.slope = np.sum(_wb * _dt * (_vb - self.baseline)) / np.sum(_wb * _dt * _dt)
+
+        self.quiet_v = []
+        self.quiet_t = []
+        self.quiet_span = 0.0
+
+    #@description: Called after max_time on-peak. Closes the open peak at the last point and moves the baseline fit
+    #               by the lowest median (about the line) of stat_points blocks of the on-peak points, so detection goes
+    #               on after a step in the baseline.
+    def rebase_(self):
+        if self.open is not None:
+            self.close_peak_(self.count - 1, self.t_last, self.v_last)
+
+        _t = np.concatenate(self.peak_t)
+        _r = np.concatenate(self.peak_v) - (self.baseline + self.slope * (_t - self.t_base))
+        _m = len(_r) // self.stat_points
+        _shift = np.median(_r) if _m == 0 else np.median(_r[:_m * self.stat_points].reshape(_m, -1), axis=1).min()
+        _shift = float(_shift)
+        self.baseline += _shift
+        self.blocks = [(_tb, _vb + _shift, _wb) for _tb, _vb, _wb in self.blocks]
+
+        self.on_peak = False
+        self.t_on = None
+        self.peak_v = []
+        self.peak_t = []
+
+    #@description: Sends the 'start' event of the open peak once it is long and high enough to be kept.
+    #@param: end = index one past the last point of the peak seen so far
+    def check_start_(self, end):
+        _p = self.open
+        if _p['start_sent'] or end - _p['start'] < self.min_points:
+            return
+        if _p['apex_volt'] - _p['baseline'] >= self.min_sigma * self.noise:
+            _p['start_sent'] = True
+            self.events.append(('start', _p['start'], _p['t_start'], _p['v_start']))
+
+    def send_apex_(self):
+        _p = self.open
+        _p['apex_sent'] = True
+        self.events.append(('apex', _p['apex'], _p['t_apex'], _p['apex_volt']))
+
+    #@description: Ends the open peak at index end and adds it to the table (or drops it if too short or too low).
+    def close_peak_(self, end, t_end, v_end):
+        _p = self.open
+
+        self.check_start_(end)
+        if not _p['start_sent']:
+            self.open = None
+            return
+
+        if not _p['apex_sent']:
+            self.send_apex_()
+        self.open = None
+        self.events.append(('end', end, t_end, v_end))
+
+        _height = _p['apex_volt'] - _p['baseline']
+        self.rows.append((_p['start'], end, _p['apex'], _p['apex_volt'], _p['area'], t_end - _p['t_start'], _height))
+
+    #@returns: noise standard deviation from the median absolute first difference (robust to drift and spikes)
+    def mad_noise(self, v):
+        if len(v) < 2:
+            return 0.0
+        _d = np.diff(v)
+        return 1.4826 * np.median(np.abs(_d - np.median(_d))) / np.sqrt(2)
+
+    #@returns: numpy structured array of PEAK_DTYPE with the peaks finished so far
+    def get_table(self):
+        return np.array(self.rows, dtype=PEAK_DTYPE)
+
+    def get_events(self):
+        return list(self.events)
+
+    #@returns: baseline at the latest point
+    def get_baseline(self):
+        if self.baseline is None:
+            return None
+        return self.baseline + self.slope * (self.t_last - self.t_base)
+
+    #@returns: baseline drift [V/s]
+    def get_slope(self):
+        return self.slope
+
+    def get_noise(self):
+        return self.noise
+
+    def is_on_peak(self):
+        return self.on_peak
+
+#@description: Feeds synthetic 860 SPS chromatograms of several lengths in batches and reports the cost per sample
+#               and the peaks found. The baseline drifts by 20 noise units over each run, so the short runs drift fastest.
+def benchmark_detector(sizes=(10**5, 2 * 10**5, 4 * 10**5, 10**6, 4 * 10**6), batch=256):
+    for n in sizes:
+        rng = np.random.default_rng(0)
+        t = np.arange(n) / 860
+        v = 0.01 + 0.002 * t / t[-1] + rng.normal(0, 1e-4, n)
+        _apexes = np.linspace(0.1, 0.9, 8) * t[-1]
+        for _c in _apexes:
+            v += 0.02 * np.exp(-((t - _c) / 2.0) ** 2)
+
+        det = OnlinePeakDetector()
+        t_start = time.perf_counter()
+        for i in range(0, n, batch):
+            det.process(v[i:i + batch], t[i:i + batch])
+        t_end = time.perf_counter()
+
+        table = det.get_table()
+        print('{:d} samples in batches of {:d}: {:.2f} us/sample, {:d} peaks'.format(n, batch,
+                (t_end - t_start) / n * 1e6, len(table)))
+        print('true apexes [s]:  ' + ' '.join('{:.1f}'.format(_c) for _c in _apexes))
+        print('found apexes [s]: ' + ' '.join('{:.1f}'.format(t[_a]) for _a in table['apex']))
+
+#@description: Synthetic run of n points at 5 Hz on a drifting baseline: every 400 s a peak with a shoulder 5 s after
+#               it and a small peak (6 noise units) 100 s after it.
+#@returns: (volt, true apex indices)
+def synthetic_run(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 5.0
+    v = 0.3 + 0.01 * t / t[-1] + rng.normal(0, 1e-4, n)
+    _c = np.arange(200.0, t[-1] - 200.0, 400.0)
+    truth = []
+    for _dt, _h, _s in ((0.0, 5e-3, 2.0), (5.0, 1.5e-3, 1.5), (100.0, 6e-4, 2.0)):
+        for _ci in _c:
+            _i0 = int((_ci + _dt - 8 * _s) * 5)
+            _i1 = int((_ci + _dt + 8 * _s) * 5)
+            v[_i0:_i1] += _h * np.exp(-0.5 * ((t[_i0:_i1] - _ci - _dt) / _s) ** 2)
+        truth.append(((_c + _dt) * 5).astype(np.int64))
+    return (v, np.sort(np.concatenate(truth)))
+
+#@description: Times the original threshold loop against savgol_peaks and cwt_peaks on synthetic runs of 1e4 to 1e7
+#               points and counts the true apexes each resolves (a found peak whose highest point is within 3 s).
+def benchmark_detectors(sizes=(10**4, 10**5, 10**6, 10**7)):
+    for n in sizes:
+        v, truth = synthetic_run(n)
+        # The loop gets the true baseline removed and a 5 noise unit threshold, its best case
+        _flat = v - 0.3 - 0.01 * np.arange(n) / (n - 1)
+        detectors = (('threshold loop', lambda: threshold_loop_peaks(_flat, 5e-4, 10)),
+                        ('savgol', lambda: savgol_peaks(v, 25)),
+                        ('cwt', lambda: cwt_peaks(v, np.geomspace(4, 16, 8))))
+        for name, func in detectors:
+            t_start = time.perf_counter()
+            peaks = func()
+            t_end = time.perf_counter()
+
+            found = 0
+            if len(peaks) > 0:
+                _p = np.array(peaks)
+                _apex = segment_argmax(v, _p[:, 0], _p[:, 1])
+                _j = np.clip(np.searchsorted(truth, _apex), 1, len(truth) - 1)
+                _j = np.where(np.abs(truth[_j - 1] - _apex) < np.abs(truth[_j] - _apex), _j - 1, _j)
+                found = len(np.unique(_j[np.abs(truth[_j] - _apex) <= 15]))
+            print('n={:<9d} {:<15s} {:8.3f} s  {:6d} peaks, {:6d} of {:d} true apexes'.format(n, name,
+                    t_end - t_start, len(peaks), found, len(truth)))
+
+#@description: Regression check for savgol_peaks: blank runs (pure noise) must give no peaks and a run with 8 peaks
+#               exactly 8, on raw volts and after the pipeline's smoother (mean, 9), whose output used to be taken for
+#               noise free, and on volts quantized to codes with 0.2 to 2 codes of noise (quantized_run), whose noise
+#               used to collapse to 0.
+def check_savgol_peaks(n=20000, blanks=50, window=25, noise_codes=(0.2, 0.3, 0.5, 1.0, 2.0)):
+    rng = np.random.default_rng(1)
+    t = np.arange(n) / 5.0
+    _smooth = make_smoother('mean', 9)
+
+    _counts = []
+    for i in range(blanks):
+        v = 0.3 + rng.normal(0, 1e-4, n)
+        _counts.append((len(savgol_peaks(v, window)), len(savgol_peaks(_smooth.filter(v), window))))
+    _counts = np.array(_counts)
+
+    v = 0.3 + rng.normal(0, 1e-4, n)
+    for _c in np.linspace(0.05, 0.95, 8) * t[-1]:
+        v += 5e-3 * np.exp(-0.5 * ((t - _c) / 2.0) ** 2)
+    _peaks = (len(savgol_peaks(v, window)), len(savgol_peaks(_smooth.filter(v), window)))
+
+    print('savgol_peaks: {:d} blank runs, most peaks found raw {:d}, smoothed {:d}; 8 peak run: raw {:d}, smoothed {:d}'.format(
+            blanks, _counts[:, 0].max(), _counts[:, 1].max(), _peaks[0], _peaks[1]))
+    assert _counts.max() == 0, 'savgol_peaks found peaks in a blank run'
+    assert _peaks == (8, 8), 'savgol_peaks did not find exactly the 8 peaks'
+
+    for _nc in noise_codes:
+        _blank = max(len(savgol_peaks(quantized_run(n, _nc, seed=i), window)) for i in range(blanks // 5))
+        _peaks = len(savgol_peaks(quantized_run(n, _nc, seed=blanks, peaks=True), window))
+        print('savgol_peaks: {:.1f} codes of noise, {:d} blank runs, most peaks found {:d}; 8 peak run: {:d}'.format(
+                _nc, blanks // 5, _blank, _peaks))
+        assert _blank == 0, 'savgol_peaks found peaks in a quantized blank run'
+        assert _peaks == 8, 'savgol_peaks did not find exactly the 8 peaks on quantized volts'
+
+#@description: Synthetic run of n points at 5 Hz rounded to ADS1115 codes (gain 1), noise in codes, optionally with 8
+#               peaks 40 codes high.
+#@returns: volt numpy array
+def quantized_run(n, noise_codes, seed=0, peaks=False):
+    rng = np.random.default_rng(seed)
+    _vpc = 4.096 / 32768
+    v = 0.3 + rng.normal(0, noise_codes * _vpc, n)
+    if peaks:
+        t = np.arange(n) / 5.0
+        for _c in np.linspace(0.05, 0.95, 8) * t[-1]:
+            v += 40 * _vpc * np.exp(-0.5 * ((t - _c) / 2.0) ** 2)
+    return np.rint(v / _vpc) * _vpc
+
+#@description: Regression check for the 'mad' thresholds (noise_thresholds + threshold_segments with GC's defaults) on
+#               quantized volts: blank runs with 0.2 to 2 codes of noise, where most first differences are exactly 0,
+#               must give no peaks and a run with 8 peaks exactly 8.
+def check_noise_thresholds(n=20000, blanks=10, noise_codes=(0.2, 0.3, 0.5, 1.0, 2.0)):
+    def count(v):
+        on, off, low = noise_thresholds(v, 5.0, 2.0, 10.0, 256, 4096)
+        return len(threshold_segments(v, on, 10, off, low)[0])
+
+    for _nc in noise_codes:
+        _blank = max(count(quantized_run(n, _nc, seed=i)) for i in range(blanks))
+        _peaks = count(quantized_run(n, _nc, seed=blanks, peaks=True))
+        print('noise_thresholds: {:.1f} codes of noise, {:d} blank runs, most peaks found {:d}; 8 peak run: {:d}'.format(
+                _nc, blanks, _blank, _peaks))
+        assert _blank == 0, 'noise_thresholds found peaks in a quantized blank run'
+        assert _peaks == 8, 'noise_thresholds did not find exactly the 8 peaks'
+
+if __name__ == '__main__':
+    check_noise_thresholds()
+    check_savgol_peaks()
+    benchmark_detector()
+    benchmark_detectors()
@@ -0,0 +1,120 @@
+'''
+Name: gc_scheduler.py
+Authors: Conor Green and Matt McPartlan
+Description: Periodic scheduler for the GUI threads (GCData, GCReceiver, GCPlotter, GCTemperature) and the acquisition process.
+                Replaces the "while t_curr - epsilon - t_last < sampling_period: time.sleep(.01)" polling loops.
+Usage: Import from gc_gui.py / gc_class.py. Call as main to compare jitter with the old polling loop.
+Version:
+1.0 - 18 October 2026 - Initial creation. DeadlineScheduler on time.monotonic_ns with jitter statistics.
+'''
+
+import time
+import threading
+
+class DeadlineScheduler:
+    '''
+    Deadline k is t0 + k * period on the monotonic clock, so a late cycle never shifts the ones after it (no drift)
+    and wall clock changes have no effect. Waiting is a single Event.wait on the owner's stop event, so stopping a
+    thread interrupts the wait immediately instead of after the next poll.
+    Functions: wait_next, reset_
+    Statistics: record_, get_stats, print_stats
+    '''
+
+    #@param: period = seconds between deadlines
+    #@param: stop_event = threading.Event (or multiprocessing Event) that ends the wait early. None makes a private one.
+    def __init__(self, period, stop_event=None):
+        self.period_ns = int(round(period * 1e9))
+
+        if stop_event is None:
+            stop_event = threading.Event()
+        self.stop_event = stop_event
+
+        self.reset_()
+
+    #@description: Starts a new deadline grid at the current time and clears the statistics.
+    def reset_(self):
+        self.t0_ns = time.monotonic_ns()
+        self.k = 0
+
+        self.count = 0
+        self.missed = 0
+        self.late_mean = 0.0
+        self.late_m2 = 0.0
+        self.late_max = 0
+
+    #@description: Waits for the next deadline. Deadlines already more than a period in the past are skipped
+    #               (counted in missed) instead of being run back to back.
+    #@returns: False if the stop event was set, True otherwise
+    def wait_next(self):
+        _p = self.period_ns
+        self.k += 1
+        deadline = self.t0_ns + self.k * _p
+
+        now = time.monotonic_ns()
+        if now - deadline > _p:
+            _skip = (now - deadline) // _p
+            self.k += _skip
+            self.missed += _skip
+            deadline += _skip * _p
+
+        _remaining = deadline - now
+        if _remaining > 0:
+            if self.stop_event.wait(_remaining * 1e-9):
+                return False
+        elif self.stop_event.is_set():
+            return False
+
+        self.record_(time.monotonic_ns() - deadline)
+        return True
+
+    #@description: Adds one lateness sample [ns] to the running statistics (Welford).
+    def record_(self, late):
+        self.count += 1
+        _d = late - self.late_mean
+        self.late_mean += _d / self.count
+        self.late_m2 += _d * (late - self.late_mean)
+        if late > self.late_max:
+            self.late_max = late
+
+    #@returns: dict of cycles, missed deadlines, and mean/std/max lateness in microseconds
+    def get_stats(self):
+        _std = (self.late_m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+        return {'cycles':self.count, 'missed':self.missed, 'mean_us':self.late_mean / 1e3,
+                'std_us':_std / 1e3, 'max_us':self.late_max / 1e3}
+
+    def print_stats(self, name):
+        _s = self.get_stats()
+        print('{:s}: {:d} cycles, {:d} missed, lateness mean {:.1f} us, std {:.1f} us, max {:.1f} us'.format(
+                name, _s['cycles'], _s['missed'], _s['mean_us'], _s['std_us'], _s['max_us']))
+
+#@description: Old GUI loop, kept here only for comparison. Returns lateness stats against the ideal grid.
+def benchmark_polling(period, cycles):
+    _s = DeadlineScheduler(period)
+    epsilon = 0.001
+
+    t_start = time.time()
+    t_last = t_start
+    for k in range(1, cycles + 1):
+        t_curr = time.time()
+        while (t_curr - epsilon - t_last < period):
+            time.sleep(.01)
+            t_curr = time.time()
+        t_last = t_curr
+
+        # lateness against where the k-th sample should have been
+        _s.record_(int((t_curr - (t_start + k * period)) * 1e9))
+
+    return _s
+
+def benchmark_scheduler(period, cycles):
+    _s = DeadlineScheduler(period)
+    for k in range(cycles):
+        _s.wait_next()
+    return _s
+
+if __name__ == '__main__':
+    for _period in (0.2, 0.05):
+        _cycles = int(2 / _period)
+        print('period {:.3f} s, {:d} cycles'.format(_period, _cycles))
+        benchmark_polling(_period, _cycles).print_stats('  sleep polling    ')
+        benchmark_scheduler(_period, _cycles).print_stats('  DeadlineScheduler')
@@ -0,0 +1,234 @@
+'''
+Name: gc_sync.py
+Authors: Conor Green and Matt McPartlan
+Description: Lock for curr_data (GC) and its frame copy (GCFrame) with separate read, append and write modes, so readers
+                and the acquisition thread's appends never wait for each other. Counts wait time per mode.
+Usage: Import from gc_class.py / gc_gui.py. Call as main to compare the appender's waits with the old single lock.
+Version:
+1.0 - 18 October 2026 - Initial creation. RWLock (read/append/write modes), LockMode handles and WaitStats.
+'''
+
+import time
+import threading
+
+import numpy as np
+
+class WaitStats:
+    '''
+    Wait times of one lock mode: acquisitions, how many had to block, total and longest wait.
+    Functions: record_, reset_
+    Statistics: get_stats
+    '''
+
+    def __init__(self):
+        self.reset_()
+
+    def reset_(self):
+        self.count = 0
+        self.contended = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    #@param: wait_ns = time from the acquire call until the lock was held
+    #@param: waited = True if the caller had to block
+    def record_(self, wait_ns, waited):
+        self.count += 1
+        self.total_ns += wait_ns
+        if waited:
+            self.contended += 1
+        if wait_ns > self.max_ns:
+            self.max_ns = wait_ns
+
+    #@returns: dict with count, contended, total_ms, mean_us, max_us
+    def get_stats(self):
+        _mean = self.total_ns / self.count / 1e3 if self.count > 0 else 0.0
+        return {'count':self.count, 'contended':self.contended, 'total_ms':self.total_ns / 1e6, 'mean_us':_mean,
+                'max_us':self.max_ns / 1e3}
+
+class LockMode:
+    '''
+    Lock-like handle on one mode of an RWLock (RWLock.reader, RWLock.appender): acquire/release/locked and with, so
+    it can stand in for a threading.Lock, e.g. under a threading.Condition.
+    '''
+
+    def __init__(self, acquire, release, locked):
+        self.acquire = acquire
+        self.release = release
+        self.locked = locked
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class RWLock:
+    '''
+    One lock, three modes:
+        read   - any number at once, alongside an appender. Getters, peak/area math, copies for the plot.
+        append - one at a time, alongside readers. The acquisition thread: SampleBuffer appends only write past the
+                 end of every reader's view and publish the new length last (see SampleBuffer).
+        write  - alone. Anything that replaces or changes existing samples (set_, row setters, clear_, ...).
+    A waiting writer holds back new readers so it cannot starve, but not appends: a read never delays acquisition,
+    directly or through a queued writer. acquire/release/locked and with are the write mode, with the signatures of
+    threading.Lock, so code written for the old plain Lock keeps exclusive access.
+    Functions: acquire, release, acquire_read, release_read, acquire_append, release_append
+    Getters: locked, is_writing, get_readers
+    Statistics: get_stats, reset_stats_, print_stats
+    '''
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.appending = False
+        self.writing = False
+        self.writers_waiting = 0
+
+        self.stats = {'read':WaitStats(), 'append':WaitStats(), 'write':WaitStats()}
+
+        self.reader = LockMode(self.acquire_read, self.release_read, self.locked)
+        self.appender = LockMode(self.acquire_append, self.release_append, self.locked)
+
+    #@description: Waits (holding self.cond) until blocked() is False and records the wait under mode.
+    #@param: blocking, timeout = as threading.Lock.acquire
+    #@returns: True if the mode may be taken
+    def wait_(self, blocked, blocking, timeout, mode, t_start):
+        waited = False
+        if blocked():
+            if not blocking:
+                return False
+            waited = True
+            if not self.cond.wait_for(lambda: not blocked(), None if timeout < 0 else timeout):
+                return False
+
+        self.stats[mode].record_(time.perf_counter_ns() - t_start, waited)
+        return True
+
+    #@description: Write mode. Waits for readers, the appender and other writers to leave.
+    def acquire(self, blocking=True, timeout=-1):
+        t_start = time.perf_counter_ns()
+        with self.cond:
+            self.writers_waiting += 1
+            _ok = self.wait_(lambda: self.writing or self.appending or self.readers > 0, blocking, timeout, 'write',
+                                t_start)
+            self.writers_waiting -= 1
+            if _ok:
+                self.writing = True
+            else:
+                self.cond.notify_all()
+            return _ok
+
+    def release(self):
+        with self.cond:
+            if not self.writing:
+                raise RuntimeError('release unlocked lock')
+            self.writing = False
+            self.cond.notify_all()
+
+    #@description: Read mode. Waits only for a writer, active or queued.
+    def acquire_read(self, blocking=True, timeout=-1):
+        t_start = time.perf_counter_ns()
+        with self.cond:
+            _ok = self.wait_(lambda: self.writing or self.writers_waiting > 0, blocking, timeout, 'read', t_start)
+            if _ok:
+                self.readers += 1
+            return _ok
+
+    def release_read(self):
+        with self.cond:
+            if self.readers == 0:
+                raise RuntimeError('release unlocked lock')
+            self.readers -= 1
+            if self.readers == 0:
+                self.cond.notify_all()
+
+    #@description: Append mode. Waits only for an active writer or another appender, never for readers.
+    def acquire_append(self, blocking=True, timeout=-1):
+        t_start = time.perf_counter_ns()
+        with self.cond:
+            _ok = self.wait_(lambda: self.writing or self.appending, blocking, timeout, 'append', t_start)
+            if _ok:
+                self.appending = True
+            return _ok
+
+    def release_append(self):
+        with self.cond:
+            if not self.appending:
+                raise RuntimeError('release unlocked lock')
+            self.appending = False
+            self.cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    #@returns: True if held in any mode (the GC/GCFrame accessors only check that the caller took the lock)
+    def locked(self):
+        return self.writing or self.appending or self.readers > 0
+
+    def is_writing(self):
+        return self.writing
+
+    def get_readers(self):
+        return self.readers
+
+    #@returns: {'read':..., 'append':..., 'write':...} of WaitStats.get_stats dicts
+    def get_stats(self):
+        return {_m:_s.get_stats() for _m, _s in self.stats.items()}
+
+    def reset_stats_(self):
+        for _s in self.stats.values():
+            _s.reset_()
+
+    def print_stats(self, name):
+        for _m, _s in self.get_stats().items():
+            print('{:s} {:6s}: {:d} acquired, {:d} waited, wait total {:.1f} ms, mean {:.1f} us, max {:.1f} us'.format(
+                    name, _m, _s['count'], _s['contended'], _s['total_ms'], _s['mean_us'], _s['max_us']))
+
+#@description: A plot-like reader copies a 2e6 sample run every 20 ms while an acquisition-like appender adds 256
+#               sample blocks every 2 ms. Run once with everything in write mode (the old single Lock) and once with
+#               the read/append modes, and print the appender's waits.
+def benchmark_rwlock(n=2 * 10**6, seconds=2.0):
+    from gc_buffer import SampleBuffer
+
+    for label, split in (('single lock', False), ('read/append modes', True)):
+        buf = SampleBuffer(4)
+        buf.extend_(np.zeros((4, n)))
+        lock = RWLock()
+        stop = threading.Event()
+        waits = []
+
+        def reader():
+            _mode = lock.reader if split else lock
+            while not stop.wait(0.02):
+                with _mode:
+                    np.copy(buf.view())
+
+        def appender():
+            _mode = lock.appender if split else lock
+            _block = np.ones((4, 256))
+            while not stop.wait(0.002):
+                t_start = time.perf_counter_ns()
+                with _mode:
+                    waits.append(time.perf_counter_ns() - t_start)
+                    buf.extend_(_block)
+
+        threads = [threading.Thread(target=reader), threading.Thread(target=reader), threading.Thread(target=appender)]
+        for _t in threads:
+            _t.start()
+        time.sleep(seconds)
+        stop.set()
+        for _t in threads:
+            _t.join()
+
+        _w = np.array(waits) / 1e3
+        print('{:s}: {:d} appends, wait mean {:.1f} us, 99th percentile {:.1f} us, max {:.1f} us'.format(label,
+                len(_w), _w.mean(), np.percentile(_w, 99), _w.max()))
+        lock.print_stats('  ' + label)
+
+if __name__ == '__main__':
+    benchmark_rwlock()
@@ -82,7 +82,7 @@ sleep 10s
 python3 build.py build bdist_wheel
 sleep 10s
 
-echo -e "\e[4mInstalling final libraries: atlas, matplotlib, PyYAML\e[0m"
+echo -e "\e[4mInstalling final libraries: atlas, matplotlib, PyYAML, scipy\e[0m"
 echo -e "\e[4mInstalling libatlas\e[0m"
 apt-get install libatlas-base-dev
 
@@ -91,3 +91,6 @@ pip3 install matplotlib
 
 echo -e "\e[4mInstalling PyYAML\e[0m"
 pip3 install pyyaml
+
+echo -e "\e[4mInstalling scipy\e[0m"
+pip3 install scipy
@@ -81,7 +81,7 @@ echo -e "\e[4mBuilding wxPython. Will take a long time ~4 hrs\e[0m"
 
 python3 build.py build bdist_wheel
 
-echo -e "\e[4mInstalling final libraries: atlas, matplotlib, PyYAML\e[0m"
+echo -e "\e[4mInstalling final libraries: atlas, matplotlib, PyYAML, scipy\e[0m"
 echo -e "\e[4mInstalling libatlas\e[0m"
 apt-get install libatlas-base-dev
 
@@ -90,3 +90,6 @@ pip3 install matplotlib
 
 echo -e "\e[4mInstalling PyYAML\e[0m"
 pip3 install pyyaml
+
+echo -e "\e[4mInstalling scipy\e[0m"
+pip3 install scipy